@@ -0,0 +1,177 @@
+"""
+Benchmark da carga dos modelos na inicialização (carregar_modelos_do_disco):
+o layout antigo em pickle contra as versões em joblib, com e sem memory map.
+
+Um catálogo sintético é gravado em um SQLite temporário e os modelos são
+treinados uma vez e salvos nos dois layouts. Para cada formato, `--workers`
+subprocessos carregam os modelos ao mesmo tempo, como workers do uvicorn, e
+fazem uma predição de cada modelo. Com todos vivos, cada um informa o RSS e o
+PSS (RSS com as páginas compartilhadas divididas entre os processos que as
+usam, de /proc/self/smaps_rollup). Com mmap, os arrays dos modelos ficam no
+page cache e são contados uma vez só no PSS somado dos workers.
+
+Uso, a partir da raiz do projeto (Linux):
+
+    python -m benchmarks.artefatos
+    python -m benchmarks.artefatos --livros 20000 --workers 4 --json artefatos.json
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+FORMATOS = ("pickle-legado", "joblib", "joblib-mmap")
+
+
+def _memoria_mb() -> dict:
+    """RSS e PSS atuais do processo, em MB."""
+    valores = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for linha in f:
+            campo, _, resto = linha.partition(":")
+            if campo in ("Rss", "Pss"):
+                valores[campo.lower()] = round(int(resto.split()[0]) / 1024, 1)  # kB
+    return valores
+
+
+def _executa_worker() -> dict:
+    """Carrega os modelos como na inicialização da API e aguarda o pai para medir a memória."""
+    from src.consultaLivros.ml.artefatos_modelos import estatisticas
+    from src.consultaLivros.ml.gerenciador_de_modelos import carregar_modelos_do_disco, obtem_snapshot, prediz_lote
+    from src.consultaLivros.schemas.livros import LivroBase
+    from benchmarks.predicao import catalogo_sintetico
+
+    livros = [LivroBase(**livro) for livro in catalogo_sintetico(200, semente=2)]
+    memoria_inicial = _memoria_mb()
+
+    inicio = time.perf_counter()
+    carregar_modelos_do_disco()
+    duracao_carga = time.perf_counter() - inicio
+
+    # Uma predição de cada modelo, para que as páginas usadas no predict sejam lidas
+    snapshot = obtem_snapshot()
+    inicio = time.perf_counter()
+    for nome_modelo in snapshot.modelos:
+        prediz_lote(snapshot, nome_modelo, livros)
+    duracao_predicao = time.perf_counter() - inicio
+
+    # Sinaliza que terminou e espera os demais workers carregarem
+    print("pronto", flush=True)
+    sys.stdin.readline()
+    memoria = _memoria_mb()
+    return {
+        "formato": estatisticas()["ultima_carga"]["formato"],
+        "modelos": len(snapshot.modelos),
+        "carga_s": round(duracao_carga, 3),
+        "primeira_predicao_s": round(duracao_predicao, 3),
+        "rss_inicial_mb": memoria_inicial["rss"],
+        "rss_mb": memoria["rss"],
+        "pss_mb": memoria["pss"],
+    }
+
+
+def _mede_formato(formato: str, pastas: dict, workers: int) -> dict:
+    env = dict(os.environ, ML_MODELOS_DIR=pastas[formato], ML_MODELOS_MMAP=str(formato == "joblib-mmap").lower())
+    processos = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.artefatos", "--interno"], env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    # Todos carregam ao mesmo tempo; a memória só é medida quando todos estão prontos
+    prontos = [processo.stdout.readline().strip() == "pronto" for processo in processos]
+    resultados = []
+    for processo, pronto in zip(processos, prontos):
+        saida, _ = processo.communicate("\n")
+        if not pronto or processo.returncode != 0:
+            return {"formato": formato, "erro": f"worker terminou com código {processo.returncode}"}
+        resultados.append(json.loads(saida.strip().splitlines()[-1]))
+
+    return {
+        "formato": formato,
+        "carregado_como": resultados[0]["formato"],
+        "workers": workers,
+        "carga_s_media": round(sum(r["carga_s"] for r in resultados) / workers, 3),
+        "primeira_predicao_s_media": round(sum(r["primeira_predicao_s"] for r in resultados) / workers, 3),
+        "rss_modelos_mb_medio": round(sum(r["rss_mb"] - r["rss_inicial_mb"] for r in resultados) / workers, 1),
+        "rss_mb_medio": round(sum(r["rss_mb"] for r in resultados) / workers, 1),
+        "pss_mb_medio": round(sum(r["pss_mb"] for r in resultados) / workers, 1),
+        "pss_mb_total": round(sum(r["pss_mb"] for r in resultados), 1),
+        "por_worker": resultados,
+    }
+
+
+def _prepara_artefatos(livros: int, pasta_base: str) -> dict:
+    """
+    Treina os modelos uma vez e os grava no layout antigo (pickle) e em uma versão joblib.
+    O treino usa o DataFrame denso, como na época do layout antigo, cujos arquivos
+    não guardam a ordem das colunas e dependem do feature_names_in_ dos modelos.
+    """
+    from benchmarks.predicao import grava_catalogo_sintetico
+
+    grava_catalogo_sintetico(livros)
+
+    from src.consultaLivros.db.database import SessionLocal
+    from src.consultaLivros.ml import artefatos_modelos
+    from src.consultaLivros.ml.treinamento_modelo import prepara_dados_treino, treina_modelos
+
+    db = SessionLocal()
+    try:
+        X, y, colunas, encoder, tfidf = prepara_dados_treino(db, False)
+    finally:
+        db.close()
+    modelos, metricas = treina_modelos(X, y)
+
+    pasta_legado = os.path.join(pasta_base, "legado")
+    os.makedirs(pasta_legado)
+    for nome, objeto in [(f"modelo_{nome}", modelo) for nome, modelo in modelos.items()] + [("encoder", encoder), ("tfidf", tfidf)]:
+        with open(os.path.join(pasta_legado, f"{nome}.pkl"), "wb") as f:
+            pickle.dump(objeto, f)
+
+    pasta_versionada = os.path.join(pasta_base, "versionado")
+    artefatos_modelos.ML_MODELOS_DIR = pasta_versionada
+    artefatos_modelos.salva_versao(modelos, metricas, encoder, tfidf, {nome: colunas for nome in modelos})
+
+    tamanho_mb = sum(
+        os.path.getsize(os.path.join(pasta_legado, nome)) for nome in os.listdir(pasta_legado)
+    ) / 2**20
+    print(f"{livros} livros, {len(modelos)} modelos, {tamanho_mb:.1f} MB em pickle")
+    return {"pickle-legado": pasta_legado, "joblib": pasta_versionada, "joblib-mmap": pasta_versionada}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--livros", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="Arquivo onde gravar os resultados completos")
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        print(json.dumps(_executa_worker()))
+        return
+
+    from benchmarks.predicao import _temporario  # SQLite temporário, removido ao sair
+
+    pastas = _prepara_artefatos(args.livros, _temporario)
+    resultados = [_mede_formato(formato, pastas, args.workers) for formato in FORMATOS]
+
+    print(f"\n{args.workers} workers por formato (médias por worker; PSS total somado)")
+    print(f"{'formato':<15}{'carga(s)':>10}{'1a predição(s)':>16}{'RSS modelos':>13}{'RSS':>8}{'PSS':>8}{'PSS total':>11}")
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['formato']:<15}  erro: {r['erro']}")
+            continue
+        print(f"{r['formato']:<15}{r['carga_s_media']:>10.3f}{r['primeira_predicao_s_media']:>16.3f}"
+              f"{r['rss_modelos_mb_medio']:>13.1f}{r['rss_mb_medio']:>8.1f}{r['pss_mb_medio']:>8.1f}{r['pss_mb_total']:>11.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"livros": args.livros, "workers": args.workers, "resultados": resultados}, f, indent=2)
+        print(f"\nResultados completos em {args.json}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark de vazão das rotas de livros sob clientes concorrentes.
+
+Compara a implementação anterior (rotas `async def` usando a Session síncrona,
+que bloqueia o event loop) com a camada assíncrona atual (AsyncSession).
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.concorrencia_livros --popular 1000
+    python -m benchmarks.concorrencia_livros --clientes 50 200 --requisicoes 20
+
+O banco usado é o definido em DATABASE_URL. A opção --popular insere livros
+sintéticos e só deve ser usada em um banco local de testes.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.consultaLivros.db.database import DATABASE_URL, SessionLocal, cria_banco
+from src.consultaLivros.repositorios import livros_repositorio
+from src.consultaLivros.rotas import api_livros
+from src.consultaLivros.schemas import livros as schemas_livros
+
+ROTAS = ["/api/v1/books?limit=50", "/api/v1/stats/overview", "/api/v1/health"]
+
+
+def _cria_app_sincrona(tamanho_pool: int) -> FastAPI:
+    """
+    Reproduz as rotas originais: `async def` chamando o repositório síncrono.
+
+    Com o pool padrão (5 + 10), mais de 15 clientes simultâneos travam o event loop
+    esperando por conexões que só seriam devolvidas pelo próprio loop. Para que a
+    medição termine, o modo síncrono usa um pool do tamanho do número de clientes.
+    """
+    engine = create_engine(DATABASE_URL, pool_size=tamanho_pool)
+    fabrica_sessoes = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db():
+        db = fabrica_sessoes()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/api/v1/books", response_model=list[schemas_livros.Livro])
+    async def get_livros(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+        return livros_repositorio.busca_todos_livros(db, skip=skip, limit=limit)
+
+    @app.get("/api/v1/stats/overview")
+    async def get_overview_stats(db: Session = Depends(get_db)):
+        return livros_repositorio.obter_estatisticas_gerais(db)
+
+    @app.get("/api/v1/health")
+    async def health_check(db: Session = Depends(get_db)):
+        return {"status": livros_repositorio.verificar_conexao_db(db)}
+
+    return app
+
+
+def _cria_app_assincrona() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_livros.router)
+    return app
+
+
+def _popular_banco(quantidade: int):
+    cria_banco()
+    with SessionLocal() as db:
+        livros_repositorio.salva_dados_livros(db, [
+            {
+                "titulo": f"Livro sintético {i}",
+                "preco": 10 + (i % 50),
+                "rating": 1 + i % 5,
+                "disponibilidade": True,
+                "categoria": f"Categoria {i % 50}",
+                "imagem": f"http://exemplo.com/{i}.jpg",
+            }
+            for i in range(quantidade)
+        ])
+
+
+async def _executa_carga(app: FastAPI, clientes: int, requisicoes_por_cliente: int) -> dict:
+    latencias = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def cliente(indice: int):
+            for i in range(requisicoes_por_cliente):
+                rota = ROTAS[(indice + i) % len(ROTAS)]
+                inicio = time.perf_counter()
+                resposta = await client.get(rota)
+                resposta.raise_for_status()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio_total = time.perf_counter()
+        await asyncio.gather(*(cliente(i) for i in range(clientes)))
+        duracao = time.perf_counter() - inicio_total
+
+    latencias.sort()
+    return {
+        "requisicoes": len(latencias),
+        "req_por_s": len(latencias) / duracao,
+        "p50_ms": statistics.median(latencias),
+        "p99_ms": latencias[int(len(latencias) * 0.99) - 1],
+    }
+
+
+async def main(clientes: list[int], requisicoes_por_cliente: int):
+    print(f"{'modo':<26} {'clientes':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for n_clientes in clientes:
+        apps = {
+            "antes (Session síncrona)": _cria_app_sincrona(n_clientes),
+            "depois (AsyncSession)": _cria_app_assincrona(),
+        }
+        for nome, app in apps.items():
+            r = await _executa_carga(app, n_clientes, requisicoes_por_cliente)
+            print(f"{nome:<26} {n_clientes:>8} {r['req_por_s']:>10.1f} {r['p50_ms']:>10.1f} {r['p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requisicoes", type=int, default=10, help="Requisições por cliente")
+    parser.add_argument("--popular", type=int, default=0, help="Insere N livros sintéticos antes de medir")
+    args = parser.parse_args()
+
+    if args.popular:
+        _popular_banco(args.popular)
+    asyncio.run(main(args.clientes, args.requisicoes))
@@ -0,0 +1,235 @@
+"""
+Cópia local do books.toscrape.com para testar e medir a raspagem sem rede.
+
+Três comandos, a partir da raiz do projeto:
+
+    # Grava o site uma vez (página inicial, categorias e toda a paginação)
+    python -m benchmarks.fixtures_raspagem gravar --destino fixtures/toscrape
+
+    # Ou gera um site sintético com a mesma estrutura (para CI sem rede)
+    python -m benchmarks.fixtures_raspagem gerar --destino fixtures/sintetico --livros 1000
+
+    # Serve a cópia, com ETag/Last-Modified e latência opcional por requisição
+    python -m benchmarks.fixtures_raspagem servir --origem fixtures/toscrape --porta 8765 --latencia-ms 50
+
+Depois, aponte o scraper para a cópia: SCRAPER_BASE_URL=http://127.0.0.1:8765/
+"""
+import argparse
+import email.utils
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from lxml import html
+
+from src.consultaLivros.raspagem.book_scraper import PageSelectors, seletor_lxml
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+
+
+def _caminho_local(destino: str, base_url: str, url: str) -> str:
+    """Arquivo onde a URL é guardada, espelhando o caminho relativo à URL base."""
+    relativo = urlsplit(url).path[len(urlsplit(base_url).path):]
+    if not relativo or relativo.endswith("/"):
+        relativo += "index.html"
+    return os.path.join(destino, *relativo.split("/"))
+
+
+def grava_site(base_url: str, destino: str, timeout: float = 20.0) -> dict:
+    """
+    Baixa a página inicial, as páginas de categoria e toda a paginação, na mesma
+    ordem de navegação do scraper, preservando o Last-Modified como data do arquivo.
+    """
+    paginas = {}
+    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        def baixa(url: str) -> html.HtmlElement:
+            resposta = client.get(url)
+            resposta.raise_for_status()
+            arquivo = _caminho_local(destino, base_url, url)
+            os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+            with open(arquivo, "wb") as f:
+                f.write(resposta.content)
+            if resposta.headers.get("Last-Modified"):
+                data = email.utils.parsedate_to_datetime(resposta.headers["Last-Modified"]).timestamp()
+                os.utime(arquivo, (data, data))
+            paginas[url] = os.path.relpath(arquivo, destino)
+            return html.fromstring(resposta.text)
+
+        inicial = baixa(base_url)
+        for link in seletor_lxml(PageSelectors.CATEGORY_LINKS)(inicial):
+            url_atual = urljoin(base_url, link.get("href"))
+            while url_atual:
+                print(f"Gravando {url_atual}")
+                pagina = baixa(url_atual)
+                proxima = seletor_lxml(PageSelectors.NEXT_PAGE)(pagina)
+                url_atual = urljoin(url_atual, proxima[0].get("href")) if proxima else None
+
+    manifesto = {
+        "base_url": base_url,
+        "gravado_em": datetime.now(timezone.utc).isoformat(),
+        "paginas": paginas,
+    }
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO), "w") as f:
+        json.dump(manifesto, f, indent=2)
+    return manifesto
+
+
+def gera_site_sintetico(destino: str, categorias: int = 50, livros: int = 1000, semente: int = 1) -> int:
+    """
+    Gera um site com a marcação do books.toscrape.com (20 livros por página),
+    distribuindo `livros` entre `categorias` de tamanhos variados. Determinístico
+    para uma mesma semente. Retorna o número de livros gerados.
+    """
+    aleatorio = random.Random(semente)
+    palavras = "light attic python dream night sea city war love king star river".split()
+    pesos = [aleatorio.randint(1, 10) for _ in range(categorias)]
+    tamanhos = [max(1, livros * peso // sum(pesos)) for peso in pesos]
+    cats = [(f"Categoria {i}", f"categoria-{i}_{i + 2}", tamanho) for i, tamanho in enumerate(tamanhos)]
+
+    lateral = (
+        '<div class="side_categories"><ul class="nav nav-list"><li>'
+        '<a href="catalogue/category/books_1/index.html">Books</a><ul>'
+        + "".join(
+            f'<li><a href="catalogue/category/books/{slug}/index.html">\n    {nome}\n</a></li>'
+            for nome, slug, _ in cats
+        )
+        + "</ul></li></ul></div>"
+    )
+    os.makedirs(destino, exist_ok=True)
+    with open(os.path.join(destino, "index.html"), "w") as f:
+        f.write(f"<!DOCTYPE html><html><head><title>All products</title></head><body>{lateral}</body></html>")
+
+    numero = 0
+    for _, slug, quantidade in cats:
+        pasta = os.path.join(destino, "catalogue", "category", "books", slug)
+        os.makedirs(pasta, exist_ok=True)
+        total_paginas = (quantidade + 19) // 20
+        for pagina in range(total_paginas):
+            produtos = []
+            for _ in range(min(20, quantidade - pagina * 20)):
+                numero += 1
+                titulo = " ".join(aleatorio.choice(palavras).title() for _ in range(3)) + f" {numero}"
+                produtos.append(
+                    '<li><article class="product_pod">'
+                    f'<div class="image_container"><a href="../../../livro_{numero}/index.html">'
+                    f'<img src="../../../../media/cache/{numero}.jpg" alt="{titulo}" class="thumbnail"></a></div>'
+                    f'<p class="star-rating {aleatorio.choice(["One", "Two", "Three", "Four", "Five"])}">'
+                    '<i class="icon-star"></i></p>'
+                    f'<h3><a href="../../../livro_{numero}/index.html" title="{titulo}">{titulo[:10]}...</a></h3>'
+                    f'<div class="product_price"><p class="price_color">£{aleatorio.uniform(10, 60):.2f}</p>'
+                    '<p class="instock availability"><i class="icon-ok"></i>\n        In stock\n</p></div>'
+                    "</article></li>"
+                )
+            proxima = (
+                f'<li class="next"><a href="page-{pagina + 2}.html">next</a></li>'
+                if pagina + 1 < total_paginas else ""
+            )
+            arquivo = "index.html" if pagina == 0 else f"page-{pagina + 1}.html"
+            with open(os.path.join(pasta, arquivo), "w") as f:
+                f.write(
+                    f'<!DOCTYPE html><html><body>{lateral}<ol class="row">{"".join(produtos)}</ol>'
+                    f'<ul class="pager"><li class="current">Page {pagina + 1} of {total_paginas}</li>{proxima}</ul>'
+                    "</body></html>"
+                )
+    return numero
+
+
+class _ManipuladorReplay(SimpleHTTPRequestHandler):
+    """Serve os arquivos gravados com ETag (hash do conteúdo), Last-Modified e latência simulada."""
+
+    atraso = 0.0
+    _etags = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _etag(self, arquivo: str) -> str:
+        chave = (arquivo, os.path.getmtime(arquivo))
+        if chave not in self._etags:
+            with open(arquivo, "rb") as f:
+                self._etags[chave] = '"' + hashlib.sha256(f.read()).hexdigest()[:32] + '"'
+        return self._etags[chave]
+
+    def do_GET(self):
+        if self.atraso:
+            time.sleep(self.atraso)
+        arquivo = self.translate_path(self.path)
+        if os.path.isdir(arquivo):
+            arquivo = os.path.join(arquivo, "index.html")
+        self._etag_atual = self._etag(arquivo) if os.path.isfile(arquivo) else None
+
+        if self._etag_atual and self.headers.get("If-None-Match") == self._etag_atual:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return
+        super().do_GET()
+
+    def end_headers(self):
+        if getattr(self, "_etag_atual", None):
+            self.send_header("ETag", self._etag_atual)
+        super().end_headers()
+
+
+class _ServidorReplay(ThreadingHTTPServer):
+    daemon_threads = True
+    # A fila padrão (5) descarta conexões simultâneas e o cliente só tenta de novo após 1 s
+    request_queue_size = 128
+
+
+def inicia_servidor(origem: str, porta: int = 0, latencia_ms: float = 0.0) -> _ServidorReplay:
+    """
+    Sobe o servidor de replay em uma thread e o retorna (porta 0 escolhe uma livre;
+    a URL base é http://127.0.0.1:<servidor.server_port>/). Encerre com shutdown().
+    """
+    manipulador = type("ManipuladorReplay", (_ManipuladorReplay,), {"atraso": latencia_ms / 1000})
+    servidor = _ServidorReplay(("127.0.0.1", porta), partial(manipulador, directory=origem))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    gravar = comandos.add_parser("gravar", help="Grava o site em um diretório local")
+    gravar.add_argument("--base-url", default="https://books.toscrape.com/")
+    gravar.add_argument("--destino", required=True)
+
+    gerar = comandos.add_parser("gerar", help="Gera um site sintético com a mesma marcação")
+    gerar.add_argument("--destino", required=True)
+    gerar.add_argument("--categorias", type=int, default=50)
+    gerar.add_argument("--livros", type=int, default=1000)
+    gerar.add_argument("--semente", type=int, default=1)
+
+    servir = comandos.add_parser("servir", help="Serve um diretório gravado ou gerado")
+    servir.add_argument("--origem", required=True)
+    servir.add_argument("--porta", type=int, default=8765)
+    servir.add_argument("--latencia-ms", type=float, default=0.0)
+
+    args = parser.parse_args()
+    if args.comando == "gravar":
+        manifesto = grava_site(args.base_url, args.destino)
+        print(f"{len(manifesto['paginas'])} páginas gravadas em {args.destino}.")
+    elif args.comando == "gerar":
+        total = gera_site_sintetico(args.destino, args.categorias, args.livros, args.semente)
+        print(f"Site sintético com {total} livros gerado em {args.destino}.")
+    else:
+        servidor = inicia_servidor(args.origem, args.porta, args.latencia_ms)
+        print(f"Servindo {args.origem} em http://127.0.0.1:{servidor.server_port}/ (Ctrl+C para encerrar)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
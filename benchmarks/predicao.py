@@ -0,0 +1,159 @@
+"""
+Benchmark da predição: um livro por chamada (como em POST /ml/predictions)
+contra o lote inteiro de uma vez (como em POST /ml/predictions/batch), cada um
+com o pré-processamento em pandas e com o mapeador de features compilado.
+
+Um catálogo sintético é gravado em um SQLite temporário, os artefatos são
+treinados com o mesmo pré-processamento da aplicação e cada caminho prediz o
+catálogo inteiro. O comando confere que o mapeador produz as mesmas features,
+bit a bit, e que todos os caminhos dão as mesmas predições.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.predicao
+    python -m benchmarks.predicao --livros 5000 --modelo regressao_logistica
+"""
+import argparse
+import atexit
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+_temporario = tempfile.mkdtemp(prefix="bench_predicao_")
+atexit.register(shutil.rmtree, _temporario, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_temporario, 'catalogo.db')}"
+# Feature store próprio: não escreve na árvore de trabalho nem reaproveita entradas de outra execução
+os.environ["ML_FEATURE_STORE_DIR"] = os.path.join(_temporario, "feature_store")
+
+PALAVRAS = "light attic python dream night sea city war love king star river secret house garden".split()
+
+
+def catalogo_sintetico(livros: int, categorias: int = 50, semente: int = 1) -> list:
+    """Livros no formato gravado pela raspagem, determinísticos para uma mesma semente."""
+    aleatorio = random.Random(semente)
+    return [
+        {
+            "titulo": " ".join(aleatorio.choice(PALAVRAS).title() for _ in range(3)) + f" {numero}",
+            "preco": round(aleatorio.uniform(10, 60), 2),
+            "rating": aleatorio.randint(1, 5),
+            "disponibilidade": aleatorio.random() < 0.9,
+            "categoria": f"Categoria {aleatorio.randrange(categorias)}",
+            "imagem": f"https://exemplo/{numero}.jpg",
+        }
+        for numero in range(livros)
+    ]
+
+
+def grava_catalogo_sintetico(livros: int) -> list:
+    """Grava o catálogo sintético no SQLite temporário (DATABASE_URL) e devolve os livros gravados."""
+    import src.consultaLivros.main  # noqa: F401  (registra os modelos do SQLAlchemy)
+    from src.consultaLivros.db.database import SessionLocal, cria_banco
+    from src.consultaLivros.repositorios.livros_repositorio import salva_dados_livros
+
+    dados = catalogo_sintetico(livros)
+    cria_banco()
+    db = SessionLocal()
+    try:
+        salva_dados_livros(db, dados, atualiza_caches=False)
+    finally:
+        db.close()
+    return dados
+
+
+def prepara_artefatos(livros: int, nome_modelo: str):
+    """Grava o catálogo e treina encoder, TF-IDF e o modelo pedido. Retorna (livros, encoder, tfidf, modelo)."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import SVC
+
+    from src.consultaLivros.db.database import SessionLocal
+    from src.consultaLivros.ml.preparacao_dados import preparar_dados_livros
+    from src.consultaLivros.schemas.livros import LivroBase
+
+    dados = grava_catalogo_sintetico(livros)
+    db = SessionLocal()
+    try:
+        features_df, encoder, tfidf = preparar_dados_livros(db)
+    finally:
+        db.close()
+
+    modelos = {
+        "random_forest": RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=1, class_weight='balanced'),
+        "regressao_logistica": LogisticRegression(random_state=42, class_weight='balanced', max_iter=1000),
+        "svm": SVC(random_state=42, class_weight='balanced'),
+    }
+    modelo = modelos[nome_modelo]
+    y = (features_df['rating'] >= 4).astype(int)
+    modelo.fit(features_df.drop(columns=['rating']), y)
+    return [LivroBase(**livro) for livro in dados], encoder, tfidf, modelo
+
+
+def _mede(funcao, repeticoes: int = 1):
+    """Executa `funcao` e devolve (resultado, segundos por execução)."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) / repeticoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--livros", type=int, default=1000)
+    parser.add_argument("--modelo", default="random_forest", choices=["random_forest", "regressao_logistica", "svm"])
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from src.consultaLivros.ml.mapeador_features import MapeadorFeatures
+    from src.consultaLivros.ml.preparacao_dados import preparar_input_para_predicao, preparar_lote_para_predicao
+
+    livros, encoder, tfidf, modelo = prepara_artefatos(args.livros, args.modelo)
+    colunas = modelo.feature_names_in_
+    mapeador = MapeadorFeatures(encoder, tfidf, colunas, modelo)
+
+    # Pré-processamento de um livro por vez: o custo pago por POST /ml/predictions
+    matrizes_pandas, preparo_pandas = _mede(
+        lambda: [preparar_input_para_predicao(livro, encoder, tfidf, colunas).to_numpy(dtype=np.float64) for livro in livros]
+    )
+    matrizes_mapeador, preparo_mapeador = _mede(lambda: [mapeador.transforma(livro) for livro in livros])
+    predicao_unica = _mede(lambda: mapeador.prediz(matrizes_mapeador[0]), repeticoes=50)[1]
+
+    por_livro, duracao_por_livro = _mede(
+        lambda: [int(modelo.predict(preparar_input_para_predicao(livro, encoder, tfidf, colunas))[0]) for livro in livros]
+    )
+    por_livro_mapeador, duracao_por_livro_mapeador = _mede(
+        lambda: [int(mapeador.prediz(mapeador.transforma(livro))[0]) for livro in livros]
+    )
+    em_lote, duracao_lote = _mede(
+        lambda: [int(p) for p in modelo.predict(preparar_lote_para_predicao(livros, encoder, tfidf, colunas))]
+    )
+    em_lote_mapeador, duracao_lote_mapeador = _mede(
+        lambda: [int(p) for p in mapeador.prediz(mapeador.transforma_lote(livros))]
+    )
+
+    total = len(livros)
+    print(f"\n{total} livros, modelo {args.modelo}")
+    print(f"Pré-processamento de um livro: pandas {preparo_pandas / total * 1e6:.0f} µs, "
+          f"mapeador {preparo_mapeador / total * 1e6:.1f} µs ({preparo_pandas / preparo_mapeador:.0f}x); "
+          f"predict de uma linha: {predicao_unica * 1e6:.0f} µs")
+    print(f"{'caminho':<24}{'duração(s)':>12}{'livros/s':>12}")
+    for nome, duracao in (
+        ("por livro (pandas)", duracao_por_livro),
+        ("por livro (mapeador)", duracao_por_livro_mapeador),
+        ("lote (pandas)", duracao_lote),
+        ("lote (mapeador)", duracao_lote_mapeador),
+    ):
+        print(f"{nome:<24}{duracao:>12.3f}{total / duracao:>12.0f}")
+
+    identicas = all(a.tobytes() == b.tobytes() for a, b in zip(matrizes_pandas, matrizes_mapeador))
+    print(f"Features do mapeador idênticas bit a bit às do pandas: {'sim' if identicas else 'NÃO'}")
+    if not identicas or not (por_livro == por_livro_mapeador == em_lote == em_lote_mapeador):
+        print("Divergência: os caminhos deram features ou predições diferentes.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark de vazão da raspagem contra uma cópia local do site (sem rede).
+
+Para cada backend e nível de concorrência, mede páginas/s, livros/s, pico de
+memória (RSS) e o tempo de cada categoria. Cada configuração roda em um
+subprocesso, para que o pico de RSS de uma não contamine a outra. Só a
+raspagem é medida: nada é gravado no banco.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.raspagem
+    python -m benchmarks.raspagem --origem fixtures/toscrape --backends http selenium --concorrencia 1 4 8
+    python -m benchmarks.raspagem --latencia-ms 50 --json resultado.json --minimo-paginas-s 20
+
+Sem --origem, um site sintético do tamanho do books.toscrape.com (50 categorias,
+1000 livros) é gerado em um diretório temporário. --latencia-ms simula a latência
+do site real, o que torna visível o ganho da concorrência. Com --minimo-paginas-s
+o comando termina com código 1 se alguma configuração ficar abaixo do limite
+(uso em CI). O pico de RSS do backend Selenium não inclui o processo do Chrome.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# A raspagem medida não usa o banco, mas importar o scraper cria o engine
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def _executa_configuracao(base_url: str, backend: str, concorrencia: int) -> dict:
+    """Raspa o site inteiro com um backend e concorrência, sem gravar, e devolve as métricas."""
+    from src.consultaLivros.raspagem import chrome_scraper
+    from src.consultaLivros.raspagem.pipeline import itera_paginas_em_ordem
+    from src.consultaLivros.raspagem.politica import LimitadorPorHost
+
+    # O limite por host acompanha a concorrência medida
+    pool = chrome_scraper.PoolDeScrapers(backend, concorrencia, LimitadorPorHost(concorrencia))
+    tempos_categoria = {}
+    try:
+        inicio = time.perf_counter()
+        categorias = pool.principal.lista_categorias(base_url)
+
+        def produz_paginas(categoria: dict):
+            inicio_categoria = time.perf_counter()
+            with pool.empresta() as instancia:
+                yield from instancia.itera_paginas_categoria(categoria['url'], categoria['nome'])
+            tempos_categoria[categoria['nome']] = time.perf_counter() - inicio_categoria
+
+        paginas, livros = 1, 0  # a página inicial também conta
+        for _, pagina, _ in itera_paginas_em_ordem(categorias, produz_paginas, pool.tamanho):
+            if pagina:
+                paginas += 1
+                livros += len(pagina.livros)
+        duracao = time.perf_counter() - inicio
+    finally:
+        pool.fechar()
+
+    tempos = sorted(tempos_categoria.values())
+    return {
+        "backend": backend,
+        "concorrencia": concorrencia,
+        "categorias": len(categorias),
+        "paginas": paginas,
+        "livros": livros,
+        "duracao_s": round(duracao, 3),
+        "paginas_por_s": round(paginas / duracao, 1),
+        "livros_por_s": round(livros / duracao, 1),
+        # ru_maxrss é em KiB no Linux
+        "pico_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "categoria_mediana_s": round(tempos[len(tempos) // 2], 3) if tempos else 0.0,
+        "categoria_max_s": round(tempos[-1], 3) if tempos else 0.0,
+        "tempos_categoria_s": {nome: round(t, 3) for nome, t in tempos_categoria.items()},
+    }
+
+
+def _roda_em_subprocesso(base_url: str, backend: str, concorrencia: int) -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.raspagem", "--interno", base_url, backend, str(concorrencia)],
+        capture_output=True, text=True,
+    )
+    if saida.returncode != 0:
+        ultima_linha = (saida.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+        return {"backend": backend, "concorrencia": concorrencia, "erro": ultima_linha}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origem", help="Diretório gravado/gerado por benchmarks.fixtures_raspagem")
+    parser.add_argument("--backends", nargs="+", default=["http"], choices=["http", "selenium"])
+    parser.add_argument("--concorrencia", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--json", help="Arquivo onde gravar os resultados completos")
+    parser.add_argument("--minimo-paginas-s", type=float, help="Falha se alguma configuração ficar abaixo")
+    parser.add_argument("--interno", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        base_url, backend, concorrencia = args.interno
+        print(json.dumps(_executa_configuracao(base_url, backend, int(concorrencia))))
+        return
+
+    from benchmarks.fixtures_raspagem import gera_site_sintetico, inicia_servidor
+
+    with tempfile.TemporaryDirectory() as temporario:
+        origem = args.origem
+        if not origem:
+            origem = temporario
+            total = gera_site_sintetico(origem)
+            print(f"Site sintético com {total} livros gerado em {origem}.")
+
+        servidor = inicia_servidor(origem, latencia_ms=args.latencia_ms)
+        base_url = f"http://127.0.0.1:{servidor.server_port}/"
+        try:
+            resultados = [
+                _roda_em_subprocesso(base_url, backend, concorrencia)
+                for backend in args.backends
+                for concorrencia in args.concorrencia
+            ]
+        finally:
+            servidor.shutdown()
+
+    print(f"\nLatência simulada: {args.latencia_ms:.0f} ms por requisição")
+    print(f"{'backend':<10}{'conc.':>6}{'páginas':>9}{'livros':>8}{'duração(s)':>12}"
+          f"{'pág/s':>9}{'livros/s':>10}{'RSS(MB)':>9}{'cat. mediana(s)':>17}{'cat. máx(s)':>13}")
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['backend']:<10}{r['concorrencia']:>6}  erro: {r['erro']}")
+            continue
+        print(f"{r['backend']:<10}{r['concorrencia']:>6}{r['paginas']:>9}{r['livros']:>8}{r['duracao_s']:>12.2f}"
+              f"{r['paginas_por_s']:>9.1f}{r['livros_por_s']:>10.1f}{r['pico_rss_mb']:>9.1f}"
+              f"{r['categoria_mediana_s']:>17.3f}{r['categoria_max_s']:>13.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"latencia_ms": args.latencia_ms, "resultados": resultados}, f, indent=2)
+        print(f"\nResultados completos (com o tempo de cada categoria) em {args.json}.")
+
+    if args.minimo_paginas_s is not None:
+        abaixo = [r for r in resultados if "erro" in r or r["paginas_por_s"] < args.minimo_paginas_s]
+        if abaixo:
+            print(f"\nRegressão: {len(abaixo)} configuração(ões) abaixo de {args.minimo_paginas_s} páginas/s.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark do treinamento: features em DataFrame denso (float64) contra a
+matriz esparsa CSR float32, os dois caminhos de treinar_e_carregar_modelos_em_cache.
+
+Um catálogo sintético é gravado em um SQLite temporário, com um feature store
+também temporário (as features são sempre preparadas do zero), e cada caminho roda em
+um subprocesso, para que o pico de memória (RSS) de um não contamine o outro.
+Os modelos são treinados em sequência dentro do próprio processo (n_jobs=1),
+para que o pico inclua o treino; na aplicação eles rodam em paralelo.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.treinamento
+    python -m benchmarks.treinamento --livros 20000 --json treino.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+
+def _rss_mb() -> float:
+    # ru_maxrss é em KiB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _executa_caminho(esparso: bool) -> dict:
+    """Prepara as features e treina os modelos com um dos caminhos, medindo tempo e memória."""
+    import src.consultaLivros.main  # noqa: F401  (registra os modelos do SQLAlchemy)
+    from src.consultaLivros.db.database import SessionLocal
+    from src.consultaLivros.ml.treinamento_modelo import prepara_dados_treino, treina_modelos
+
+    rss_inicial = _rss_mb()
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        X, y, colunas, _, _ = prepara_dados_treino(db, esparso)
+        duracao_preparo = time.perf_counter() - inicio
+    finally:
+        db.close()
+
+    if esparso:
+        bytes_matriz = X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    else:
+        bytes_matriz = int(X.memory_usage(deep=True).sum())
+    rss_preparo = _rss_mb()
+
+    inicio = time.perf_counter()
+    _, metricas = treina_modelos(X, y, n_jobs=1)
+    duracao_treino = time.perf_counter() - inicio
+
+    return {
+        "caminho": "esparso" if esparso else "denso",
+        "livros": X.shape[0],
+        "colunas": X.shape[1],
+        "matriz_mb": round(bytes_matriz / 2**20, 2),
+        "preparo_s": round(duracao_preparo, 3),
+        "treino_s": round(duracao_treino, 3),
+        "rss_inicial_mb": rss_inicial,
+        "pico_rss_preparo_mb": rss_preparo,
+        "pico_rss_mb": _rss_mb(),
+        "acuracia": {nome: round(m["acuracia"], 4) for nome, m in metricas.items()},
+    }
+
+
+def _roda_em_subprocesso(caminho: str) -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.treinamento", "--interno", caminho],
+        capture_output=True, text=True,
+    )
+    if saida.returncode != 0:
+        ultima_linha = (saida.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+        return {"caminho": caminho, "erro": ultima_linha}
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--livros", type=int, default=5000)
+    parser.add_argument("--json", help="Arquivo onde gravar os resultados completos")
+    parser.add_argument("--interno", choices=["denso", "esparso"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.interno:
+        # O subprocesso herda o DATABASE_URL e o ML_FEATURE_STORE_DIR temporários do processo pai
+        print(json.dumps(_executa_caminho(args.interno == "esparso")))
+        return
+
+    from benchmarks.predicao import _temporario, grava_catalogo_sintetico
+
+    # Já definido por benchmarks.predicao; explícito aqui porque os subprocessos dependem dele
+    os.environ["ML_FEATURE_STORE_DIR"] = os.path.join(_temporario, "feature_store")
+    grava_catalogo_sintetico(args.livros)
+    resultados = [_roda_em_subprocesso(caminho) for caminho in ("denso", "esparso")]
+
+    print(f"\n{args.livros} livros")
+    print(f"{'caminho':<10}{'colunas':>9}{'matriz(MB)':>12}{'preparo(s)':>12}{'treino(s)':>11}"
+          f"{'RSS inicial':>13}{'pico preparo':>14}{'pico RSS':>10}")
+    for r in resultados:
+        if "erro" in r:
+            print(f"{r['caminho']:<10}  erro: {r['erro']}")
+            continue
+        print(f"{r['caminho']:<10}{r['colunas']:>9}{r['matriz_mb']:>12.2f}{r['preparo_s']:>12.3f}{r['treino_s']:>11.3f}"
+              f"{r['rss_inicial_mb']:>13.1f}{r['pico_rss_preparo_mb']:>14.1f}{r['pico_rss_mb']:>10.1f}")
+    for r in resultados:
+        if "erro" not in r:
+            print(f"Acurácia ({r['caminho']}): {r['acuracia']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"livros": args.livros, "resultados": resultados}, f, indent=2)
+        print(f"\nResultados completos em {args.json}.")
+
+
+if __name__ == "__main__":
+    main()
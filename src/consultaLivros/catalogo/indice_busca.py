@@ -0,0 +1,165 @@
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..modelos.livros import Livro
+from ..repositorios import versao_catalogo_repositorio
+
+# Índices GIN de trigramas usados pela busca no PostgreSQL. São criados aqui,
+# e não pelo create_all, porque o create_all não altera tabelas já existentes.
+DDL_INDICES_TRIGRAM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_livros_titulo_trgm ON livros USING gin (titulo gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_livros_categoria_trgm ON livros USING gin (categoria gin_trgm_ops)",
+]
+
+_PADRAO_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Estado do índice em memória (usado fora do PostgreSQL ou sem pg_trgm)
+_estado = {
+    "indice": None,
+    "geracao": 0,
+    "trigram_disponivel": False,
+    "lock": threading.Lock(),
+}
+
+
+def tokeniza(texto: Optional[str]) -> List[str]:
+    """Quebra um texto em tokens minúsculos."""
+    return _PADRAO_TOKEN.findall(texto.lower()) if texto else []
+
+
+class IndiceInvertido:
+    """
+    Índice invertido de títulos em memória, com ranking TF-IDF.
+
+    Mantém a semântica do ILIKE '%termo%' da busca original: um livro é
+    retornado se o seu título contiver o texto da consulta, em qualquer
+    posição e sem diferenciar maiúsculas de minúsculas. Os candidatos vêm dos
+    tokens do vocabulário que contêm cada termo (o vocabulário é bem menor que
+    o catálogo), e só os candidatos têm o título completo conferido. O filtro
+    de categoria também é por substring.
+    """
+
+    def __init__(self, livros: Iterable[Tuple[int, str, str]], versao: Optional[int] = None):
+        self.versao = versao  # versão do catálogo (versao_catalogo) usada na construção
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)
+        self._titulos: dict[int, str] = {}
+        self._ids_por_categoria: dict[str, List[int]] = defaultdict(list)
+        self.total_livros = 0
+
+        for livro_id, titulo, categoria in livros:
+            self.total_livros += 1
+            self._titulos[livro_id] = (titulo or "").lower()
+            for token in tokeniza(titulo):
+                self._postings[token][livro_id] = self._postings[token].get(livro_id, 0) + 1
+            self._ids_por_categoria[(categoria or "").lower()].append(livro_id)
+
+        self._vocabulario = list(self._postings)
+
+    def _ids_da_categoria(self, categoria: str) -> set[int]:
+        termo = categoria.lower()
+        return {
+            livro_id
+            for nome, ids in self._ids_por_categoria.items() if termo in nome
+            for livro_id in ids
+        }
+
+    def busca(self, titulo: Optional[str], categoria: Optional[str]) -> List[int]:
+        """Retorna os IDs que casam com a consulta, do mais relevante para o menos relevante."""
+        permitidos = self._ids_da_categoria(categoria) if categoria else None
+        if not titulo:
+            return sorted(permitidos) if permitidos is not None else []
+
+        consulta = titulo.lower()
+        termos = tokeniza(titulo)
+        pontuacao: dict[int, float] = {}
+        if not termos:
+            # Só pontuação ou espaços: confere todos os títulos, como o ILIKE
+            pontuacao = {i: 0.0 for i, titulo_livro in self._titulos.items() if consulta in titulo_livro}
+
+        for posicao, termo in enumerate(termos):
+            pontos_termo: dict[int, float] = defaultdict(float)
+            for token in self._vocabulario:
+                if termo not in token:
+                    continue
+                postings = self._postings[token]
+                idf = math.log(1 + self.total_livros / len(postings))
+                # Token inteiro vale mais que prefixo, que vale mais que trecho no meio da palavra
+                peso = idf if token == termo else idf / 2 if token.startswith(termo) else idf / 4
+                for livro_id, freq in postings.items():
+                    pontos_termo[livro_id] += freq * peso
+
+            if posicao == 0:
+                pontuacao = dict(pontos_termo)
+            else:
+                pontuacao = {i: p + pontos_termo[i] for i, p in pontuacao.items() if i in pontos_termo}
+            if not pontuacao:
+                return []
+
+        # Com mais de um termo, o texto da consulta precisa aparecer inteiro e na ordem
+        pontuacao = {
+            i: p for i, p in pontuacao.items()
+            if consulta in self._titulos[i] and (permitidos is None or i in permitidos)
+        }
+        return sorted(pontuacao, key=lambda livro_id: (-pontuacao[livro_id], livro_id))
+
+
+def configura_indices_trigram(engine: Engine) -> bool:
+    """
+    Cria a extensão pg_trgm e os índices GIN de título e categoria no PostgreSQL.
+    Retorna True se a busca por trigramas estiver disponível; caso contrário
+    (outro banco ou falta de permissão), a busca usa o índice em memória.
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    try:
+        with engine.begin() as conn:
+            for ddl in DDL_INDICES_TRIGRAM:
+                conn.execute(text(ddl))
+        _estado["trigram_disponivel"] = True
+        logging.info("Índices de trigramas (pg_trgm) prontos para a busca de livros.")
+    except SQLAlchemyError as e:
+        logging.warning(f"Não foi possível criar os índices pg_trgm; usando índice em memória: {e}")
+    return _estado["trigram_disponivel"]
+
+
+def trigram_disponivel() -> bool:
+    return _estado["trigram_disponivel"]
+
+
+def invalida_indice():
+    """Descarta o índice em memória deste processo; ele é reconstruído na próxima busca."""
+    with _estado["lock"]:
+        _estado["indice"] = None
+        _estado["geracao"] += 1
+
+
+async def obtem_indice(db: AsyncSession) -> IndiceInvertido:
+    """
+    Retorna o índice em memória, reconstruindo-o a partir da tabela livros se
+    necessário. O índice é ligado à versão do catálogo: uma alteração feita por
+    outro worker (ou outra instância) também faz este processo reconstruí-lo.
+    """
+    # A versão é lida antes dos livros, como no feature store
+    versao = await versao_catalogo_repositorio.busca_versao_async(db)
+    indice = _estado["indice"]
+    if indice is not None and indice.versao == versao:
+        return indice
+
+    geracao = _estado["geracao"]
+    resultado = await db.execute(select(Livro.id, Livro.titulo, Livro.categoria))
+    indice = IndiceInvertido(resultado.all(), versao)
+
+    with _estado["lock"]:
+        # Só publica se o catálogo não mudou neste processo enquanto o índice era construído
+        if _estado["geracao"] == geracao:
+            _estado["indice"] = indice
+    logging.info(f"Índice de busca em memória construído com {indice.total_livros} livros (catálogo v{versao}).")
+    return indice
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..db.database import SessionLocal
+from ..modelos.livros import Livro
+from ..repositorios import versao_catalogo_repositorio
+
+# Ativa o snapshot em memória do catálogo para as rotas de leitura
+CATALOGO_EM_MEMORIA = os.getenv("CATALOGO_EM_MEMORIA", "false").lower() in ("1", "true", "sim")
+
+# Intervalo mínimo entre duas consultas à versão do catálogo (0 = a cada leitura).
+# Uma alteração feita por outro worker aparece depois de no máximo este tempo.
+CATALOGO_VERSAO_VERIFICACAO_SEGUNDOS = float(os.getenv("CATALOGO_VERSAO_VERIFICACAO_SEGUNDOS", "1"))
+
+# Intervalo da reconstrução periódica, mantida como salvaguarda da verificação da versão
+CATALOGO_SNAPSHOT_INTERVALO_SEGUNDOS = int(os.getenv("CATALOGO_SNAPSHOT_INTERVALO_SEGUNDOS", "300"))
+
+# Colunas carregadas no snapshot, na ordem de LivroRegistro
+_COLUNAS = (Livro.id, Livro.titulo, Livro.preco, Livro.rating, Livro.disponibilidade, Livro.categoria, Livro.imagem)
+
+_estado = {
+    "snapshot": None,
+    "lock": threading.Lock(),  # Serializa reconstruções concorrentes (scraper, admin, agendador)
+    "lock_leitura": None,  # asyncio.Lock das reconstruções feitas pelas rotas (criado no event loop)
+    "verificado_em": 0.0,  # time.monotonic() da última consulta à versão
+}
+
+
+class LivroRegistro:
+    """Registro compacto e somente leitura de um livro do snapshot."""
+
+    __slots__ = ("id", "titulo", "preco", "rating", "disponibilidade", "categoria", "imagem")
+
+    def __init__(self, id, titulo, preco, rating, disponibilidade, categoria, imagem):
+        self.id = id
+        self.titulo = titulo
+        self.preco = preco
+        self.rating = rating
+        self.disponibilidade = disponibilidade
+        self.categoria = categoria
+        self.imagem = imagem
+
+
+def _estatisticas(livros: List[LivroRegistro]) -> dict:
+    distribuicao = defaultdict(int)
+    for livro in livros:
+        distribuicao[livro.rating] += 1
+    precos = [livro.preco for livro in livros if livro.preco is not None]
+    return {
+        "total_livros": len(livros),
+        "preco_medio": sum(precos) / len(precos) if precos else 0.0,
+        "distribuicao_ratings": dict(distribuicao),
+    }
+
+
+class CatalogoSnapshot:
+    """
+    Cópia imutável da tabela livros, com as respostas das rotas de leitura
+    pré-calculadas. Uma nova instância é construída a cada alteração do
+    catálogo e publicada por troca de referência, então os leitores nunca
+    veem um snapshot pela metade.
+    """
+
+    def __init__(self, livros: List[LivroRegistro], versao: Optional[int] = None):
+        self.versao = versao  # versão do catálogo (versao_catalogo) lida antes dos livros
+        self.livros = sorted(livros, key=lambda livro: livro.id)
+        self._ids = [livro.id for livro in self.livros]
+        self._por_id = {livro.id: livro for livro in self.livros}
+
+        # Índice de preços ordenado por (preço, id), consultado com bisect
+        self._por_preco = sorted(
+            (livro for livro in self.livros if livro.preco is not None),
+            key=lambda livro: (livro.preco, livro.id)
+        )
+        self._chaves_preco = [(livro.preco, livro.id) for livro in self._por_preco]
+
+        self.top_rated = sorted(self.livros, key=lambda livro: (-(livro.rating or 0), livro.id))[:10]
+        self.categorias = list(dict.fromkeys(livro.categoria for livro in self.livros))
+
+        livros_por_categoria: Dict[str, List[LivroRegistro]] = defaultdict(list)
+        for livro in self.livros:
+            livros_por_categoria[livro.categoria].append(livro)
+
+        self.estatisticas_gerais = _estatisticas(self.livros)
+        self.estatisticas_por_categoria = {
+            categoria: _estatisticas(livros_categoria)
+            for categoria, livros_categoria in livros_por_categoria.items()
+        }
+
+    def busca_todos_livros(self, skip: int = 0, limit: int = 100) -> List[LivroRegistro]:
+        return self.livros[skip:skip + limit]
+
+    def busca_livros_apos_id(self, apos_id: int, limit: int = 100) -> List[LivroRegistro]:
+        inicio = bisect_right(self._ids, apos_id)
+        return self.livros[inicio:inicio + limit]
+
+    def busca_livro_por_id(self, livro_id: int) -> Optional[LivroRegistro]:
+        return self._por_id.get(livro_id)
+
+    def busca_livros_por_preco(
+        self,
+        min_preco: float,
+        max_preco: float,
+        limit: int = 100,
+        apos: Optional[Tuple[float, int]] = None,
+        ordem: str = "asc"
+    ) -> List[LivroRegistro]:
+        """Mesma semântica de livros_repositorio_async.busca_livros_por_preco, em O(log n + limit)."""
+        inicio = bisect_left(self._chaves_preco, (min_preco, float("-inf")))
+        fim = bisect_right(self._chaves_preco, (max_preco, float("inf")))
+
+        if ordem == "desc":
+            if apos is not None:
+                fim = min(fim, bisect_left(self._chaves_preco, apos))
+            return self._por_preco[max(inicio, fim - limit):fim][::-1]
+
+        if apos is not None:
+            inicio = max(inicio, bisect_right(self._chaves_preco, apos))
+        return self._por_preco[inicio:min(fim, inicio + limit)]
+
+
+def _publica(snapshot: CatalogoSnapshot):
+    """Publica o snapshot, a menos que um de versão mais nova já tenha sido publicado. Chamar com o lock."""
+    atual = _estado["snapshot"]
+    if atual is None or atual.versao is None or snapshot.versao is None or atual.versao <= snapshot.versao:
+        _estado["snapshot"] = snapshot
+
+
+async def obtem_snapshot(db: AsyncSession) -> Optional[CatalogoSnapshot]:
+    """
+    Retorna o snapshot atual, ou None se o modo em memória estiver desligado.
+    Como o índice de busca, o snapshot é ligado à versão do catálogo: se outro
+    worker alterou o catálogo, ele é reconstruído antes de responder. A versão é
+    consultada no máximo a cada CATALOGO_VERSAO_VERIFICACAO_SEGUNDOS.
+    """
+    if not CATALOGO_EM_MEMORIA:
+        return None
+    snapshot = _estado["snapshot"]
+    if snapshot is not None and time.monotonic() - _estado["verificado_em"] < CATALOGO_VERSAO_VERIFICACAO_SEGUNDOS:
+        return snapshot
+
+    if _estado["lock_leitura"] is None:
+        _estado["lock_leitura"] = asyncio.Lock()
+    async with _estado["lock_leitura"]:  # uma única reconstrução mesmo com muitas requisições
+        versao = await versao_catalogo_repositorio.busca_versao_async(db)
+        _estado["verificado_em"] = time.monotonic()
+        snapshot = _estado["snapshot"]
+        if snapshot is not None and snapshot.versao == versao:
+            return snapshot
+
+        resultado = await db.execute(select(*_COLUNAS))
+        snapshot = CatalogoSnapshot([LivroRegistro(*linha) for linha in resultado.all()], versao)
+        with _estado["lock"]:
+            _publica(snapshot)
+    logging.info(f"Snapshot do catálogo reconstruído com {len(snapshot.livros)} livros (catálogo v{versao}).")
+    return snapshot
+
+
+def reconstroi_snapshot(db: Session):
+    """
+    Recarrega o catálogo do banco e publica um novo snapshot.
+    Não faz nada se o modo em memória estiver desligado.
+    """
+    if not CATALOGO_EM_MEMORIA:
+        return
+
+    with _estado["lock"]:
+        versao = versao_catalogo_repositorio.busca_versao(db)
+        linhas = db.query(*_COLUNAS).all()
+        _publica(CatalogoSnapshot([LivroRegistro(*linha) for linha in linhas], versao))
+    logging.info(f"Snapshot do catálogo reconstruído com {len(linhas)} livros.")
+
+
+def reconstroi_snapshot_periodico():
+    """Reconstrói o snapshot com uma sessão própria. Chamada pelo agendador."""
+    try:
+        with SessionLocal() as db:
+            reconstroi_snapshot(db)
+    except Exception as e:
+        logging.error(f"Falha ao reconstruir o snapshot do catálogo: {e}", exc_info=True)
@@ -1,6 +1,9 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -19,6 +22,28 @@ engine = create_engine(DATABASE_URL)
 # Cria uma fábrica de sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _converte_url_para_async(url: str) -> str:
+    """
+    Converte a URL síncrona do banco para o driver assíncrono equivalente:
+    asyncpg para PostgreSQL e aiosqlite para SQLite (execuções locais).
+    """
+    for prefixo in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefixo):
+            return "postgresql+asyncpg://" + url[len(prefixo):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# URL assíncrona: pode ser definida explicitamente ou derivada de DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _converte_url_para_async(DATABASE_URL)
+
+# Engine e fábrica de sessões assíncronas, usadas pelas rotas de leitura
+# para não bloquear o event loop durante as consultas
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Base declarativa que será usada por todos os modelos
 Base = declarative_base()
 
@@ -30,6 +55,15 @@ def cria_banco():
     """
     Base.metadata.create_all(bind=engine)
 
+    # O create_all não adiciona índices novos a tabelas que já existem;
+    # cria os que estiverem faltando.
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            try:
+                indice.create(bind=engine, checkfirst=True)
+            except SQLAlchemyError as e:
+                logging.warning(f"Não foi possível criar o índice {indice.name}: {e}")
+
 
 # Função para obter uma sessão do banco de dados
 def get_db():
@@ -37,4 +71,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
+        db.close()
+
+
+# Função para obter uma sessão assíncrona do banco de dados
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,24 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 from .rotas import api_livros, api_ml, api_token, api_usuarios, api_raspagem, api_admin
 from .db.database import cria_banco
-from .db.database import SessionLocal
-from .repositorios import logs_repositorio
+from .db.database import SessionLocal, engine, async_engine
+from .repositorios import logs_repositorio, estatisticas_repositorio, livros_repositorio, versao_catalogo_repositorio
+import threading
 import time
 from .modelos import logs, log_predicao
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from .jobs.limpeza_periodica import executar_limpeza_periodica
 from .ml.gerenciador_de_modelos import carregar_modelos_do_disco
+from .catalogo.indice_busca import configura_indices_trigram
+from .raspagem.chrome_scraper import SCRAPER_BACKEND_PADRAO
+from .raspagem.drivers import SELENIUM_POOL_PREAQUECER, pool_webdrivers
+from .catalogo.snapshot import (
+    CATALOGO_EM_MEMORIA,
+    CATALOGO_SNAPSHOT_INTERVALO_SEGUNDOS,
+    reconstroi_snapshot_periodico
+)
 
 
 # Cria uma instância do agendador
@@ -22,19 +32,42 @@ async def lifespan(app: FastAPI):
     """
     print("--- Iniciando a aplicação ---")
     cria_banco()
+    with SessionLocal() as db:
+        # Bancos populados antes do upsert podem ter livros repetidos, o que
+        # impede a criação do índice único da chave natural
+        if livros_repositorio.remove_livros_duplicados(db):
+            cria_banco()
+        estatisticas_repositorio.garante_estatisticas_consistentes(db)
+        # Dá ao banco um id de catálogo, usado nas chaves do feature store
+        versao_catalogo_repositorio.garante_registro(db)
+    configura_indices_trigram(engine)
 
     print("Carregando modelos de Machine Learning do disco...")
     carregar_modelos_do_disco()
 
     # Adiciona a tarefa de limpeza para rodar uma vez por dia
     scheduler.add_job(executar_limpeza_periodica, 'interval', days=1, id="limpeza_diaria")
+
+    if CATALOGO_EM_MEMORIA:
+        print("Carregando snapshot do catálogo em memória...")
+        reconstroi_snapshot_periodico()
+        scheduler.add_job(
+            reconstroi_snapshot_periodico, 'interval',
+            seconds=CATALOGO_SNAPSHOT_INTERVALO_SEGUNDOS, id="snapshot_catalogo"
+        )
     scheduler.start()
     print("Agendador de tarefas periódicas iniciado.")
 
+    if SCRAPER_BACKEND_PADRAO == "selenium" and SELENIUM_POOL_PREAQUECER:
+        # Abre os navegadores em segundo plano para não atrasar a inicialização
+        threading.Thread(target=pool_webdrivers.preaquece, args=(SELENIUM_POOL_PREAQUECER,), daemon=True).start()
+
     yield
     print("--- Encerrando a aplicação ---")
     scheduler.shutdown()
     print("Agendador de tarefas periódicas encerrado.")
+    pool_webdrivers.encerra()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Consulta Livros API",
@@ -56,20 +89,32 @@ async def log_requests_to_db(request: Request, call_next):
     if request.url.path.startswith(("/docs", "/openapi.json", "/health")):
         return response
 
+    # A gravação do log é síncrona; roda em uma thread para não bloquear o event loop
+    await run_in_threadpool(
+        _grava_log_request,
+        method=request.method,
+        path=request.url.path,
+        status_code=response.status_code,
+        process_time_ms=process_time
+    )
+
+    return response
+
+
+def _grava_log_request(method: str, path: str, status_code: int, process_time_ms: float):
+    """Grava o log de uma requisição usando uma sessão própria."""
     db = SessionLocal()
     try:
         logs_repositorio.cria_log_request(
             db=db,
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            process_time_ms=process_time
+            method=method,
+            path=path,
+            status_code=status_code,
+            process_time_ms=process_time_ms
         )
     finally:
         db.close()
 
-    return response
-
 # Incluindo os roteadores
 app.include_router(api_livros.router)
 app.include_router(api_ml.router)
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import joblib
+
+# Pasta dos artefatos de ML: versões em `versoes/<id>/` e o ponteiro `ATUAL` com o id em uso
+ML_MODELOS_DIR = os.getenv("ML_MODELOS_DIR", "modelos_ml")
+# Carrega os arrays NumPy dos modelos com memory map (páginas compartilhadas entre workers)
+ML_MODELOS_MMAP = os.getenv("ML_MODELOS_MMAP", "true").lower() in ("1", "true", "sim")
+# Versões mantidas em disco além da atual, para inspeção ou retorno manual
+ML_MODELOS_VERSOES_MANTIDAS = int(os.getenv("ML_MODELOS_VERSOES_MANTIDAS", "2"))
+
+# Incrementar quando o layout de uma versão mudar
+VERSAO_FORMATO = 1
+
+ARQUIVO_PONTEIRO = "ATUAL"
+ARQUIVO_MANIFESTO = "manifest.json"
+ARQUIVO_TRANSFORMADORES = "transformadores.joblib"
+
+_estado = {
+    "lock": threading.Lock(),  # Serializa as gravações deste processo
+    "ultima_carga": None,  # Descrição da última carga feita por este processo
+}
+
+
+def _pasta_versoes() -> str:
+    return os.path.join(ML_MODELOS_DIR, "versoes")
+
+
+def versao_atual() -> Optional[str]:
+    """Id da versão apontada por `ATUAL`, ou None se ainda não houver versões."""
+    try:
+        with open(os.path.join(ML_MODELOS_DIR, ARQUIVO_PONTEIRO)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _aponta_para(id_versao: str):
+    """Troca o ponteiro `ATUAL` de forma atômica (arquivo temporário + os.replace)."""
+    descritor, temporario = tempfile.mkstemp(prefix=".ATUAL-", dir=ML_MODELOS_DIR)
+    with os.fdopen(descritor, "w") as f:
+        f.write(id_versao)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, os.path.join(ML_MODELOS_DIR, ARQUIVO_PONTEIRO))
+
+
+def _remove_versoes_antigas(atual: str):
+    antigas = sorted(
+        nome for nome in os.listdir(_pasta_versoes())
+        if nome != atual and not nome.startswith(".")
+    )
+    # Um worker que ainda use arquivos removidos continua lendo o mapeamento já aberto
+    for nome in antigas[:max(0, len(antigas) - ML_MODELOS_VERSOES_MANTIDAS)]:
+        shutil.rmtree(os.path.join(_pasta_versoes(), nome), ignore_errors=True)
+
+
+def salva_versao(modelos: dict, metricas: dict, encoder, tfidf, colunas: dict) -> str:
+    """
+    Grava os modelos, o encoder, o TF-IDF, as métricas e a ordem das colunas de
+    cada modelo em uma nova pasta de versão e só então aponta `ATUAL` para ela. Um processo que carregue os
+    modelos ao mesmo tempo vê a versão anterior inteira ou a nova inteira.
+    Retorna o id da versão.
+    """
+    criado_em = datetime.now(timezone.utc)
+    id_versao = f"{criado_em.strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:8]}"
+
+    with _estado["lock"]:
+        os.makedirs(_pasta_versoes(), exist_ok=True)
+        temporaria = tempfile.mkdtemp(prefix=f".{id_versao}-", dir=_pasta_versoes())
+        try:
+            # Sem compressão: é o que permite abrir os arrays com mmap_mode
+            joblib.dump((encoder, tfidf), os.path.join(temporaria, ARQUIVO_TRANSFORMADORES))
+            arquivos = {}
+            for nome_modelo, modelo in modelos.items():
+                arquivos[nome_modelo] = f"modelo_{nome_modelo}.joblib"
+                joblib.dump(modelo, os.path.join(temporaria, arquivos[nome_modelo]))
+
+            manifesto = {
+                "versao_formato": VERSAO_FORMATO,
+                "id": id_versao,
+                "criado_em": criado_em.isoformat(),
+                "transformadores": ARQUIVO_TRANSFORMADORES,
+                "modelos": {
+                    nome_modelo: {
+                        "arquivo": arquivo,
+                        "colunas": list(colunas[nome_modelo]) if nome_modelo in colunas else None,
+                        "metricas": metricas.get(nome_modelo),
+                    }
+                    for nome_modelo, arquivo in arquivos.items()
+                },
+            }
+            with open(os.path.join(temporaria, ARQUIVO_MANIFESTO), "w") as f:
+                # As métricas do scikit-learn podem vir como escalares NumPy
+                json.dump(manifesto, f, indent=2, default=float)
+
+            os.replace(temporaria, os.path.join(_pasta_versoes(), id_versao))
+        except BaseException:
+            shutil.rmtree(temporaria, ignore_errors=True)
+            raise
+
+        _aponta_para(id_versao)
+        _remove_versoes_antigas(id_versao)
+    return id_versao
+
+
+def _carrega_versao(id_versao: str) -> Tuple[dict, dict, object, object, dict]:
+    pasta = os.path.join(_pasta_versoes(), id_versao)
+    with open(os.path.join(pasta, ARQUIVO_MANIFESTO)) as f:
+        manifesto = json.load(f)
+    if manifesto.get("versao_formato") != VERSAO_FORMATO:
+        raise ValueError(f"Formato {manifesto.get('versao_formato')} da versão '{id_versao}' não suportado.")
+
+    mmap_mode = "r" if ML_MODELOS_MMAP else None
+    encoder, tfidf = joblib.load(os.path.join(pasta, manifesto["transformadores"]), mmap_mode=mmap_mode)
+    modelos, metricas, colunas = {}, {}, {}
+    for nome_modelo, info in manifesto["modelos"].items():
+        modelos[nome_modelo] = joblib.load(os.path.join(pasta, info["arquivo"]), mmap_mode=mmap_mode)
+        if info.get("metricas") is not None:
+            metricas[nome_modelo] = info["metricas"]
+        if info.get("colunas") is not None:
+            colunas[nome_modelo] = info["colunas"]
+    return modelos, metricas, encoder, tfidf, colunas
+
+
+def _carrega_legado() -> Tuple[dict, dict, object, object, dict]:
+    """
+    Layout anterior: `modelo_*.pkl`, `encoder.pkl` e `tfidf.pkl` soltos na pasta,
+    sem métricas nem colunas (os modelos eram treinados com DataFrame e trazem feature_names_in_).
+    """
+    with open(os.path.join(ML_MODELOS_DIR, 'encoder.pkl'), 'rb') as f:
+        encoder = pickle.load(f)
+    with open(os.path.join(ML_MODELOS_DIR, 'tfidf.pkl'), 'rb') as f:
+        tfidf = pickle.load(f)
+
+    modelos = {}
+    for filename in os.listdir(ML_MODELOS_DIR):
+        if filename.startswith('modelo_') and filename.endswith('.pkl'):
+            nome_modelo = filename.replace('modelo_', '').replace('.pkl', '')
+            with open(os.path.join(ML_MODELOS_DIR, filename), 'rb') as f:
+                modelos[nome_modelo] = pickle.load(f)
+    return modelos, {}, encoder, tfidf, {}
+
+
+def carrega_artefatos() -> Tuple[dict, dict, object, object, dict]:
+    """
+    Carrega (modelos, métricas, encoder, tfidf, colunas) da versão apontada por `ATUAL`
+    ou, se ainda não houver versões, do layout antigo de arquivos .pkl.
+    Levanta FileNotFoundError quando não há artefatos em disco.
+    """
+    inicio = time.perf_counter()
+    id_versao = versao_atual()
+    artefatos = None
+    if id_versao is not None:
+        try:
+            artefatos = _carrega_versao(id_versao)
+            formato = "joblib-mmap" if ML_MODELOS_MMAP else "joblib"
+        except Exception as e:
+            logging.error(f"Versão '{id_versao}' dos modelos ilegível em '{ML_MODELOS_DIR}', tentando os arquivos .pkl: {e}")
+    if artefatos is None:
+        artefatos = _carrega_legado()
+        formato = "pickle-legado"
+        logging.info(f"Modelos carregados do layout antigo (.pkl) em '{ML_MODELOS_DIR}'.")
+
+    _estado["ultima_carga"] = {
+        "versao": id_versao,
+        "formato": formato,
+        "duracao_s": round(time.perf_counter() - inicio, 4),
+    }
+    return artefatos
+
+
+def estatisticas() -> dict:
+    return {
+        "diretorio": ML_MODELOS_DIR,
+        "mmap": ML_MODELOS_MMAP,
+        "versao_atual": versao_atual(),
+        "ultima_carga": _estado["ultima_carga"],
+    }
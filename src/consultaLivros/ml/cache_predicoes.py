@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from ..schemas.livros import LivroBase
+
+# Número máximo de predições guardadas (0 desliga o cache)
+ML_CACHE_PREDICOES_MAX_ITENS = int(os.getenv("ML_CACHE_PREDICOES_MAX_ITENS", "10000"))
+# Validade de cada predição guardada (0 = sem expiração; a troca de modelos já invalida o cache)
+ML_CACHE_PREDICOES_TTL_SEGUNDOS = float(os.getenv("ML_CACHE_PREDICOES_TTL_SEGUNDOS", "3600"))
+
+# Campos de LivroBase que entram nas features; a imagem não altera a predição
+CAMPOS_CHAVE = ('titulo', 'preco', 'rating', 'disponibilidade', 'categoria')
+
+
+def chave_predicao(nome_modelo: str, versao_modelos: int, livro: LivroBase) -> str:
+    """Hash do livro normalizado (só os campos usados nas features) com o modelo e a versão dos modelos."""
+    normalizado = json.dumps(
+        [nome_modelo, versao_modelos, [getattr(livro, campo) for campo in CAMPOS_CHAVE]],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(normalizado.encode()).hexdigest()
+
+
+class CachePredicoes:
+    """
+    Cache LRU com expiração das predições de /ml/predictions. A chave inclui a
+    versão do snapshot de modelos, e o cache é esvaziado quando um novo snapshot
+    é publicado, então uma predição antiga nunca é servida.
+    """
+
+    def __init__(self, max_itens: int = ML_CACHE_PREDICOES_MAX_ITENS, ttl_segundos: float = ML_CACHE_PREDICOES_TTL_SEGUNDOS):
+        self.max_itens = max_itens
+        self.ttl_segundos = ttl_segundos
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()  # chave -> (predição, expira_em)
+        self._lock = threading.Lock()
+        self._contadores = {"acertos": 0, "faltas": 0, "removidos_lru": 0, "expirados": 0, "limpezas": 0}
+
+    @property
+    def ativo(self) -> bool:
+        return self.max_itens > 0
+
+    def obtem(self, chave: str) -> Optional[int]:
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and self.ttl_segundos and item[1] <= time.monotonic():
+                del self._itens[chave]
+                self._contadores["expirados"] += 1
+                item = None
+            if item is None:
+                self._contadores["faltas"] += 1
+                return None
+            self._itens.move_to_end(chave)
+            self._contadores["acertos"] += 1
+            return item[0]
+
+    def guarda(self, chave: str, predicao: int):
+        if not self.ativo:
+            return
+        expira_em = time.monotonic() + self.ttl_segundos if self.ttl_segundos else None
+        with self._lock:
+            self._itens[chave] = (predicao, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self._contadores["removidos_lru"] += 1
+
+    def limpa(self):
+        """Descarta todas as predições (chamado ao publicar novos modelos)."""
+        with self._lock:
+            self._itens.clear()
+            self._contadores["limpezas"] += 1
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self._contadores["acertos"] + self._contadores["faltas"]
+            return {
+                "ativo": self.ativo,
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl_segundos": self.ttl_segundos,
+                **self._contadores,
+                "taxa_acertos": round(self._contadores["acertos"] / consultas, 4) if consultas else 0.0,
+            }
+
+
+cache_predicoes = CachePredicoes()
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Optional, Tuple
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+
+from ..repositorios import versao_catalogo_repositorio
+from .preparacao_dados import preparar_dados_livros, preparar_matriz_esparsa_livros
+
+# Guarda em disco as features preparadas, para não refazê-las enquanto o catálogo não mudar
+ML_FEATURE_STORE = os.getenv("ML_FEATURE_STORE", "true").lower() in ("1", "true", "sim")
+ML_FEATURE_STORE_DIR = os.getenv("ML_FEATURE_STORE_DIR", "feature_store")
+
+# Incrementar quando o pré-processamento mudar, para descartar as entradas antigas
+VERSAO_FORMATO = 1
+
+_estado = {
+    "memoria": {},  # tipo -> (chave, dados) da última entrada usada neste processo
+    "lock": threading.Lock(),  # Evita que duas requisições preparem a mesma entrada ao mesmo tempo
+    "acertos": 0,
+    "faltas": 0,
+}
+
+
+def _chave(db: Session) -> Optional[str]:
+    """
+    Chave das entradas: id do catálogo (distingue bancos diferentes ou
+    recriados) e versão. None se o banco ainda não tiver um id de catálogo.
+    """
+    # A versão é lida antes dos livros: uma alteração concorrente gera no máximo
+    # uma entrada com dados mais novos que a chave, nunca o contrário
+    identidade = versao_catalogo_repositorio.busca_identidade(db)
+    if identidade is None:
+        return None
+    id_catalogo, versao = identidade
+    return f"catalogo-{id_catalogo}-v{versao}-formato{VERSAO_FORMATO}"
+
+
+def _grava_denso(pasta: str, dados: tuple):
+    features_df, encoder, tfidf = dados
+    joblib.dump(features_df, os.path.join(pasta, "features.joblib"))
+    joblib.dump((encoder, tfidf), os.path.join(pasta, "transformadores.joblib"))
+
+
+def _carrega_denso(pasta: str) -> tuple:
+    features_df = joblib.load(os.path.join(pasta, "features.joblib"))
+    encoder, tfidf = joblib.load(os.path.join(pasta, "transformadores.joblib"))
+    return features_df, encoder, tfidf
+
+
+def _grava_esparso(pasta: str, dados: tuple):
+    X, ratings, colunas, encoder, tfidf = dados
+    sp.save_npz(os.path.join(pasta, "X.npz"), X, compressed=False)
+    np.save(os.path.join(pasta, "ratings.npy"), ratings)
+    with open(os.path.join(pasta, "colunas.json"), "w") as f:
+        json.dump(colunas, f)
+    joblib.dump((encoder, tfidf), os.path.join(pasta, "transformadores.joblib"))
+
+
+def _carrega_esparso(pasta: str) -> tuple:
+    X = sp.load_npz(os.path.join(pasta, "X.npz")).tocsr()
+    ratings = np.load(os.path.join(pasta, "ratings.npy"))
+    with open(os.path.join(pasta, "colunas.json")) as f:
+        colunas = json.load(f)
+    encoder, tfidf = joblib.load(os.path.join(pasta, "transformadores.joblib"))
+    return X, ratings, colunas, encoder, tfidf
+
+
+def _publica(tipo: str, chave: str, dados: tuple, grava: Callable[[str, tuple], None]):
+    """Grava a entrada em uma pasta temporária e a renomeia, removendo as versões antigas do mesmo tipo."""
+    os.makedirs(ML_FEATURE_STORE_DIR, exist_ok=True)
+    destino = os.path.join(ML_FEATURE_STORE_DIR, f"{tipo}-{chave}")
+    temporaria = tempfile.mkdtemp(prefix=f".{tipo}-", dir=ML_FEATURE_STORE_DIR)
+    try:
+        grava(temporaria, dados)
+        os.replace(temporaria, destino)
+    except OSError:
+        # Outro worker publicou a mesma entrada primeiro
+        shutil.rmtree(temporaria, ignore_errors=True)
+        if not os.path.isdir(destino):
+            raise
+    for nome in os.listdir(ML_FEATURE_STORE_DIR):
+        if nome.startswith(f"{tipo}-") and nome != os.path.basename(destino):
+            shutil.rmtree(os.path.join(ML_FEATURE_STORE_DIR, nome), ignore_errors=True)
+
+
+def _obtem(db: Session, tipo: str, prepara: Callable[[Session], tuple], vazio: Callable[[tuple], bool],
+           grava: Callable[[str, tuple], None], carrega: Callable[[str], tuple]) -> Tuple[Optional[str], tuple]:
+    """Retorna (chave da versão do catálogo, ou None se o banco não tiver id, e os dados preparados)."""
+    if not ML_FEATURE_STORE:
+        return _chave(db), prepara(db)
+
+    with _estado["lock"]:
+        chave = _chave(db)
+        if chave is None:
+            # Sem id de catálogo não há como saber se uma entrada é deste banco
+            return chave, prepara(db)
+
+        em_memoria = _estado["memoria"].get(tipo)
+        if em_memoria and em_memoria[0] == chave:
+            _estado["acertos"] += 1
+            return em_memoria
+
+        pasta = os.path.join(ML_FEATURE_STORE_DIR, f"{tipo}-{chave}")
+        dados: Optional[tuple] = None
+        if os.path.isdir(pasta):
+            try:
+                dados = carrega(pasta)
+                _estado["acertos"] += 1
+            except Exception as e:
+                logging.warning(f"Entrada '{pasta}' do feature store ilegível, preparando de novo: {e}")
+
+        if dados is None:
+            _estado["faltas"] += 1
+            dados = prepara(db)
+            if vazio(dados):
+                return chave, dados  # catálogo vazio ou erro: nada a guardar
+            try:
+                _publica(tipo, chave, dados, grava)
+                logging.info(f"Features '{tipo}' gravadas no feature store ({chave}).")
+            except OSError as e:
+                logging.warning(f"Não foi possível gravar o feature store em '{ML_FEATURE_STORE_DIR}': {e}")
+
+        _estado["memoria"][tipo] = (chave, dados)
+        return chave, dados
+
+
+def obtem_features_densas(db: Session) -> tuple:
+    """
+    Mesmo retorno de `preparar_dados_livros` (features_df, encoder, tfidf), lido
+    do feature store quando o catálogo não mudou desde a última preparação.
+    O DataFrame devolvido é compartilhado: não o altere, use uma cópia.
+    """
+    return obtem_features_densas_versionadas(db)[1]
+
+
+def obtem_features_densas_versionadas(db: Session) -> Tuple[str, tuple]:
+    """Como `obtem_features_densas`, junto com a chave da versão do catálogo que originou as features."""
+    return _obtem(db, "denso", preparar_dados_livros, lambda dados: dados[0].empty, _grava_denso, _carrega_denso)
+
+
+def obtem_matriz_esparsa(db: Session) -> tuple:
+    """Mesmo retorno de `preparar_matriz_esparsa_livros`, lido do feature store quando possível."""
+    return _obtem(db, "esparso", preparar_matriz_esparsa_livros, lambda dados: dados[0] is None,
+                  _grava_esparso, _carrega_esparso)[1]
+
+
+def estatisticas() -> dict:
+    with _estado["lock"]:
+        return {
+            "ativo": ML_FEATURE_STORE,
+            "diretorio": ML_FEATURE_STORE_DIR,
+            "acertos": _estado["acertos"],
+            "faltas": _estado["faltas"],
+            "entradas_em_memoria": {tipo: chave for tipo, (chave, _) in _estado["memoria"].items()},
+        }
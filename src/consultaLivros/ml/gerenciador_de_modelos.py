@@ -1,50 +1,123 @@
 import logging
-import os
-import pickle
+from datetime import datetime, timezone
 from threading import Lock
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, List, Mapping, NamedTuple, Optional
 
+import numpy as np
 
-# Cache para armazenar o modelo e o encoder
-modelo_cache: Dict[str, Any] = {
-    "modelos": {},
-    "metricas": {},
-    "encoder_prod": None,
-    "tfidf_prod": None,
-    "lock": Lock()  # Adiciona um lock para garantir acesso thread-safe ao cache
+from ..schemas.livros import LivroBase
+from .artefatos_modelos import carrega_artefatos, estatisticas as estatisticas_artefatos
+from .cache_predicoes import cache_predicoes
+from .mapeador_features import compila_mapeadores
+from .preparacao_dados import preparar_lote_para_predicao
+
+
+class SnapshotModelos(NamedTuple):
+    """
+    Conjunto imutável de modelos e artefatos servidos pela API. Cada treino ou
+    carga do disco publica um snapshot novo por troca de referência, então as
+    rotas de predição leem sem lock e nunca veem modelos de um treino com o
+    encoder de outro.
+    """
+    versao: int
+    modelos: Mapping[str, Any]
+    metricas: Mapping[str, Any]
+    encoder: Any
+    tfidf: Any
+    mapeadores: Mapping[str, Any]  # um MapeadorFeatures por modelo
+    origem: Optional[str] = None  # "disco" ou "treino"
+    publicado_em: Optional[str] = None
+    colunas: Mapping[str, Any] = MappingProxyType({})  # ordem das colunas de features de cada modelo
+
+
+_estado = {
+    "snapshot": SnapshotModelos(0, MappingProxyType({}), MappingProxyType({}), None, None, MappingProxyType({})),
+    "lock": Lock(),  # Serializa apenas as publicações; os leitores não o usam
 }
 
+
+def obtem_snapshot() -> SnapshotModelos:
+    """Retorna o snapshot atual. Guarde a referência durante toda a requisição."""
+    return _estado["snapshot"]
+
+
+def _colunas_dos_modelos(modelos: dict, colunas: Optional[dict]) -> dict:
+    """
+    Ordem das colunas de cada modelo: a informada (treino ou manifesto) ou, na
+    falta dela, o feature_names_in_ de modelos treinados com DataFrame.
+    """
+    colunas = colunas or {}
+    resultado = {}
+    for nome_modelo, modelo in modelos.items():
+        if nome_modelo in colunas:
+            resultado[nome_modelo] = tuple(colunas[nome_modelo])
+        elif hasattr(modelo, 'feature_names_in_'):
+            resultado[nome_modelo] = tuple(modelo.feature_names_in_)
+        else:
+            logging.warning(f"Ordem das colunas desconhecida para o modelo '{nome_modelo}'.")
+    return resultado
+
+
+def publica_snapshot(modelos: dict, metricas: dict, encoder, tfidf, origem: str, colunas: Optional[dict] = None) -> SnapshotModelos:
+    """
+    Compila os mapeadores de features e publica um novo snapshot de uma só vez.
+    `colunas` traz a ordem das features por modelo; é obrigatória para modelos
+    treinados com a matriz esparsa, que não têm feature_names_in_.
+    """
+    colunas = _colunas_dos_modelos(modelos, colunas)
+    mapeadores = compila_mapeadores(modelos, encoder, tfidf, colunas)
+    with _estado["lock"]:
+        snapshot = SnapshotModelos(
+            versao=_estado["snapshot"].versao + 1,
+            modelos=MappingProxyType(dict(modelos)),
+            metricas=MappingProxyType(dict(metricas)),
+            encoder=encoder,
+            tfidf=tfidf,
+            mapeadores=MappingProxyType(mapeadores),
+            origem=origem,
+            publicado_em=datetime.now(timezone.utc).isoformat(),
+            colunas=MappingProxyType(colunas),
+        )
+        _estado["snapshot"] = snapshot
+    # A versão faz parte da chave do cache; limpar só libera as predições que não serão mais usadas
+    cache_predicoes.limpa()
+    logging.info(f"Snapshot de modelos versão {snapshot.versao} publicado ({origem}) com {len(modelos)} modelos.")
+    return snapshot
+
+
+def prediz_lote(snapshot: SnapshotModelos, nome_modelo: str, livros: List[LivroBase]) -> np.ndarray:
+    """
+    Prediz vários livros com um modelo do snapshot em uma única chamada a predict.
+    Usa o mapeador compilado do modelo e, na falta dele, o pré-processamento com pandas.
+    """
+    modelo = snapshot.modelos[nome_modelo]
+    mapeador = snapshot.mapeadores.get(nome_modelo)
+    if mapeador is not None:
+        return mapeador.prediz(mapeador.transforma_lote(livros))
+    features = preparar_lote_para_predicao(livros, snapshot.encoder, snapshot.tfidf, list(snapshot.colunas[nome_modelo]))
+    if not hasattr(modelo, 'feature_names_in_'):
+        # Modelo treinado sem nomes de colunas: o DataFrame já está na ordem certa
+        features = features.to_numpy()
+    return modelo.predict(features)
+
+
 def carregar_modelos_do_disco():
     """
-    Carrega os modelos e artefatos salvos em disco para o cache em memória.
+    Carrega os modelos e artefatos salvos em disco e os publica como snapshot.
     Esta função é chamada na inicialização da aplicação (lifespan).
     """
     logging.info("Tentando carregar modelos e artefatos do disco...")
-    modelo_dir = 'modelos_ml'
-    
+
     try:
-        with modelo_cache["lock"]:
-            # Carrega os artefatos de pré-processamento
-            with open(os.path.join(modelo_dir, 'encoder.pkl'), 'rb') as f:
-                modelo_cache["encoder_prod"] = pickle.load(f)
-            with open(os.path.join(modelo_dir, 'tfidf.pkl'), 'rb') as f:
-                modelo_cache["tfidf_prod"] = pickle.load(f)
-
-            # Encontra e carrega todos os arquivos de modelo
-            modelos_carregados = {}
-            for filename in os.listdir(modelo_dir):
-                if filename.startswith('modelo_') and filename.endswith('.pkl'):
-                    nome_modelo = filename.replace('modelo_', '').replace('.pkl', '')
-                    with open(os.path.join(modelo_dir, filename), 'rb') as f:
-                        modelos_carregados[nome_modelo] = pickle.load(f)
-            
-            modelo_cache["modelos"] = modelos_carregados
-            logging.info(f"Carregados {len(modelos_carregados)} modelos do disco para o cache.")
+        modelos_carregados, metricas, encoder, tfidf, colunas = carrega_artefatos()
+        publica_snapshot(modelos_carregados, metricas, encoder, tfidf, origem="disco", colunas=colunas)
+        logging.info(f"Carregados {len(modelos_carregados)} modelos do disco para o cache ({estatisticas_artefatos()['ultima_carga']}).")
 
     except FileNotFoundError:
-        logging.warning("Nenhum arquivo de modelo (.pkl) encontrado no disco. O cache iniciará vazio. Use a rota /train para treinar e popular.")
+        logging.warning("Nenhum artefato de modelo encontrado no disco. O cache iniciará vazio. Use a rota /train para treinar e popular.")
     except Exception as e:
         logging.error(f"Falha ao carregar modelos do disco: {e}", exc_info=True)
 
 if __name__ == "__main__":
-    carregar_modelos_do_disco()
\ No newline at end of file
+    carregar_modelos_do_disco()
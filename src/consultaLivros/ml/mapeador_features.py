@@ -0,0 +1,131 @@
+import copy
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import OneHotEncoder
+
+from ..schemas.livros import LivroBase
+
+
+class MapeadorFeatures:
+    """
+    Converte livros na matriz de features de um modelo sem passar pelo pandas.
+
+    É compilado uma vez a partir do encoder, do TF-IDF e das colunas do modelo:
+    cada categoria vira o índice da sua coluna e o TF-IDF é aplicado direto com
+    o vocabulário e o array idf_, repetindo as operações do scikit-learn na
+    mesma ordem. O resultado é idêntico, bit a bit, ao de
+    `preparar_input_para_predicao`.
+
+    Com o `modelo`, o mapeador guarda uma cópia rasa dele sem feature_names_in_:
+    as matrizes já seguem `colunas`, então `prediz` chama o predict com arrays
+    NumPy sem que o scikit-learn reclame da falta de nomes de colunas.
+    """
+
+    def __init__(self, encoder: OneHotEncoder, tfidf: TfidfVectorizer, colunas_modelo: list, modelo: Any = None):
+        if tfidf.sublinear_tf or tfidf.norm not in ("l2", None):
+            raise ValueError("Configuração de TF-IDF não suportada pelo mapeador compilado.")
+
+        self.colunas = list(colunas_modelo)
+        self._modelo: Optional[Any] = None
+        if modelo is not None:
+            # A cópia rasa compartilha os arrays do modelo (inclusive os mapeados em memória)
+            self._modelo = copy.copy(modelo)
+            self._modelo.__dict__.pop('feature_names_in_', None)
+        posicoes = {nome: indice for indice, nome in enumerate(self.colunas)}
+        self._posicao_preco = posicoes.get('preco')
+        self._posicao_rating = posicoes.get('rating')
+        self._posicao_disponibilidade = posicoes.get('disponibilidade')
+
+        nomes_categorias = encoder.get_feature_names_out(['categoria'])
+        self._posicao_categoria: Dict[str, int] = {
+            categoria: posicoes[nome]
+            for categoria, nome in zip(encoder.categories_[0], nomes_categorias)
+            if nome in posicoes
+        }
+
+        # Todo o vocabulário entra na norma, mesmo termos que não são colunas do modelo
+        self._analisador = tfidf.build_analyzer()
+        self._vocabulario: Dict[str, int] = dict(tfidf.vocabulary_)
+        self._idf: List[float] = [float(v) for v in tfidf.idf_] if tfidf.use_idf else None
+        self._normaliza = tfidf.norm == "l2"
+        self._posicao_termo: List[Any] = [None] * len(self._vocabulario)
+        for termo, indice in self._vocabulario.items():
+            self._posicao_termo[indice] = posicoes.get(termo)
+
+    def _preenche(self, linha: np.ndarray, livro: LivroBase):
+        if self._posicao_preco is not None:
+            linha[self._posicao_preco] = livro.preco
+        if self._posicao_rating is not None:
+            linha[self._posicao_rating] = livro.rating
+        if self._posicao_disponibilidade is not None:
+            linha[self._posicao_disponibilidade] = int(livro.disponibilidade)
+
+        posicao = self._posicao_categoria.get(livro.categoria)
+        if posicao is not None:
+            linha[posicao] = 1.0
+
+        contagens: Dict[int, int] = {}
+        for termo in self._analisador(livro.titulo):
+            indice = self._vocabulario.get(termo)
+            if indice is not None:
+                contagens[indice] = contagens.get(indice, 0) + 1
+        if not contagens:
+            return
+
+        # Mesma ordem do CSR do scikit-learn (índices do vocabulário ordenados),
+        # para que a soma da norma seja feita na mesma sequência
+        indices = sorted(contagens)
+        if self._idf is not None:
+            valores = [contagens[indice] * self._idf[indice] for indice in indices]
+        else:
+            valores = [float(contagens[indice]) for indice in indices]
+        if self._normaliza:
+            soma = 0.0
+            for valor in valores:
+                soma += valor * valor
+            norma = math.sqrt(soma)
+            valores = [valor / norma for valor in valores]
+
+        for indice, valor in zip(indices, valores):
+            posicao = self._posicao_termo[indice]
+            if posicao is not None:
+                linha[posicao] = valor
+
+    def transforma(self, livro: LivroBase) -> np.ndarray:
+        """Matriz (1, n_colunas) com as features de um livro."""
+        matriz = np.zeros((1, len(self.colunas)))
+        self._preenche(matriz[0], livro)
+        return matriz
+
+    def transforma_lote(self, livros: List[LivroBase]) -> np.ndarray:
+        """Matriz (len(livros), n_colunas), com as linhas na ordem de `livros`."""
+        matriz = np.zeros((len(livros), len(self.colunas)))
+        for linha, livro in zip(matriz, livros):
+            self._preenche(linha, livro)
+        return matriz
+
+    def prediz(self, matriz: np.ndarray) -> np.ndarray:
+        """Predict do modelo compilado com uma matriz de `transforma` ou `transforma_lote`."""
+        return self._modelo.predict(matriz)
+
+
+def compila_mapeadores(
+    modelos: Dict[str, Any], encoder: OneHotEncoder, tfidf: TfidfVectorizer, colunas: Dict[str, Any]
+) -> Dict[str, MapeadorFeatures]:
+    """
+    Compila um mapeador por modelo, alinhado à ordem de colunas do modelo em `colunas`.
+    Modelos sem mapeador continuam sendo atendidos pelo caminho com pandas.
+    """
+    mapeadores = {}
+    if encoder is None or tfidf is None:
+        return mapeadores
+    for nome_modelo, modelo in modelos.items():
+        try:
+            mapeadores[nome_modelo] = MapeadorFeatures(encoder, tfidf, colunas[nome_modelo], modelo)
+        except (KeyError, ValueError) as e:
+            logging.warning(f"Mapeador de features não compilado para '{nome_modelo}': {e}")
+    return mapeadores
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Set, Tuple
+
+from ..schemas.livros import LivroBase
+from .gerenciador_de_modelos import SnapshotModelos, prediz_lote
+
+# Agrupa as requisições de /ml/predictions em lotes (desligado por padrão)
+ML_MICRO_LOTES = os.getenv("ML_MICRO_LOTES", "false").lower() in ("1", "true", "sim")
+# Tempo máximo que uma requisição espera por outras antes de o lote ser executado
+ML_MICRO_LOTE_JANELA_MS = float(os.getenv("ML_MICRO_LOTE_JANELA_MS", "2"))
+# Um lote com este número de livros é executado sem esperar o fim da janela
+ML_MICRO_LOTE_MAX_ITENS = int(os.getenv("ML_MICRO_LOTE_MAX_ITENS", "64"))
+
+
+class Histograma:
+    """Contagens por faixa (valor <= limite), com uma faixa final para o que passar do último limite."""
+
+    def __init__(self, limites: Sequence[float]):
+        self.limites = list(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registra(self, valor: float):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def _percentil(self, fracao: float) -> float:
+        """Limite superior da faixa que contém o percentil, sem passar do máximo observado."""
+        alvo = fracao * self.total
+        acumulado = 0
+        for indice, contagem in enumerate(self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return min(self.limites[indice], self.maximo) if indice < len(self.limites) else self.maximo
+        return self.maximo
+
+    def resumo(self) -> dict:
+        faixas = [f"<={limite:g}" for limite in self.limites] + [f">{self.limites[-1]:g}"]
+        return {
+            "total": self.total,
+            "media": round(self.soma / self.total, 3) if self.total else 0.0,
+            "p50": self._percentil(0.5) if self.total else 0.0,
+            "p95": self._percentil(0.95) if self.total else 0.0,
+            "maximo": round(self.maximo, 3),
+            "faixas": dict(zip(faixas, self.contagens)),
+        }
+
+
+class MicroLotesPredicao:
+    """
+    Junta as predições que chegam dentro de uma janela curta e executa um único
+    predict por modelo, devolvendo a cada requisição o seu resultado.
+
+    O lote de um modelo é executado quando a janela de `janela_ms` do primeiro
+    pedido termina ou quando ele chega a `max_itens`, o que vier antes. Os lotes
+    são separados por versão do snapshot: cada pedido é predito com o snapshot
+    que a requisição leu, mesmo que novos modelos sejam publicados na janela.
+    O estado só é acessado no event loop; o predict roda no threadpool.
+    """
+
+    def __init__(self, janela_ms: float = ML_MICRO_LOTE_JANELA_MS, max_itens: int = ML_MICRO_LOTE_MAX_ITENS):
+        self.janela_ms = janela_ms
+        self.max_itens = max(1, max_itens)
+        # Por (versão do snapshot, modelo): o snapshot, os pedidos (livro, futuro,
+        # instante de chegada) e o timer da janela
+        self._snapshots: Dict[Tuple[int, str], SnapshotModelos] = {}
+        self._pendentes: Dict[Tuple[int, str], List[Tuple[LivroBase, asyncio.Future, float]]] = {}
+        self._timers: Dict[Tuple[int, str], asyncio.TimerHandle] = {}
+        # Referências aos lotes em execução: o event loop guarda só referências fracas às tasks
+        self._tarefas: Set[asyncio.Task] = set()
+        self.tamanho_lote = Histograma([1, 2, 4, 8, 16, 32, 64, 128, 256])
+        self.espera_ms = Histograma([0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100])
+
+    async def prediz(self, snapshot: SnapshotModelos, nome_modelo: str, livro: LivroBase) -> int:
+        """Enfileira um livro no lote do modelo e aguarda a sua predição com o snapshot informado."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        chave = (snapshot.versao, nome_modelo)
+        self._snapshots[chave] = snapshot
+        pendentes = self._pendentes.setdefault(chave, [])
+        pendentes.append((livro, futuro, time.perf_counter()))
+
+        if len(pendentes) >= self.max_itens:
+            self._despacha(chave)
+        elif chave not in self._timers:
+            self._timers[chave] = loop.call_later(self.janela_ms / 1000, self._despacha, chave)
+        return await futuro
+
+    def _despacha(self, chave: Tuple[int, str]):
+        timer = self._timers.pop(chave, None)
+        if timer is not None:
+            timer.cancel()
+        snapshot = self._snapshots.pop(chave, None)
+        pendentes = self._pendentes.pop(chave, [])
+        if pendentes:
+            tarefa = asyncio.get_running_loop().create_task(self._executa(snapshot, chave[1], pendentes))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _executa(self, snapshot: SnapshotModelos, nome_modelo: str,
+                       pendentes: List[Tuple[LivroBase, asyncio.Future, float]]):
+        inicio = time.perf_counter()
+        self.tamanho_lote.registra(len(pendentes))
+        for _, _, chegada in pendentes:
+            self.espera_ms.registra((inicio - chegada) * 1000)
+
+        try:
+            predicoes = await asyncio.to_thread(
+                prediz_lote, snapshot, nome_modelo, [livro for livro, _, _ in pendentes]
+            )
+        except Exception as e:
+            logging.error(f"Falha no micro-lote de {len(pendentes)} predições de '{nome_modelo}': {e}", exc_info=True)
+            for _, futuro, _ in pendentes:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        for (_, futuro, _), predicao in zip(pendentes, predicoes):
+            # Um cliente que desconectou cancela o próprio futuro
+            if not futuro.done():
+                futuro.set_result(int(predicao))
+
+    def estatisticas(self) -> dict:
+        return {
+            "ativo": ML_MICRO_LOTES,
+            "janela_ms": self.janela_ms,
+            "max_itens": self.max_itens,
+            "pendentes": sum(len(pendentes) for pendentes in self._pendentes.values()),
+            "tamanho_lote": self.tamanho_lote.resumo(),
+            "espera_fila_ms": self.espera_ms.resumo(),
+        }
+
+
+micro_lotes = MicroLotesPredicao()
@@ -1,9 +1,11 @@
 import logging
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import OneHotEncoder
 from sqlalchemy.orm import Session
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 from ..schemas.livros import LivroBase
 from ..repositorios import livros_repositorio
 
@@ -68,23 +70,80 @@ def preparar_dados_livros(db: Session) -> Tuple[pd.DataFrame, Optional[OneHotEnc
         return pd.DataFrame(), None, None
 
 
-def preparar_input_para_predicao(
-    livro_input: LivroBase,
+def preparar_matriz_esparsa_livros(
+    db: Session
+) -> Tuple[Optional[sp.csr_matrix], Optional[np.ndarray], List[str], Optional[OneHotEncoder], Optional[TfidfVectorizer]]:
+    """
+    Versão esparsa de `preparar_dados_livros` para o treinamento: as mesmas
+    features, na mesma ordem de colunas (sem o rating), em uma matriz CSR
+    float32 em vez de um DataFrame denso. A memória cresce com o número de
+    valores não nulos, e não com livros x colunas.
+
+    Returns:
+        Uma tupla (X, ratings, colunas, encoder, tfidf). Retorna
+        (None, None, [], None, None) se não houver livros ou em caso de erro.
+    """
+    try:
+        df = livros_repositorio.busca_todos_livros_para_dataframe(db)
+
+        if df.empty:
+            logging.warning("Nenhum livro encontrado no banco de dados para preparação.")
+            return None, None, [], None, None
+
+        features_numericas = sp.csr_matrix(
+            np.column_stack([df['preco'].to_numpy(dtype=np.float64), df['disponibilidade'].astype(int).to_numpy()])
+        )
+
+        # Encoder e TF-IDF continuam em float64, como no caminho denso, para que a
+        # inferência (mapeador compilado ou pandas) produza as mesmas features
+        encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=True)
+        categorias_encoded = encoder.fit_transform(df[['categoria']])
+
+        tfidf = TfidfVectorizer(max_features=200, stop_words='english', ngram_range=(1, 2))
+        titulos_features = tfidf.fit_transform(df['titulo'])
+
+        X = sp.hstack([features_numericas, categorias_encoded, titulos_features], format='csr', dtype=np.float32)
+        colunas = (
+            ['preco', 'disponibilidade']
+            + list(encoder.get_feature_names_out(['categoria']))
+            + list(tfidf.get_feature_names_out())
+        )
+
+        logging.info(
+            f"Matriz esparsa preparada: {X.shape[0]} livros, {X.shape[1]} colunas, "
+            f"{X.nnz} valores não nulos ({X.data.nbytes + X.indices.nbytes + X.indptr.nbytes} bytes)."
+        )
+        return X, df['rating'].to_numpy(), colunas, encoder, tfidf
+
+    except Exception as e:
+        logging.error(f"Erro inesperado ao preparar a matriz esparsa dos livros: {e}", exc_info=True)
+        return None, None, [], None, None
+
+
+def preparar_lote_para_predicao(
+    livros: List[LivroBase],
     encoder: OneHotEncoder,
     tfidf: TfidfVectorizer,
     colunas_modelo: list
 ) -> pd.DataFrame:
     """
-    Prepara um único registro (livro) para predição usando os transformadores treinados.
-    Garante que as colunas do input correspondam exatamente às do modelo.
+    Prepara vários livros para predição de uma só vez: monta um único DataFrame
+    e passa todas as linhas pelo encoder e pelo TF-IDF em uma chamada cada.
+    As linhas do resultado seguem a ordem de `livros`.
     """
-    input_df = pd.DataFrame([livro_input.model_dump()])
+    input_df = pd.DataFrame({
+        'preco': [livro.preco for livro in livros],
+        'rating': [livro.rating for livro in livros],
+        'disponibilidade': [int(livro.disponibilidade) for livro in livros],
+        'categoria': [livro.categoria for livro in livros],
+        'titulo': [livro.titulo for livro in livros],
+    })
 
-    # Extrai e transforma as features
-    features_numericas = input_df[['preco', 'rating', 'disponibilidade']].copy()
-    features_numericas['disponibilidade'] = features_numericas['disponibilidade'].astype(int)
+    features_numericas = input_df[['preco', 'rating', 'disponibilidade']]
 
     categorias_encoded = encoder.transform(input_df[['categoria']])
+    if sp.issparse(categorias_encoded):  # encoder do treino esparso
+        categorias_encoded = categorias_encoded.toarray()
     categorias_df = pd.DataFrame(categorias_encoded, columns=encoder.get_feature_names_out(['categoria']))
 
     titulos_features = tfidf.transform(input_df['titulo'])
@@ -92,7 +151,18 @@ def preparar_input_para_predicao(
 
     # Concatena e alinha as colunas com as do modelo treinado
     input_completo_df = pd.concat([features_numericas, categorias_df, titulos_df], axis=1)
-    
-    input_final_df = input_completo_df.reindex(columns=colunas_modelo, fill_value=0)
-    
-    return input_final_df
+
+    return input_completo_df.reindex(columns=colunas_modelo, fill_value=0)
+
+
+def preparar_input_para_predicao(
+    livro_input: LivroBase,
+    encoder: OneHotEncoder,
+    tfidf: TfidfVectorizer,
+    colunas_modelo: list
+) -> pd.DataFrame:
+    """
+    Prepara um único registro (livro) para predição usando os transformadores treinados.
+    Garante que as colunas do input correspondam exatamente às do modelo.
+    """
+    return preparar_lote_para_predicao([livro_input], encoder, tfidf, colunas_modelo)
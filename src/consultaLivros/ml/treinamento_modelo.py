@@ -1,6 +1,7 @@
-import pickle
 import os
-from .preparacao_dados import preparar_dados_livros
+from .artefatos_modelos import ML_MODELOS_DIR, salva_versao
+from .feature_store import obtem_features_densas, obtem_matriz_esparsa
+from .gerenciador_de_modelos import publica_snapshot
 from ..db.database import SessionLocal
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
@@ -8,11 +9,14 @@ from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 from joblib import Parallel, delayed
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Treina com a matriz esparsa (CSR float32); "false" volta ao DataFrame denso
+ML_TREINO_ESPARSO = os.getenv("ML_TREINO_ESPARSO", "true").lower() in ("1", "true", "sim")
+
 
 def _treinar_um_modelo(nome_modelo: str, modelo_instancia: Any, X_train, y_train, X_test, y_test, X, y) -> tuple[str, Any, Dict]:
     """
@@ -41,71 +45,86 @@ def _treinar_um_modelo(nome_modelo: str, modelo_instancia: Any, X_train, y_train
     return nome_modelo, modelo_instancia, metricas
 
 
-def treinar_e_carregar_modelos_em_cache(cache: Dict[str, Any]):
+def prepara_dados_treino(db, esparso: bool):
     """
-    Busca dados, treina múltiplos modelos em paralelo e os carrega diretamente
-    em um dicionário de cache em memória, além de salvar os artefatos em disco.
+    Monta X (sem o rating), o alvo bom_rating (rating >= 4), as colunas, o encoder
+    e o TF-IDF, a partir do feature store. No caminho esparso X é uma matriz CSR
+    float32; no denso, um DataFrame. Retorna None se não houver dados.
     """
-    logging.info("Iniciando pipeline de treinamento para atualização do cache e no disco...")
+    if esparso:
+        X, ratings, colunas, encoder, tfidf = obtem_matriz_esparsa(db)
+        if X is None:
+            return None
+        y = (ratings >= 4).astype(int)
+        return X, y, colunas, encoder, tfidf
+
+    # O DataFrame do feature store é compartilhado: X e y são derivados sem alterá-lo
+    features_df, encoder, tfidf = obtem_features_densas(db)
+    if features_df.empty:
+        return None
+    y = features_df['rating'].apply(lambda x: 1 if x >= 4 else 0).rename('bom_rating')
+    X = features_df.drop(columns=['rating'])
+    return X, y, list(X.columns), encoder, tfidf
+
+
+def treina_modelos(X, y, n_jobs: int = -1) -> tuple[Dict[str, Any], Dict[str, Dict]]:
+    """Treina e avalia os modelos em paralelo. Retorna (modelos, métricas) por nome."""
     SEED = 42
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SEED)
+
+    logging.info(f"Quantidade de Dados de treino: {X_train.shape[0]}")
+    logging.info(f"Quantidade de Dados de teste: {X_test.shape[0]}")
+
+    # Os três modelos aceitam a matriz CSR float32 diretamente
+    modelos_a_treinar = {
+        "random_forest": RandomForestClassifier(n_estimators=100, random_state=SEED, n_jobs=1, class_weight='balanced'),
+        "regressao_logistica": LogisticRegression(random_state=SEED, class_weight='balanced', max_iter=1000),
+        "svm": SVC(random_state=SEED, class_weight='balanced')
+    }
+
+    logging.info("Iniciando treinamento paralelo dos modelos...")
+    resultados = Parallel(n_jobs=n_jobs)(
+        delayed(_treinar_um_modelo)(nome, modelo, X_train, y_train, X_test, y_test, X, y)
+        for nome, modelo in modelos_a_treinar.items()
+    )
+
+    modelos_treinados = {nome: modelo for nome, modelo, metricas in resultados}
+    metricas_treinamento = {nome: metricas for nome, modelo, metricas in resultados}
+
+    return modelos_treinados, metricas_treinamento
+
+
+def treinar_e_carregar_modelos_em_cache(esparso: Optional[bool] = None):
+    """
+    Busca dados, treina múltiplos modelos em paralelo e os publica como um novo
+    snapshot de modelos em memória, além de salvar os artefatos em disco.
+    Por padrão usa a matriz esparsa (ML_TREINO_ESPARSO).
+    """
+    logging.info("Iniciando pipeline de treinamento para atualização do cache e no disco...")
+    esparso = ML_TREINO_ESPARSO if esparso is None else esparso
 
     db = SessionLocal()
     try:
         # 1. Preparação dos Dados (feita uma única vez)
-        features_df, encoder, tfidf = preparar_dados_livros(db)
-
-        if features_df.empty:
+        dados = prepara_dados_treino(db, esparso)
+        if dados is None:
             logging.warning("Nenhum dado para treinamento. O cache não será atualizado.")
             return
+        X, y, colunas, encoder, tfidf = dados
+
+        # 2. Treinamento dos modelos em paralelo
+        modelos_treinados, metricas_treinamento = treina_modelos(X, y)
+        # Modelos treinados com a matriz esparsa não guardam os nomes das colunas:
+        # a ordem segue junto do snapshot e do manifesto da versão
+        colunas_modelos = {nome_modelo: list(colunas) for nome_modelo in modelos_treinados}
+
+        # Troca atômica: as predições em andamento terminam com o snapshot anterior
+        publica_snapshot(modelos_treinados, metricas_treinamento, encoder, tfidf, origem="treino", colunas=colunas_modelos)
+        logging.info(f"Cache atualizado com {len(modelos_treinados)} novos modelos.")
 
-        features_df['bom_rating'] = features_df['rating'].apply(lambda x: 1 if x >= 4 else 0)
-        X = features_df.drop(columns=['rating', 'bom_rating'])
-        y = features_df['bom_rating']
-
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=SEED)
-
-        logging.info(f"Quantidade de Dados de treino: {len(X_train)}")
-        logging.info(f"Quantidade de Dados de teste: {len(X_test)}")
-
-        # 2. Definição dos Modelos a Treinar
-        modelos_a_treinar = {
-            "random_forest": RandomForestClassifier(n_estimators=100, random_state=SEED, n_jobs=1, class_weight='balanced'),
-            "regressao_logistica": LogisticRegression(random_state=SEED, class_weight='balanced', max_iter=1000),
-            "svm": SVC(random_state=SEED, class_weight='balanced')
-        }
-        
-        # 3. Execução do Treinamento em Paralelo
-        logging.info("Iniciando treinamento paralelo dos modelos...")
-        resultados = Parallel(n_jobs=-1)(
-            delayed(_treinar_um_modelo)(nome, modelo, X_train, y_train, X_test, y_test, X, y)
-            for nome, modelo in modelos_a_treinar.items()
-        )
-
-        # 4. Coleta dos modelos treinados e atualização do cache
-        modelos_treinados = {nome: modelo for nome, modelo, metricas in resultados}
-        metricas_treinamento = {nome: metricas for nome, modelo, metricas in resultados}
-        
-        with cache["lock"]:
-            cache["modelos"] = modelos_treinados
-            cache["metricas"] = metricas_treinamento
-            cache["encoder_prod"] = encoder
-            cache["tfidf_prod"] = tfidf
-            logging.info(f"Cache atualizado com {len(modelos_treinados)} novos modelos.")
-
-        # 5. (Opcional) Salvar os artefatos em disco para persistência entre reinicializações
-        modelo_dir = 'modelos_ml'
-        os.makedirs(modelo_dir, exist_ok=True)
-        
-        for nome_modelo, modelo_instancia in modelos_treinados.items():
-            with open(os.path.join(modelo_dir, f'modelo_{nome_modelo}.pkl'), 'wb') as f:
-                pickle.dump(modelo_instancia, f)
-
-        with open(os.path.join(modelo_dir, 'encoder.pkl'), 'wb') as f:
-            pickle.dump(encoder, f)
-        with open(os.path.join(modelo_dir, 'tfidf.pkl'), 'wb') as f:
-            pickle.dump(tfidf, f)
-        
-        logging.info(f"Artefatos salvos com sucesso na pasta '{modelo_dir}'.")
+        # 5. Salva os artefatos em uma nova versão em disco, para persistência entre reinicializações
+        id_versao = salva_versao(modelos_treinados, metricas_treinamento, encoder, tfidf, colunas_modelos)
+        logging.info(f"Artefatos salvos na versão '{id_versao}' em '{ML_MODELOS_DIR}'.")
 
     except Exception as e:
         logging.error(f"Falha crítica durante o pipeline de treinamento: {e}", exc_info=True)
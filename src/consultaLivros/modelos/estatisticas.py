@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Float
+from ..db.database import Base
+
+
+class EstatisticaCatalogo(Base):
+    """
+    Agregados materializados da tabela livros, um registro por (categoria, rating).
+    Mantidos incrementalmente a cada inserção e zerados quando o catálogo é limpo.
+    """
+    __tablename__ = "estatisticas_catalogo"
+
+    categoria = Column(String, primary_key=True)
+    rating = Column(Integer, primary_key=True)
+    total_livros = Column(Integer, nullable=False, default=0)
+    total_com_preco = Column(Integer, nullable=False, default=0)
+    soma_precos = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<EstatisticaCatalogo(categoria='{self.categoria}', rating={self.rating}, total_livros={self.total_livros})>"
@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean
+from sqlalchemy import Column, Integer, String, Float, Boolean, Index
 from ..db.database import Base
 
 
 class Livro(Base):
     __tablename__ = "livros"
+    __table_args__ = (
+        # Índice ordenado por (preço, id) para buscas por faixa de preço paginadas por cursor
+        Index("ix_livros_preco_id", "preco", "id"),
+        # Chave natural usada pelo upsert da raspagem
+        Index("ux_livros_titulo_categoria", "titulo", "categoria", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String, index=True)
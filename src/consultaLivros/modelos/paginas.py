@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+
+class PaginaCategoria(Base):
+    """
+    Validadores da última versão gravada de cada página de listagem raspada,
+    usados para pular páginas inalteradas na raspagem incremental.
+    """
+    __tablename__ = "paginas_categoria"
+
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    hash_conteudo = Column(String, nullable=False)
+    # Link da página seguinte, necessário para continuar a paginação sem interpretar a página
+    url_proxima = Column(String, nullable=True)
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PaginaCategoria(url='{self.url}', hash_conteudo='{self.hash_conteudo[:12]}')>"
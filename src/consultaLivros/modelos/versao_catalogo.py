@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, DateTime, String
+from sqlalchemy.sql import func
+from ..db.database import Base
+
+
+class VersaoCatalogo(Base):
+    """
+    Contador incrementado na mesma transação de toda alteração da tabela livros.
+    Identifica a versão do catálogo para os caches derivados dele (feature store).
+    Tem um único registro, de id 1. O `id_catalogo` é sorteado quando o registro
+    é criado: distingue bancos diferentes (ou recriados), cujos contadores
+    recomeçam do mesmo valor.
+    """
+    __tablename__ = "versao_catalogo"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    id_catalogo = Column(String(32))
+    atualizado_em = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<VersaoCatalogo(id_catalogo={self.id_catalogo}, versao={self.versao})>"
@@ -1,6 +1,11 @@
 import logging
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin
 
+from lxml import etree, html
+from lxml.cssselect import CSSSelector
+from lxml.html import HtmlElement
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
@@ -13,9 +18,58 @@ class BookSelectors:
     AVAILABILITY = (By.CSS_SELECTOR, "p.instock.availability")
     IMAGE = (By.CSS_SELECTOR, "div.image_container img")
 
+# Seletores das páginas de listagem (categorias, livros e paginação)
+class PageSelectors:
+    CATEGORY_LINKS = (By.XPATH, "//div[@class='side_categories']//ul/li/ul/li/a")
+    PRODUCT = (By.CLASS_NAME, "product_pod")
+    NEXT_PAGE = (By.CSS_SELECTOR, "li.next > a")
+
+class PaginaRaspada(NamedTuple):
+    """
+    Livros de uma página de listagem e o link da página seguinte (None na última).
+    Na raspagem incremental, uma página `inalterada` não é interpretada (livros
+    vazio) e `validadores` traz o ETag/Last-Modified/hash a gravar para a URL.
+    `retentativas` e `livros_descartados` contam as falhas transitórias ao baixar
+    a página e os produtos que não puderam ser extraídos.
+    """
+    url: str
+    livros: List[Dict[str, Any]]
+    url_proxima: Optional[str]
+    inalterada: bool = False
+    validadores: Optional[Dict[str, Any]] = None
+    retentativas: int = 0
+    livros_descartados: int = 0
+
+
 # Mapeamento de rating de texto para valor numérico
 RATING_MAP = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
 
+# Extrai todos os produtos da página (e o link da próxima página) em uma única
+# chamada ao WebDriver. Os seletores CSS são passados como argumentos, então
+# continuam definidos apenas em BookSelectors/PageSelectors.
+SCRIPT_EXTRAI_PAGINA = """
+const [seletorProduto, seletores, seletorProxima] = arguments;
+const livros = Array.from(document.querySelectorAll(seletorProduto)).map(produto => {
+    const busca = seletor => produto.querySelector(seletor);
+    const [titulo, preco, rating, disponibilidade, imagem] = [
+        busca(seletores.titulo), busca(seletores.preco), busca(seletores.rating),
+        busca(seletores.disponibilidade), busca(seletores.imagem)
+    ];
+    if (!titulo || !preco || !rating || !disponibilidade || !imagem) {
+        return null;
+    }
+    return {
+        titulo: titulo.getAttribute("title"),
+        preco: preco.textContent.trim(),
+        rating: rating.className,
+        disponibilidade: disponibilidade.textContent,
+        imagem: imagem.src
+    };
+});
+const proxima = document.querySelector(seletorProxima);
+return {livros: livros, proxima: proxima ? proxima.href : null};
+"""
+
 
 def extrair_dados_livro(
     elemento_html: WebElement, nome_categoria: str
@@ -68,4 +122,147 @@ def extrair_dados_livro(
         return None
     except Exception as e:
         logging.error(f"Erro inesperado ao extrair dados do livro: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+def _monta_dados_livro(
+    titulo: str, preco_texto: str, classes_rating: str, texto_disponibilidade: str,
+    imagem_url: str, nome_categoria: str
+) -> Dict[str, Any]:
+    """Normaliza os valores brutos de um produto no dicionário salvo no banco."""
+    return {
+        "titulo": titulo,
+        # Remove o símbolo da moeda e converte para float
+        "preco": float(preco_texto.strip().replace("£", "")),
+        # A classe do rating é a última na lista de classes do elemento
+        "rating": RATING_MAP.get(classes_rating.split()[-1], 0),
+        "disponibilidade": "In stock" in texto_disponibilidade,
+        "imagem": imagem_url,
+        "categoria": nome_categoria,
+    }
+
+
+def _css(seletor: Tuple[str, str]) -> str:
+    """Converte um seletor (By, valor) em seletor CSS para uso no navegador."""
+    tipo, valor = seletor
+    if tipo == By.CLASS_NAME:
+        return f".{valor}"
+    if tipo == By.CSS_SELECTOR:
+        return valor
+    raise ValueError(f"Tipo de seletor não suportado no script de extração: {tipo}")
+
+
+def extrair_livros_pagina_script(
+    driver, nome_categoria: str
+) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """
+    Extrai todos os livros da página atual com um único `execute_script`, em vez
+    de ~10 chamadas ao WebDriver por livro.
+
+    Returns:
+        A lista de livros (mesmo formato de `extrair_dados_livro`), a URL
+        absoluta da próxima página (None se for a última) e o número de
+        produtos descartados por erro de extração.
+    """
+    seletores = {
+        "titulo": _css(BookSelectors.TITLE),
+        "preco": _css(BookSelectors.PRICE),
+        "rating": _css(BookSelectors.RATING),
+        "disponibilidade": _css(BookSelectors.AVAILABILITY),
+        "imagem": _css(BookSelectors.IMAGE),
+    }
+    pagina = driver.execute_script(
+        SCRIPT_EXTRAI_PAGINA, _css(PageSelectors.PRODUCT), seletores, _css(PageSelectors.NEXT_PAGE)
+    )
+
+    livros = []
+    for bruto in pagina["livros"]:
+        if bruto is None:
+            logging.warning("Seletor não encontrado durante extração de um produto da página.")
+            continue
+        try:
+            livros.append(_monta_dados_livro(
+                bruto["titulo"], bruto["preco"], bruto["rating"],
+                bruto["disponibilidade"], bruto["imagem"], nome_categoria
+            ))
+        except Exception as e:
+            logging.error(f"Erro inesperado ao extrair dados do livro: {e}", exc_info=True)
+    return livros, pagina["proxima"], len(pagina["livros"]) - len(livros)
+
+
+def extrair_livros_pagina_fonte(
+    driver, nome_categoria: str, url_pagina: str
+) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """
+    Extrai todos os livros da página atual a partir de um único `page_source`,
+    interpretado com lxml pelos mesmos seletores do backend HTTP.
+
+    Returns:
+        A lista de livros, a URL absoluta da próxima página (None se for a
+        última) e o número de produtos descartados por erro de extração.
+    """
+    pagina = html.fromstring(driver.page_source)
+    produtos = seletor_lxml(PageSelectors.PRODUCT)(pagina)
+    livros = []
+    for elemento in produtos:
+        dados = extrair_dados_livro_html(elemento, nome_categoria, url_pagina)
+        if dados:
+            livros.append(dados)
+
+    proxima = seletor_lxml(PageSelectors.NEXT_PAGE)(pagina)
+    url_proxima = urljoin(url_pagina, proxima[0].get("href")) if proxima else None
+    return livros, url_proxima, len(produtos) - len(livros)
+
+
+@lru_cache(maxsize=None)
+def seletor_lxml(seletor: Tuple[str, str]):
+    """Compila um seletor no formato do Selenium (By, valor) para uso com lxml."""
+    tipo, valor = seletor
+    if tipo == By.XPATH:
+        return etree.XPath(valor)
+    if tipo == By.CLASS_NAME:
+        return CSSSelector(f".{valor}")
+    if tipo == By.CSS_SELECTOR:
+        return CSSSelector(valor)
+    raise ValueError(f"Tipo de seletor não suportado com lxml: {tipo}")
+
+
+def _primeiro(elemento: HtmlElement, seletor: Tuple[str, str]) -> HtmlElement:
+    encontrados = seletor_lxml(seletor)(elemento)
+    if not encontrados:
+        raise LookupError(f"Seletor não encontrado: {seletor[1]}")
+    return encontrados[0]
+
+
+def extrair_dados_livro_html(
+    elemento_html: HtmlElement, nome_categoria: str, url_pagina: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Versão de `extrair_dados_livro` para HTML já baixado (lxml), com os mesmos
+    seletores e o mesmo formato de saída.
+
+    Args:
+        elemento_html: O elemento lxml do contêiner do livro.
+        nome_categoria: A categoria do livro, passada como contexto.
+        url_pagina: URL da página, usada para tornar absoluta a URL da imagem
+            (o Selenium já devolve o atributo `src` resolvido).
+
+    Returns:
+        Um dicionário com os dados do livro ou None se ocorrer um erro na extração.
+    """
+    try:
+        return _monta_dados_livro(
+            _primeiro(elemento_html, BookSelectors.TITLE).get("title"),
+            _primeiro(elemento_html, BookSelectors.PRICE).text_content(),
+            _primeiro(elemento_html, BookSelectors.RATING).get("class"),
+            _primeiro(elemento_html, BookSelectors.AVAILABILITY).text_content(),
+            urljoin(url_pagina, _primeiro(elemento_html, BookSelectors.IMAGE).get("src")),
+            nome_categoria,
+        )
+
+    except LookupError as e:
+        logging.warning(f"Seletor não encontrado durante extração: {e}")
+        return None
+    except Exception as e:
+        logging.error(f"Erro inesperado ao extrair dados do livro: {e}", exc_info=True)
+        return None
@@ -1,106 +1,519 @@
 import logging
+import os
+import threading
+from contextlib import contextmanager
 from urllib.parse import urljoin
-from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+from queue import Queue
+from typing import Iterator, Optional
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from ..db.database import SessionLocal
-from ..repositorios.livros_repositorio import salva_dados_livros
-from ..repositorios.tarefas_repositorio import atualiza_tarefa, busca_tarefa_por_id
-from .book_scraper import extrair_dados_livro
+from ..repositorios import paginas_repositorio
+from ..repositorios.livros_repositorio import atualiza_caches_catalogo, salva_dados_livros
+from ..repositorios.tarefas_repositorio import atualiza_tarefa, busca_checkpoint_para_retomar
+from .book_scraper import (
+    PageSelectors,
+    PaginaRaspada,
+    extrair_dados_livro,
+    extrair_livros_pagina_fonte,
+    extrair_livros_pagina_script,
+)
+from .drivers import pool_webdrivers
+from .http_scraper import HttpScraper
+from .metricas import MetricasRaspagem
+from .pipeline import itera_paginas_em_ordem
+from .politica import LimitadorPorHost, executa_com_retentativas
 import numpy as np
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Backend usado quando a execução não escolhe um: "http" (httpx + lxml) ou "selenium"
+SCRAPER_BACKEND_PADRAO = os.getenv("SCRAPER_BACKEND", "http")
 
-def _setup_driver() -> webdriver.Chrome:
-    """Configura e inicializa o driver do Selenium Chrome."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
+# Site raspado (pode apontar para uma cópia local do books.toscrape.com)
+SCRAPER_BASE_URL = os.getenv("SCRAPER_BASE_URL", "https://books.toscrape.com/")
 
-    logging.info("Instalando e configurando o ChromeDriver...")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    logging.info("Driver do Chrome inicializado com sucesso.")
-    return driver
+# Número de categorias raspadas em paralelo (1 = sequencial)
+SCRAPER_CONCORRENCIA = int(os.getenv("SCRAPER_CONCORRENCIA", "4"))
 
+# Limites de cortesia por host e retentativas em falhas transitórias
+SCRAPER_MAX_POR_HOST = int(os.getenv("SCRAPER_MAX_POR_HOST", "4"))
+SCRAPER_INTERVALO_POR_HOST = float(os.getenv("SCRAPER_INTERVALO_POR_HOST", "0.0"))
+SCRAPER_TENTATIVAS = int(os.getenv("SCRAPER_TENTATIVAS", "3"))
 
-def raspa_livros_categoria(driver: webdriver.Chrome, url_categoria: str, nome_categoria: str) -> list[dict]:
-    """Realiza a raspagem de todos os livros de uma categoria, percorrendo a paginação."""
-    dados_livros = []
+# Tempo sem atualização após o qual uma tarefa EXECUTANDO é considerada interrompida
+SCRAPER_TAREFA_EXPIRACAO_MINUTOS = int(os.getenv("SCRAPER_TAREFA_EXPIRACAO_MINUTOS", "30"))
+
+# Intervalo mínimo entre duas publicações do andamento na tarefa
+SCRAPER_INTERVALO_PROGRESSO_SEGUNDOS = float(os.getenv("SCRAPER_INTERVALO_PROGRESSO_SEGUNDOS", "2"))
+
+# Quantidade de livros acumulados antes de cada gravação no banco durante a raspagem
+SCRAPER_TAMANHO_LOTE = int(os.getenv("SCRAPER_TAMANHO_LOTE", "500"))
+# Páginas por gravação, para que páginas puladas (sem livros) também avancem o checkpoint
+PAGINAS_POR_LOTE = 50
+
+# Raspagem incremental: pula páginas inalteradas desde a última gravação (backend HTTP)
+SCRAPER_INCREMENTAL = os.getenv("SCRAPER_INCREMENTAL", "true").lower() in ("1", "true", "sim")
+
+# Como o backend Selenium extrai os livros de cada página:
+#   "script":    um único execute_script devolve todos os produtos (padrão)
+#   "fonte":     um único page_source, interpretado com lxml
+#   "elementos": find_element/get_attribute por campo de cada livro (~10 chamadas por livro)
+MODOS_EXTRACAO_SELENIUM = ("script", "fonte", "elementos")
+SCRAPER_EXTRACAO_SELENIUM = os.getenv("SCRAPER_EXTRACAO_SELENIUM", "script")
+
+
+def _abre_pagina(
+    driver: webdriver.Chrome,
+    url: str,
+    limitador: Optional[LimitadorPorHost] = None,
+    tentativas: int = 1,
+    ao_falhar=None
+):
+    """Navega até a URL respeitando os limites por host e repetindo em falhas transitórias."""
+    def _get():
+        if limitador:
+            with limitador.requisicao(url):
+                driver.get(url)
+        else:
+            driver.get(url)
+
+    executa_com_retentativas(
+        _get, lambda e: isinstance(e, (TimeoutException, WebDriverException)),
+        tentativas=tentativas, descricao=url, ao_falhar=ao_falhar
+    )
+
+
+def _extrai_pagina_por_elementos(driver: webdriver.Chrome, nome_categoria: str, url_atual: str):
+    """Extração original, campo a campo (~10 chamadas ao WebDriver por livro)."""
+    produtos = driver.find_elements(*PageSelectors.PRODUCT)
+    livros = []
+    for livro_element in produtos:
+        data = extrair_dados_livro(livro_element, nome_categoria)
+        if data:
+            livros.append(data)
+
+    try:
+        prox_pag_link_relativo = driver.find_element(*PageSelectors.NEXT_PAGE).get_attribute("href")
+        url_proxima = urljoin(url_atual, prox_pag_link_relativo)
+    except NoSuchElementException:
+        url_proxima = None
+    return livros, url_proxima, len(produtos) - len(livros)
+
+
+def itera_paginas_categoria(
+    driver: webdriver.Chrome,
+    url_categoria: str,
+    nome_categoria: str,
+    limitador: Optional[LimitadorPorHost] = None,
+    tentativas: int = 1,
+    modo_extracao: str = "elementos"
+) -> Iterator[PaginaRaspada]:
+    """
+    Percorre a paginação da categoria a partir de `url_categoria` (que pode ser
+    uma página intermediária, ao retomar uma raspagem), página a página.
+    """
     url_atual = url_categoria
- 
-    while True:
+
+    while url_atual:
         logging.info(f"Acessando página da categoria '{nome_categoria}': {url_atual}")
-        driver.get(url_atual)
+        falhas = []
+        _abre_pagina(driver, url_atual, limitador, tentativas, ao_falhar=falhas.append)
+
+        if modo_extracao == "script":
+            livros, url_proxima, descartados = extrair_livros_pagina_script(driver, nome_categoria)
+        elif modo_extracao == "fonte":
+            livros, url_proxima, descartados = extrair_livros_pagina_fonte(driver, nome_categoria, url_atual)
+        else:
+            livros, url_proxima, descartados = _extrai_pagina_por_elementos(driver, nome_categoria, url_atual)
+        yield PaginaRaspada(
+            url_atual, livros, url_proxima, retentativas=len(falhas), livros_descartados=descartados
+        )
+
+        if not url_proxima:
+            logging.info(f"Não há mais páginas para raspar na categoria '{nome_categoria}'.")
+        url_atual = url_proxima
+
+
+def raspa_livros_categoria(
+    driver: webdriver.Chrome,
+    url_categoria: str,
+    nome_categoria: str,
+    limitador: Optional[LimitadorPorHost] = None,
+    tentativas: int = 1,
+    modo_extracao: str = "elementos"
+) -> list[dict]:
+    """Realiza a raspagem de todos os livros de uma categoria, percorrendo a paginação."""
+    return [
+        livro
+        for pagina in itera_paginas_categoria(
+            driver, url_categoria, nome_categoria, limitador, tentativas, modo_extracao
+        )
+        for livro in pagina.livros
+    ]
+
+
+class SeleniumScraper:
+    """
+    Backend de raspagem com Chrome headless. Mais pesado que o HttpScraper,
+    mas necessário para sites que montam o conteúdo com JavaScript.
+    """
+
+    nome = "selenium"
+    # Cada worker precisa do seu próprio navegador
+    thread_safe = False
+
+    def __init__(
+        self,
+        limitador: Optional[LimitadorPorHost] = None,
+        tentativas: int = 1,
+        modo_extracao: str = SCRAPER_EXTRACAO_SELENIUM
+    ):
+        if modo_extracao not in MODOS_EXTRACAO_SELENIUM:
+            raise ValueError(
+                f"Modo de extração desconhecido: '{modo_extracao}'. Opções: {list(MODOS_EXTRACAO_SELENIUM)}"
+            )
+        self._limitador = limitador
+        self._tentativas = tentativas
+        self.modo_extracao = modo_extracao
+        # O navegador vem do pool compartilhado: pode já estar aberto de uma execução anterior
+        self._instancia = pool_webdrivers.adquire()
+        self.round_trips = 0
+        self._conta_round_trips()
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        return self._instancia.driver
+
+    def _conta_round_trips(self):
+        """
+        Conta os comandos enviados ao ChromeDriver. Todas as chamadas (inclusive as
+        de WebElement) passam por driver.execute, cada uma é uma ida e volta HTTP.
+        """
+        execute_original = self.driver.execute
+
+        def execute_contado(*args, **kwargs):
+            self.round_trips += 1
+            return execute_original(*args, **kwargs)
+
+        self.driver.execute = execute_contado
+
+    def _remove_contagem(self):
+        # Restaura o driver.execute da classe antes de o navegador voltar ao pool
+        vars(self.driver).pop("execute", None)
+
+    def _recicla_se_necessario(self):
+        if pool_webdrivers.precisa_reciclar(self._instancia):
+            self._remove_contagem()
+            self._instancia = pool_webdrivers.recicla(self._instancia)
+            self._conta_round_trips()
 
-        livros_elements = driver.find_elements(By.CLASS_NAME, "product_pod")
+    def lista_categorias(self, base_url: str) -> list[dict]:
+        """Retorna as categorias (nome e URL absoluta) listadas na página inicial."""
+        _abre_pagina(self.driver, base_url, self._limitador, self._tentativas)
+        self._instancia.paginas += 1
+        categoria_elements = self.driver.find_elements(*PageSelectors.CATEGORY_LINKS)
+        return [
+            {'nome': cat_el.text, 'url': urljoin(base_url, cat_el.get_attribute('href'))}
+            for cat_el in categoria_elements
+        ]
 
-        for livro_element in livros_elements:
-            data = extrair_dados_livro(livro_element, nome_categoria)
-            if data:
-                dados_livros.append(data)
+    def itera_paginas_categoria(
+        self, url_categoria: str, nome_categoria: str, validadores: Optional[dict] = None
+    ) -> Iterator[PaginaRaspada]:
+        # O navegador não expõe requisições condicionais: os validadores são ignorados
+        # e todas as páginas são interpretadas
+        # A reciclagem acontece entre categorias, quando o navegador já serviu páginas demais
+        self._recicla_se_necessario()
+        round_trips_antes, total_livros = self.round_trips, 0
+        for pagina in itera_paginas_categoria(
+            self.driver, url_categoria, nome_categoria, self._limitador, self._tentativas, self.modo_extracao
+        ):
+            self._instancia.paginas += 1
+            total_livros += len(pagina.livros)
+            yield pagina
+        logging.info(
+            f"Categoria '{nome_categoria}': {total_livros} livros com "
+            f"{self.round_trips - round_trips_antes} chamadas ao WebDriver (modo '{self.modo_extracao}')."
+        )
 
+    def raspa_livros_categoria(self, url_categoria: str, nome_categoria: str) -> list[dict]:
+        return [
+            livro
+            for pagina in self.itera_paginas_categoria(url_categoria, nome_categoria)
+            for livro in pagina.livros
+        ]
+
+    def fechar(self):
+        logging.info("Devolvendo o navegador ao pool.")
+        self._remove_contagem()
+        pool_webdrivers.devolve(self._instancia)
+
+
+BACKENDS_SCRAPER = {
+    HttpScraper.nome: HttpScraper,
+    SeleniumScraper.nome: SeleniumScraper,
+}
+
+
+def cria_scraper(backend: str, limitador: Optional[LimitadorPorHost] = None):
+    """Instancia o backend de raspagem pelo nome ("http" ou "selenium")."""
+    if backend not in BACKENDS_SCRAPER:
+        raise ValueError(f"Backend de raspagem desconhecido: '{backend}'. Opções: {list(BACKENDS_SCRAPER)}")
+    return BACKENDS_SCRAPER[backend](limitador=limitador, tentativas=SCRAPER_TENTATIVAS)
+
+
+class PoolDeScrapers:
+    """
+    Conjunto de instâncias de um backend para os workers da raspagem concorrente.
+    Backends thread-safe (HTTP) usam uma única instância; os demais (Selenium)
+    ganham uma instância por worker, criada sob demanda.
+    """
+
+    def __init__(self, backend: str, tamanho: int, limitador: LimitadorPorHost):
+        self._backend = backend
+        self._limitador = limitador
+        self._livres: Queue = Queue()
+        self._criados = [cria_scraper(backend, limitador)]
+        self.principal = self._criados[0]
+        self.tamanho = max(1, tamanho)
+        for _ in range(self.tamanho if self.principal.thread_safe else 1):
+            self._livres.put(self.principal)
+        self._faltam_criar = 0 if self.principal.thread_safe else self.tamanho - 1
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def empresta(self):
+        """Reserva uma instância livre do pool enquanto o bloco `with` estiver ativo."""
+        with self._lock:
+            criar = self._livres.empty() and self._faltam_criar > 0
+            if criar:
+                self._faltam_criar -= 1
+        if criar:
+            scraper = cria_scraper(self._backend, self._limitador)
+            with self._lock:
+                self._criados.append(scraper)
+        else:
+            scraper = self._livres.get()
         try:
-            next_page_element = driver.find_element(By.CLASS_NAME, "next")
-            prox_pag_link_relativo = next_page_element.find_element(By.TAG_NAME, "a").get_attribute("href")
-            url_atual = urljoin(url_atual, prox_pag_link_relativo)
-        except NoSuchElementException:
-            logging.info(f"Não há mais páginas para raspar na categoria '{nome_categoria}'.")
-            break
+            yield scraper
+        finally:
+            self._livres.put(scraper)
+
+    def round_trips(self) -> Optional[int]:
+        """Total de chamadas ao WebDriver das instâncias, ou None para backends sem navegador."""
+        contagens = [s.round_trips for s in self._criados if hasattr(s, "round_trips")]
+        return sum(contagens) if contagens else None
+
+    def fechar(self):
+        for scraper in self._criados:
+            scraper.fechar()
 
-    return dados_livros
 
+def _copia_checkpoint(checkpoint: dict) -> dict:
+    return {**checkpoint, "categorias_concluidas": list(checkpoint["categorias_concluidas"])}
 
-def rodar_scraper_completo(id_tarefa: str | None = None):
+
+def _aplica_checkpoint(categorias: list[dict], checkpoint: dict) -> tuple[list[dict], list[str]]:
+    """
+    Remove as categorias já concluídas e faz a categoria interrompida recomeçar
+    da primeira página ainda não gravada. Retorna (categorias restantes, concluídas).
+    """
+    nomes = {categoria['nome'] for categoria in categorias}
+    concluidas = [nome for nome in checkpoint.get("categorias_concluidas", []) if nome in nomes]
+    restantes = []
+    for categoria in categorias:
+        if categoria['nome'] in concluidas:
+            continue
+        if categoria['nome'] == checkpoint.get("categoria_atual") and checkpoint.get("proxima_pagina"):
+            categoria = {**categoria, "url": checkpoint["proxima_pagina"]}
+        restantes.append(categoria)
+    return restantes, concluidas
+
+
+def rodar_scraper_completo(
+    id_tarefa: str | None = None,
+    backend: str | None = None,
+    concorrencia: int | None = None,
+    retomar: bool = False,
+    incremental: bool | None = None
+):
     """
     Função principal para rodar o scraper completo.
     Atualiza o status da tarefa.
+
+    Args:
+        id_tarefa: ID da tarefa a ser atualizada com o andamento da raspagem.
+        backend: "http" ou "selenium". Se omitido, usa SCRAPER_BACKEND.
+        concorrencia: Número de categorias raspadas em paralelo. Se omitido,
+            usa SCRAPER_CONCORRENCIA. Com 1, a raspagem é sequencial.
+        retomar: Se a última raspagem terminou em ERRO ou INTERROMPIDA, continua
+            a partir do seu checkpoint em vez de recomeçar do zero.
+        incremental: Pula as páginas que não mudaram desde a última gravação
+            (requisições condicionais e hash do conteúdo). Se omitido, usa
+            SCRAPER_INCREMENTAL.
     """
-    driver = _setup_driver()
-    total_livros_encontrados = 0
+    pool = None
+    progresso = {}
     try:
+        limitador = LimitadorPorHost(SCRAPER_MAX_POR_HOST, SCRAPER_INTERVALO_POR_HOST)
+        pool = PoolDeScrapers(backend or SCRAPER_BACKEND_PADRAO, concorrencia or SCRAPER_CONCORRENCIA, limitador)
+        scraper = pool.principal
         with SessionLocal() as db:
+            progresso = {
+                "backend": scraper.nome,
+                "concorrencia": pool.tamanho,
+                "total_categorias": 0,
+                "categorias_concluidas": 0,
+                "categoria_atual": None,
+                "total_encontrado": 0,
+                "inseridos": 0,
+                "atualizados": 0,
+                "inalterados": 0,
+            }
+
+            metricas = MetricasRaspagem(SCRAPER_INTERVALO_PROGRESSO_SEGUNDOS)
+
+            def publica_progresso(forcar: bool = False):
+                # Limitada a uma escrita a cada SCRAPER_INTERVALO_PROGRESSO_SEGUNDOS, para
+                # que o status não vire gargalo da raspagem (exceto quando `forcar`)
+                if not id_tarefa or not metricas.deve_publicar(forcar):
+                    return
+                progresso.update(metricas.resumo(progresso["total_categorias"] - progresso["categorias_concluidas"]))
+                atualiza_tarefa(db, id_tarefa, resultado={"mensagem": "Raspagem em andamento", **progresso})
+
             # 1. ATUALIZAR STATUS DA TAREFA
             if id_tarefa:
-                atualiza_tarefa(db, id_tarefa, estado="EXECUTANDO", resultado={"mensagem": "Raspagem iniciada"})
+                atualiza_tarefa(db, id_tarefa, estado="EXECUTANDO", resultado={"mensagem": "Raspagem iniciada", **progresso})
 
             # 2. BUSCAR CATEGORIAS
-            base_url = "https://books.toscrape.com/"
-            driver.get(base_url)
-            categoria_elements = driver.find_elements(By.XPATH, "//div[@class='side_categories']//ul/li/ul/li/a")
-            categorias_para_raspar = [
-                {'nome': cat_el.text, 'url': urljoin(base_url, cat_el.get_attribute('href'))}
-                for cat_el in categoria_elements
-            ]
-            
-            todos_os_livros = []
-            # 3. RASPAGEM SEQUENCIAL (Mais estável para a Render)
-            for categoria in categorias_para_raspar:
+            categorias_para_raspar = scraper.lista_categorias(SCRAPER_BASE_URL)
+            progresso["total_categorias"] = len(categorias_para_raspar)
+
+            # O checkpoint só avança depois que as páginas foram gravadas: descreve
+            # as categorias concluídas e a próxima página da categoria interrompida
+            progresso["checkpoint"] = {
+                "base_url": SCRAPER_BASE_URL,
+                "categorias_concluidas": [],
+                "categoria_atual": None,
+                "proxima_pagina": None,
+            }
+            encontrado = busca_checkpoint_para_retomar(db) if retomar else None
+            if encontrado and encontrado[1].get("base_url") == SCRAPER_BASE_URL:
+                id_origem, checkpoint = encontrado
+                categorias_para_raspar, concluidas = _aplica_checkpoint(categorias_para_raspar, checkpoint)
+                progresso["retomada_de"] = id_origem
+                progresso["categorias_concluidas"] = len(concluidas)
+                progresso["checkpoint"] = {**checkpoint, "categorias_concluidas": concluidas}
+                logging.info(
+                    f"Retomando a raspagem da tarefa {id_origem}: {len(concluidas)} categorias já concluídas"
+                    + (f", '{checkpoint['categoria_atual']}' a partir de {checkpoint['proxima_pagina']}."
+                       if checkpoint.get("proxima_pagina") else ".")
+                )
+            # Posição da raspagem incluindo as páginas ainda no lote (vira checkpoint ao gravar)
+            posicao = _copia_checkpoint(progresso["checkpoint"])
+
+            def produz_paginas(categoria: dict):
                 logging.info(f"--- INICIANDO RASPAGEM DA CATEGORIA: {categoria['nome']} ---")
-                livros_desta_categoria = raspa_livros_categoria(driver, categoria['url'], categoria['nome'])
-                if livros_desta_categoria:
-                    todos_os_livros.extend(livros_desta_categoria)
+                with pool.empresta() as instancia:
+                    yield from instancia.itera_paginas_categoria(categoria['url'], categoria['nome'], validadores)
 
-            total_livros_encontrados = len(todos_os_livros)
-            logging.info(f"Raspagem finalizada. Total de {total_livros_encontrados} livros encontrados.")
+            # Raspagem incremental: validadores das páginas já gravadas (somente leitura nos workers)
+            usar_incremental = SCRAPER_INCREMENTAL if incremental is None else incremental
+            validadores = paginas_repositorio.carrega_validadores(db) if usar_incremental else None
+            progresso["incremental"] = usar_incremental
+            progresso["paginas_visitadas"] = 0
+            progresso["paginas_puladas"] = 0
+            paginas_puladas = []
+
+            lote = []
+            validadores_pendentes = []
 
-            # 4. SALVAR DADOS EM MASSA E ATUALIZAR TAREFA
-            if todos_os_livros:
-                logging.info(f"Salvando {total_livros_encontrados} livros no banco de dados em uma única transação.")
-                salva_dados_livros(db, todos_os_livros)
+            def grava_lote():
+                # Cada lote é um upsert em sua própria transação: uma falha adiante não desfaz o que já foi salvo.
+                # Os validadores das páginas entram na mesma transação dos seus livros
+                paginas_repositorio.grava_validadores(db, validadores_pendentes)
+                contagens = salva_dados_livros(db, lote, atualiza_caches=False)
+                db.commit()
+                for chave, valor in contagens.items():
+                    progresso[chave] += valor
+                progresso["checkpoint"] = _copia_checkpoint(posicao)
+                lote.clear()
+                validadores_pendentes.clear()
+
+            # 3. RASPAGEM CONCORRENTE COM GRAVAÇÃO EM LOTES
+            # As páginas chegam na ordem da execução sequencial e a memória fica limitada
+            # ao lote atual mais algumas páginas por worker, independente do tamanho do catálogo
+            try:
+                for categoria, pagina, ultima_pagina in itera_paginas_em_ordem(
+                    categorias_para_raspar, produz_paginas, pool.tamanho
+                ):
+                    progresso["categoria_atual"] = categoria['nome']
+                    if pagina:
+                        progresso["total_encontrado"] += len(pagina.livros)
+                        lote.extend(pagina.livros)
+                        progresso["paginas_visitadas"] += 1
+                        if pagina.inalterada:
+                            progresso["paginas_puladas"] += 1
+                            paginas_puladas.append(pagina.url)
+                        if pagina.validadores:
+                            validadores_pendentes.append(pagina.validadores)
+                        metricas.registra_pagina(pagina)
+
+                    if ultima_pagina:
+                        posicao["categorias_concluidas"].append(categoria['nome'])
+                        posicao["categoria_atual"], posicao["proxima_pagina"] = None, None
+                    else:
+                        posicao["categoria_atual"], posicao["proxima_pagina"] = categoria['nome'], pagina.url_proxima
+
+                    if ultima_pagina:
+                        progresso["categorias_concluidas"] += 1
+                        metricas.registra_categoria_concluida()
+
+                    if len(lote) >= SCRAPER_TAMANHO_LOTE or len(validadores_pendentes) >= PAGINAS_POR_LOTE:
+                        grava_lote()
+                        publica_progresso(forcar=True)  # o checkpoint acabou de avançar
+                    else:
+                        publica_progresso()
+
+                if lote or validadores_pendentes:
+                    grava_lote()
+            except Exception:
+                # Salva as páginas já raspadas antes de propagar a falha
+                if lote or validadores_pendentes:
+                    try:
+                        db.rollback()
+                        grava_lote()
+                    except Exception as erro_lote:
+                        # Se a falha veio do banco, esta gravação costuma falhar também;
+                        # a exceção original é a que vai para o status ERRO da tarefa
+                        db.rollback()
+                        logging.error(f"Falha ao gravar o lote pendente após o erro da raspagem: {erro_lote}")
+                raise
+            finally:
+                # Os lotes já gravados precisam aparecer no índice de busca e no snapshot, mesmo após uma falha
+                if progresso["inseridos"] or progresso["atualizados"]:
+                    db.rollback()
+                    atualiza_caches_catalogo(db)
+
+            total_livros_encontrados = progresso["total_encontrado"]
+            logging.info(f"Raspagem finalizada. Total de {total_livros_encontrados} livros encontrados.")
 
+            # 4. ATUALIZAR TAREFA
+            progresso["categoria_atual"] = None
+            progresso.update(metricas.resumo(categorias_restantes=0))
+            resultado = {**progresso, "urls_paginas_puladas": paginas_puladas}
+            round_trips = pool.round_trips()
+            if round_trips is not None:
+                resultado["modo_extracao"] = scraper.modo_extracao
+                resultado["round_trips_webdriver"] = round_trips
+                resultado["round_trips_por_livro"] = round(round_trips / max(total_livros_encontrados, 1), 2)
             if id_tarefa:
-                atualiza_tarefa(db, id_tarefa, estado="CONCLUIDA", resultado={"total_encontrado": total_livros_encontrados})
+                atualiza_tarefa(db, id_tarefa, estado="CONCLUIDA", resultado=resultado)
                 logging.info(f"Tarefa {id_tarefa} concluída com sucesso.")
 
-        return {"total_encontrado": total_livros_encontrados}
+        return resultado
 
     except Exception as e:
         logging.error(f"Erro ao rodar o scraper: {e}", exc_info=True)
@@ -108,7 +521,7 @@ def rodar_scraper_completo(id_tarefa: str | None = None):
         if id_tarefa:
             try:
                 with SessionLocal() as db_erro:
-                    atualiza_tarefa(db_erro, id_tarefa, estado="ERRO", resultado={"erro": str(e)})
+                    atualiza_tarefa(db_erro, id_tarefa, estado="ERRO", resultado={"erro": str(e), **progresso})
                     db_erro.commit()
                     logging.info(f"Tarefa {id_tarefa} marcada como ERRO.")
             except Exception as db_exc:
@@ -116,9 +529,8 @@ def rodar_scraper_completo(id_tarefa: str | None = None):
 
         return {"error": str(e)}
     finally:
-        if driver:  # Apenas se o driver principal ainda estiver ativo (em caso de erro inicial)
-            logging.info("Fechando o driver do Chrome principal.")
-            driver.quit()
+        if pool:  # Apenas se o backend chegou a ser inicializado
+            pool.fechar()
 
 if __name__ == "__main__":
     logging.info("Executando o scraper em modo standalone...")
@@ -0,0 +1,201 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+# Caminho de um ChromeDriver já instalado; evita a resolução (com acesso à rede) pelo webdriver_manager
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+
+# Navegadores mantidos abertos entre execuções do scraper
+SELENIUM_POOL_MAX_OCIOSOS = int(os.getenv("SELENIUM_POOL_MAX_OCIOSOS", "4"))
+# Um navegador é substituído após servir este número de páginas (limita vazamentos de memória do Chrome)
+SELENIUM_RECICLAR_APOS_PAGINAS = int(os.getenv("SELENIUM_RECICLAR_APOS_PAGINAS", "200"))
+# Navegadores abertos na inicialização da aplicação quando o backend padrão é o Selenium
+SELENIUM_POOL_PREAQUECER = int(os.getenv("SELENIUM_POOL_PREAQUECER", "1"))
+# Navegadores ociosos há mais tempo que isso são encerrados em vez de reutilizados
+SELENIUM_OCIOSO_MAX_SEGUNDOS = int(os.getenv("SELENIUM_OCIOSO_MAX_SEGUNDOS", "1800"))
+
+_estado = {
+    "caminho_driver": None,
+    "lock": threading.Lock(),
+}
+
+
+def caminho_chromedriver() -> str:
+    """
+    Resolve o caminho do ChromeDriver uma única vez por processo: usa
+    CHROMEDRIVER_PATH se definido, senão o webdriver_manager.
+    """
+    with _estado["lock"]:
+        if _estado["caminho_driver"] is None:
+            if CHROMEDRIVER_PATH:
+                _estado["caminho_driver"] = CHROMEDRIVER_PATH
+            else:
+                logging.info("Instalando e configurando o ChromeDriver...")
+                _estado["caminho_driver"] = ChromeDriverManager().install()
+        return _estado["caminho_driver"]
+
+
+def _setup_driver() -> webdriver.Chrome:
+    """Configura e inicializa o driver do Selenium Chrome."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+
+    service = Service(caminho_chromedriver())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    logging.info("Driver do Chrome inicializado com sucesso.")
+    return driver
+
+
+class DriverReutilizavel:
+    """Navegador do pool e o número de páginas que já serviu."""
+
+    __slots__ = ("driver", "paginas", "criado_em", "ocioso_desde")
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.paginas = 0
+        self.criado_em = time.monotonic()
+        self.ocioso_desde: Optional[float] = None
+
+
+def _encerra(instancia: DriverReutilizavel):
+    try:
+        instancia.driver.quit()
+    except Exception as e:
+        logging.warning(f"Falha ao encerrar um navegador do pool: {e}")
+
+
+class PoolWebDrivers:
+    """
+    Navegadores Chrome reutilizáveis entre execuções do scraper, para que uma
+    raspagem agendada comece sem o custo de abrir o Chrome. Cada navegador é
+    reciclado após `reciclar_apos_paginas` páginas.
+    """
+
+    def __init__(
+        self,
+        max_ociosos: int = SELENIUM_POOL_MAX_OCIOSOS,
+        reciclar_apos_paginas: int = SELENIUM_RECICLAR_APOS_PAGINAS,
+        ocioso_max_segundos: int = SELENIUM_OCIOSO_MAX_SEGUNDOS,
+        fabrica: Callable[[], webdriver.Chrome] = _setup_driver,
+    ):
+        self.max_ociosos = max_ociosos
+        self.reciclar_apos_paginas = reciclar_apos_paginas
+        self.ocioso_max_segundos = ocioso_max_segundos
+        self._fabrica = fabrica
+        self._lock = threading.Lock()
+        self._ociosos: List[DriverReutilizavel] = []
+        self._contadores = {"criados": 0, "reutilizados": 0, "reciclados": 0, "descartados": 0, "em_uso": 0}
+
+    def _cria(self) -> DriverReutilizavel:
+        instancia = DriverReutilizavel(self._fabrica())
+        with self._lock:
+            self._contadores["criados"] += 1
+        return instancia
+
+    def _descarta(self, instancia: DriverReutilizavel):
+        with self._lock:
+            self._contadores["descartados"] += 1
+        _encerra(instancia)
+
+    def adquire(self) -> DriverReutilizavel:
+        """Entrega um navegador ocioso que ainda responda, ou abre um novo."""
+        while True:
+            with self._lock:
+                instancia = self._ociosos.pop() if self._ociosos else None
+                self._contadores["em_uso"] += 1
+            if instancia is None:
+                try:
+                    return self._cria()
+                except Exception:
+                    with self._lock:
+                        self._contadores["em_uso"] -= 1
+                    raise
+
+            expirado = time.monotonic() - instancia.ocioso_desde > self.ocioso_max_segundos
+            if not expirado:
+                try:
+                    instancia.driver.current_url  # verifica se o navegador ainda responde
+                    instancia.ocioso_desde = None
+                    with self._lock:
+                        self._contadores["reutilizados"] += 1
+                    return instancia
+                except WebDriverException:
+                    pass
+            with self._lock:
+                self._contadores["em_uso"] -= 1
+            self._descarta(instancia)
+
+    def recicla(self, instancia: DriverReutilizavel) -> DriverReutilizavel:
+        """Encerra um navegador em uso e o substitui por um novo."""
+        logging.info(f"Reciclando navegador após {instancia.paginas} páginas.")
+        _encerra(instancia)
+        novo = self._cria()
+        with self._lock:
+            self._contadores["reciclados"] += 1
+        return novo
+
+    def precisa_reciclar(self, instancia: DriverReutilizavel) -> bool:
+        return instancia.paginas >= self.reciclar_apos_paginas
+
+    def devolve(self, instancia: DriverReutilizavel):
+        """Devolve um navegador ao pool, ou o encerra se já serviu páginas demais ou o pool está cheio."""
+        with self._lock:
+            self._contadores["em_uso"] -= 1
+            manter = len(self._ociosos) < self.max_ociosos and not self.precisa_reciclar(instancia)
+        if manter:
+            try:
+                instancia.driver.delete_all_cookies()
+            except WebDriverException:
+                manter = False
+        if not manter:
+            self._descarta(instancia)
+            return
+        instancia.ocioso_desde = time.monotonic()
+        with self._lock:
+            self._ociosos.append(instancia)
+
+    def preaquece(self, quantidade: int = 1):
+        """Abre navegadores até haver `quantidade` ociosos (chamado na inicialização da aplicação)."""
+        try:
+            while True:
+                with self._lock:
+                    if len(self._ociosos) >= min(quantidade, self.max_ociosos):
+                        return
+                instancia = self._cria()
+                instancia.ocioso_desde = time.monotonic()
+                with self._lock:
+                    self._ociosos.append(instancia)
+        except Exception as e:
+            logging.error(f"Falha ao preaquecer o pool de navegadores: {e}", exc_info=True)
+
+    def encerra(self):
+        """Encerra todos os navegadores ociosos."""
+        with self._lock:
+            ociosos, self._ociosos = self._ociosos, []
+        for instancia in ociosos:
+            _encerra(instancia)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                **self._contadores,
+                "ociosos": len(self._ociosos),
+                "paginas_por_ocioso": [instancia.paginas for instancia in self._ociosos],
+                "max_ociosos": self.max_ociosos,
+                "reciclar_apos_paginas": self.reciclar_apos_paginas,
+                "caminho_driver": _estado["caminho_driver"],
+            }
+
+
+pool_webdrivers = PoolWebDrivers()
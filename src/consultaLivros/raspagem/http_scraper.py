@@ -0,0 +1,151 @@
+import hashlib
+import logging
+from typing import Iterator, Optional
+from urllib.parse import urljoin
+
+import httpx
+from lxml import html
+
+from .book_scraper import PageSelectors, PaginaRaspada, extrair_dados_livro_html, seletor_lxml
+from .politica import LimitadorPorHost, executa_com_retentativas
+
+
+def _e_erro_transitorio(erro: Exception) -> bool:
+    """Falhas de rede, timeouts, 429 e 5xx justificam uma nova tentativa."""
+    if isinstance(erro, httpx.HTTPStatusError):
+        return erro.response.status_code == 429 or erro.response.status_code >= 500
+    return isinstance(erro, httpx.TransportError)
+
+
+class HttpScraper:
+    """
+    Backend de raspagem sem navegador: baixa as páginas estáticas com um cliente
+    HTTP com pool de conexões (keep-alive) e as interpreta com lxml, usando os
+    mesmos seletores do backend Selenium.
+    """
+
+    nome = "http"
+    # O httpx.Client pode ser usado por várias threads: uma instância atende todos os workers
+    thread_safe = True
+
+    def __init__(
+        self,
+        limitador: Optional[LimitadorPorHost] = None,
+        tentativas: int = 3,
+        max_conexoes: int = 10,
+        timeout: float = 20.0
+    ):
+        self._limitador = limitador or LimitadorPorHost(max_concorrentes=max_conexoes)
+        self._tentativas = tentativas
+        self._client = httpx.Client(
+            limits=httpx.Limits(max_connections=max_conexoes, max_keepalive_connections=max_conexoes),
+            timeout=timeout,
+            follow_redirects=True,
+            headers={"User-Agent": "consultaLivros-scraper/1.0"},
+        )
+
+    def _get(self, url: str, cabecalhos: Optional[dict] = None) -> httpx.Response:
+        with self._limitador.requisicao(url):
+            resposta = self._client.get(url, headers=cabecalhos)
+        # 304 é a resposta esperada de uma requisição condicional a uma página inalterada
+        if resposta.status_code != httpx.codes.NOT_MODIFIED:
+            resposta.raise_for_status()
+        return resposta
+
+    def _baixa(self, url: str, cabecalhos: Optional[dict] = None, ao_falhar=None) -> httpx.Response:
+        return executa_com_retentativas(
+            lambda: self._get(url, cabecalhos), _e_erro_transitorio,
+            tentativas=self._tentativas, descricao=url, ao_falhar=ao_falhar
+        )
+
+    def _baixa_pagina(self, url: str) -> html.HtmlElement:
+        return html.fromstring(self._baixa(url).text)
+
+    def lista_categorias(self, base_url: str) -> list[dict]:
+        """Retorna as categorias (nome e URL absoluta) listadas na página inicial."""
+        pagina = self._baixa_pagina(base_url)
+        return [
+            {"nome": link.text_content().strip(), "url": urljoin(base_url, link.get("href"))}
+            for link in seletor_lxml(PageSelectors.CATEGORY_LINKS)(pagina)
+        ]
+
+    def itera_paginas_categoria(
+        self, url_categoria: str, nome_categoria: str, validadores: Optional[dict] = None
+    ) -> Iterator[PaginaRaspada]:
+        """
+        Percorre a paginação da categoria a partir de `url_categoria` (que pode ser
+        uma página intermediária, ao retomar uma raspagem), página a página.
+
+        Com `validadores` (URL -> etag, last_modified, hash_conteudo, url_proxima
+        da última versão gravada), faz requisições condicionais e não interpreta
+        páginas que responderam 304 ou cujo conteúdo tem o mesmo hash.
+        """
+        validadores = validadores or {}
+        url_atual = url_categoria
+
+        while url_atual:
+            logging.info(f"Acessando página da categoria '{nome_categoria}': {url_atual}")
+            conhecida = validadores.get(url_atual)
+            cabecalhos = {}
+            if conhecida and conhecida["etag"]:
+                cabecalhos["If-None-Match"] = conhecida["etag"]
+            if conhecida and conhecida["last_modified"]:
+                cabecalhos["If-Modified-Since"] = conhecida["last_modified"]
+            falhas = []
+            resposta = self._baixa(url_atual, cabecalhos, ao_falhar=falhas.append)
+
+            if conhecida and resposta.status_code == httpx.codes.NOT_MODIFIED:
+                pagina_raspada = PaginaRaspada(
+                    url_atual, [], conhecida["url_proxima"], inalterada=True, validadores={"url": url_atual, **conhecida}
+                )
+            else:
+                hash_conteudo = hashlib.sha256(resposta.content).hexdigest()
+                novos_validadores = {
+                    "url": url_atual,
+                    "etag": resposta.headers.get("ETag"),
+                    "last_modified": resposta.headers.get("Last-Modified"),
+                    "hash_conteudo": hash_conteudo,
+                }
+                if conhecida and conhecida["hash_conteudo"] == hash_conteudo:
+                    pagina_raspada = PaginaRaspada(
+                        url_atual, [], conhecida["url_proxima"], inalterada=True,
+                        validadores={**novos_validadores, "url_proxima": conhecida["url_proxima"]}
+                    )
+                else:
+                    pagina_raspada = self._interpreta_pagina(resposta, url_atual, nome_categoria, novos_validadores)
+            yield pagina_raspada._replace(retentativas=len(falhas))
+
+            if not pagina_raspada.url_proxima:
+                logging.info(f"Não há mais páginas para raspar na categoria '{nome_categoria}'.")
+            url_atual = pagina_raspada.url_proxima
+
+    def _interpreta_pagina(
+        self, resposta: httpx.Response, url_atual: str, nome_categoria: str, validadores: dict
+    ) -> PaginaRaspada:
+        pagina = html.fromstring(resposta.text)
+
+        produtos = seletor_lxml(PageSelectors.PRODUCT)(pagina)
+        livros_pagina = []
+        for livro_element in produtos:
+            data = extrair_dados_livro_html(livro_element, nome_categoria, url_atual)
+            if data:
+                livros_pagina.append(data)
+
+        proxima = seletor_lxml(PageSelectors.NEXT_PAGE)(pagina)
+        url_proxima = urljoin(url_atual, proxima[0].get("href")) if proxima else None
+        return PaginaRaspada(
+            url_atual, livros_pagina, url_proxima,
+            validadores={**validadores, "url_proxima": url_proxima},
+            livros_descartados=len(produtos) - len(livros_pagina)
+        )
+
+    def raspa_livros_categoria(self, url_categoria: str, nome_categoria: str) -> list[dict]:
+        """Realiza a raspagem de todos os livros de uma categoria, percorrendo a paginação."""
+        return [
+            livro
+            for pagina in self.itera_paginas_categoria(url_categoria, nome_categoria)
+            for livro in pagina.livros
+        ]
+
+    def fechar(self):
+        self._client.close()
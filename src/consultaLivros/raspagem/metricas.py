@@ -0,0 +1,52 @@
+import time
+from typing import Optional
+
+from .book_scraper import PaginaRaspada
+
+
+class MetricasRaspagem:
+    """
+    Métricas de andamento de uma execução do scraper (vazão, erros e ETA) e
+    controle da frequência com que elas são publicadas na tarefa.
+    Usada apenas pela thread que consome as páginas, então não precisa de lock.
+    """
+
+    def __init__(self, intervalo_publicacao: float):
+        self.intervalo_publicacao = intervalo_publicacao
+        self.inicio = time.monotonic()
+        self._ultima_publicacao = float("-inf")
+        self.paginas = 0
+        self.livros = 0
+        self.retentativas = 0
+        self.livros_descartados = 0
+        self.categorias_concluidas = 0  # apenas desta execução (sem as de um checkpoint)
+
+    def registra_pagina(self, pagina: PaginaRaspada):
+        self.paginas += 1
+        self.livros += len(pagina.livros)
+        self.retentativas += pagina.retentativas
+        self.livros_descartados += pagina.livros_descartados
+
+    def registra_categoria_concluida(self):
+        self.categorias_concluidas += 1
+
+    def deve_publicar(self, forcar: bool = False) -> bool:
+        """True se já passou o intervalo mínimo desde a última publicação (ou se `forcar`)."""
+        agora = time.monotonic()
+        if not forcar and agora - self._ultima_publicacao < self.intervalo_publicacao:
+            return False
+        self._ultima_publicacao = agora
+        return True
+
+    def resumo(self, categorias_restantes: int) -> dict:
+        decorrido = time.monotonic() - self.inicio
+        eta: Optional[float] = None
+        if self.categorias_concluidas:
+            eta = round(decorrido / self.categorias_concluidas * categorias_restantes, 1)
+        return {
+            "decorrido_segundos": round(decorrido, 1),
+            "paginas_por_segundo": round(self.paginas / decorrido, 2) if decorrido else 0.0,
+            "livros_por_segundo": round(self.livros / decorrido, 2) if decorrido else 0.0,
+            "erros": {"retentativas": self.retentativas, "livros_descartados": self.livros_descartados},
+            "eta_segundos": eta,
+        }
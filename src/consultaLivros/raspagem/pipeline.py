@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+# Marca o fim das páginas de uma categoria na fila do produtor
+_FIM = object()
+
+
+class _CategoriaEmAndamento:
+    def __init__(self, categoria: dict, paginas_em_buffer: int):
+        self.categoria = categoria
+        self.paginas: Queue = Queue(maxsize=paginas_em_buffer)
+        self.futuro = None
+
+
+def itera_paginas_em_ordem(
+    categorias: Iterable[dict],
+    produz_paginas: Callable[[dict], Iterable[Any]],
+    concorrencia: int,
+    paginas_em_buffer: int = 2,
+) -> Iterator[Tuple[dict, Optional[Any], bool]]:
+    """
+    Raspa várias categorias em paralelo e entrega as páginas na mesma ordem da
+    execução sequencial, sem acumular o catálogo em memória.
+
+    No máximo `concorrencia` categorias ficam em andamento ao mesmo tempo, e cada
+    uma guarda no máximo `paginas_em_buffer` páginas ainda não consumidas: um
+    worker adiantado espera (backpressure) até o consumidor chegar à sua categoria.
+
+    Args:
+        categorias: Categorias a raspar, na ordem de entrega.
+        produz_paginas: Função executada nos workers; recebe a categoria e
+            devolve um iterável com um item por página.
+        concorrencia: Número máximo de categorias raspadas em paralelo.
+        paginas_em_buffer: Páginas por categoria aguardando o consumidor.
+
+    Yields:
+        Tuplas (categoria, pagina, ultima_pagina). Uma categoria sem páginas
+        produz uma única tupla com pagina None. Erros de um worker são
+        propagados ao consumidor quando ele chega à categoria que falhou.
+    """
+    cancelado = threading.Event()
+    concorrencia = max(1, concorrencia)
+
+    def _entrega(em_andamento: _CategoriaEmAndamento, item):
+        while not cancelado.is_set():
+            try:
+                em_andamento.paginas.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _worker(em_andamento: _CategoriaEmAndamento):
+        try:
+            for pagina in produz_paginas(em_andamento.categoria):
+                if not _entrega(em_andamento, pagina):
+                    return
+        finally:
+            _entrega(em_andamento, _FIM)
+
+    pendentes = iter(categorias)
+    fila: deque = deque()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        def _submete_proxima() -> bool:
+            categoria = next(pendentes, None)
+            if categoria is None:
+                return False
+            em_andamento = _CategoriaEmAndamento(categoria, paginas_em_buffer)
+            em_andamento.futuro = executor.submit(_worker, em_andamento)
+            fila.append(em_andamento)
+            return True
+
+        try:
+            while len(fila) < concorrencia and _submete_proxima():
+                pass
+
+            while fila:
+                atual = fila[0]
+                anterior = None
+                while True:
+                    try:
+                        item = atual.paginas.get(timeout=0.1)
+                    except Empty:
+                        if atual.futuro.done() and atual.paginas.empty():
+                            item = _FIM  # worker terminou sem conseguir sinalizar o fim
+                        else:
+                            continue
+                    if item is _FIM:
+                        break
+                    # Adia a entrega em uma página para marcar a última da categoria
+                    if anterior is not None:
+                        yield atual.categoria, anterior, False
+                    anterior = item
+
+                erro = atual.futuro.exception()
+                if erro is not None:
+                    # Entrega a última página obtida antes da falha e propaga a exceção do worker
+                    if anterior is not None:
+                        yield atual.categoria, anterior, False
+                    raise erro
+                yield atual.categoria, anterior, True
+                fila.popleft()
+                _submete_proxima()
+        finally:
+            # Libera workers bloqueados se o consumidor parar antes do fim
+            cancelado.set()
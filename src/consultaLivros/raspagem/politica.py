@@ -0,0 +1,73 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+from urllib.parse import urlsplit
+
+T = TypeVar("T")
+
+
+class LimitadorPorHost:
+    """
+    Limites de cortesia por host, compartilhados entre todos os workers da raspagem:
+    no máximo `max_concorrentes` requisições simultâneas e um intervalo mínimo
+    entre o início de duas requisições ao mesmo host.
+    """
+
+    def __init__(self, max_concorrentes: int = 4, intervalo_minimo: float = 0.0):
+        self.max_concorrentes = max(1, max_concorrentes)
+        self.intervalo_minimo = max(0.0, intervalo_minimo)
+        self._lock = threading.Lock()
+        self._semaforos = defaultdict(lambda: threading.BoundedSemaphore(self.max_concorrentes))
+        self._proximo_horario = defaultdict(float)
+
+    @contextmanager
+    def requisicao(self, url: str):
+        """Bloqueia até que uma requisição para o host da URL seja permitida."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaforo = self._semaforos[host]
+
+        with semaforo:
+            if self.intervalo_minimo:
+                # Reserva o próximo horário livre do host e espera até ele
+                with self._lock:
+                    agora = time.monotonic()
+                    horario = max(agora, self._proximo_horario[host])
+                    self._proximo_horario[host] = horario + self.intervalo_minimo
+                if horario > agora:
+                    time.sleep(horario - agora)
+            yield
+
+
+def executa_com_retentativas(
+    funcao: Callable[[], T],
+    e_transitorio: Callable[[Exception], bool],
+    tentativas: int = 3,
+    espera_base: float = 0.5,
+    descricao: str = "",
+    ao_falhar: Optional[Callable[[Exception], None]] = None,
+) -> T:
+    """
+    Executa `funcao`, repetindo em falhas transitórias com backoff exponencial
+    (espera_base, 2x, 4x, ... com jitter). Erros não transitórios, ou a última
+    falha transitória, são propagados. `ao_falhar` é chamada a cada falha que
+    será repetida (para contabilizar as retentativas).
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return funcao()
+        except Exception as e:
+            if tentativa == tentativas or not e_transitorio(e):
+                raise
+            if ao_falhar:
+                ao_falhar(e)
+            espera = espera_base * (2 ** (tentativa - 1)) * random.uniform(0.8, 1.2)
+            logging.warning(
+                f"Falha transitória em {descricao or 'requisição'} "
+                f"(tentativa {tentativa}/{tentativas}): {e}. Nova tentativa em {espera:.1f}s."
+            )
+            time.sleep(espera)
@@ -0,0 +1,180 @@
+import logging
+import math
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from ..modelos.estatisticas import EstatisticaCatalogo
+from ..modelos.livros import Livro
+
+# Linha de agregado: (categoria, rating, total_livros, total_com_preco, soma_precos)
+LinhaEstatistica = Tuple[str, int, int, int, float]
+
+# Colunas somadas por aplica_delta_estatisticas
+CAMPOS_AGREGADOS = ('total_livros', 'total_com_preco', 'soma_precos')
+
+
+def _chave(livro: dict) -> Tuple[str, int]:
+    return livro["categoria"] or "", livro["rating"] or 0
+
+
+def monta_estatisticas(linhas: Iterable[LinhaEstatistica]) -> Tuple[dict, dict]:
+    """
+    Monta as respostas de /stats/overview e /stats/categories a partir das linhas
+    agregadas. O custo depende do número de (categoria, rating), não do catálogo.
+    """
+    total_geral, com_preco_geral, soma_geral = 0, 0, 0.0
+    distrib_geral = defaultdict(int)
+    por_categoria = {}
+
+    for categoria, rating, total, com_preco, soma in linhas:
+        if not total:
+            continue
+        total_geral += total
+        com_preco_geral += com_preco
+        soma_geral += soma
+        distrib_geral[rating] += total
+
+        stats = por_categoria.setdefault(
+            categoria, {"total_livros": 0, "com_preco": 0, "soma": 0.0, "distribuicao_ratings": {}}
+        )
+        stats["total_livros"] += total
+        stats["com_preco"] += com_preco
+        stats["soma"] += soma
+        stats["distribuicao_ratings"][rating] = total
+
+    gerais = {
+        "total_livros": total_geral,
+        "preco_medio": soma_geral / com_preco_geral if com_preco_geral else 0.0,
+        "distribuicao_ratings": dict(distrib_geral)
+    }
+    stats_por_categoria = {
+        categoria: {
+            "total_livros": stats["total_livros"],
+            "preco_medio": stats["soma"] / stats["com_preco"] if stats["com_preco"] else 0.0,
+            "distribuicao_ratings": stats["distribuicao_ratings"]
+        }
+        for categoria, stats in por_categoria.items()
+    }
+    return gerais, stats_por_categoria
+
+
+def aplica_delta_estatisticas(db: Session, adicionados: List[dict], removidos: List[dict] = ()):
+    """
+    Atualiza os agregados com os livros inseridos e removidos.
+    Não faz commit: deve rodar na mesma transação que altera a tabela livros.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    for livros, sinal in ((adicionados, 1), (removidos, -1)):
+        for livro in livros:
+            delta = deltas[_chave(livro)]
+            delta[0] += sinal
+            if livro["preco"] is not None:
+                delta[1] += sinal
+                delta[2] += sinal * livro["preco"]
+
+    linhas = [
+        {"categoria": categoria, "rating": rating, "total_livros": total, "total_com_preco": com_preco, "soma_precos": soma}
+        for (categoria, rating), (total, com_preco, soma) in deltas.items()
+    ]
+    if not linhas:
+        return
+
+    # As somas são feitas pelo banco (coluna = coluna + delta), e não lidas e
+    # regravadas pela aplicação: gravações concorrentes não perdem atualizações
+    dialeto = db.bind.dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        # INSERT ... ON CONFLICT DO UPDATE, como no upsert de livros
+        insert_dialeto = pg_insert if dialeto == "postgresql" else sqlite_insert
+        stmt = insert_dialeto(EstatisticaCatalogo).values(linhas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EstatisticaCatalogo.categoria, EstatisticaCatalogo.rating],
+            set_={campo: getattr(EstatisticaCatalogo, campo) + stmt.excluded[campo] for campo in CAMPOS_AGREGADOS}
+        )
+        db.execute(stmt)
+    else:
+        for linha in linhas:
+            resultado = db.execute(
+                update(EstatisticaCatalogo)
+                .where(EstatisticaCatalogo.categoria == linha["categoria"], EstatisticaCatalogo.rating == linha["rating"])
+                .values({campo: getattr(EstatisticaCatalogo, campo) + linha[campo] for campo in CAMPOS_AGREGADOS})
+            )
+            if resultado.rowcount == 0:
+                db.execute(insert(EstatisticaCatalogo).values(**linha))
+
+    db.execute(delete(EstatisticaCatalogo).where(EstatisticaCatalogo.total_livros <= 0))
+
+
+def limpa_estatisticas(db: Session):
+    """Zera os agregados. Não faz commit (acompanha a limpeza da tabela livros)."""
+    db.query(EstatisticaCatalogo).delete(synchronize_session=False)
+
+
+def busca_linhas_materializadas(db: Session) -> List[LinhaEstatistica]:
+    return [
+        (r.categoria, r.rating, r.total_livros, r.total_com_preco, r.soma_precos)
+        for r in db.query(EstatisticaCatalogo).all()
+    ]
+
+
+def calcula_linhas_completas(db: Session) -> List[LinhaEstatistica]:
+    """Recalcula os agregados diretamente da tabela livros (GROUP BY completo)."""
+    linhas = db.query(
+        func.coalesce(Livro.categoria, ""),
+        func.coalesce(Livro.rating, 0),
+        func.count(Livro.id),
+        func.count(Livro.preco),
+        func.coalesce(func.sum(Livro.preco), 0.0)
+    ).group_by(func.coalesce(Livro.categoria, ""), func.coalesce(Livro.rating, 0)).all()
+    return [tuple(linha) for linha in linhas]
+
+
+def recalcula_estatisticas(db: Session):
+    """Reconstrói os agregados materializados a partir de um recálculo completo."""
+    limpa_estatisticas(db)
+    for categoria, rating, total, com_preco, soma in calcula_linhas_completas(db):
+        db.add(EstatisticaCatalogo(
+            categoria=categoria, rating=rating, total_livros=total,
+            total_com_preco=com_preco, soma_precos=float(soma)
+        ))
+    db.commit()
+
+
+def verifica_consistencia_estatisticas(db: Session) -> dict:
+    """
+    Compara os agregados materializados com um recálculo completo sobre a tabela livros.
+    Retorna um relatório com as divergências encontradas por (categoria, rating).
+    """
+    materializadas = {(c, r): (t, cp, s) for c, r, t, cp, s in busca_linhas_materializadas(db)}
+    completas = {(c, r): (t, cp, s) for c, r, t, cp, s in calcula_linhas_completas(db)}
+
+    divergencias = []
+    for chave in sorted(set(materializadas) | set(completas)):
+        esperado = completas.get(chave, (0, 0, 0.0))
+        obtido = materializadas.get(chave, (0, 0, 0.0))
+        if esperado[:2] != obtido[:2] or not math.isclose(esperado[2], obtido[2], rel_tol=1e-9, abs_tol=1e-6):
+            divergencias.append({
+                "categoria": chave[0],
+                "rating": chave[1],
+                "esperado": {"total_livros": esperado[0], "total_com_preco": esperado[1], "soma_precos": esperado[2]},
+                "materializado": {"total_livros": obtido[0], "total_com_preco": obtido[1], "soma_precos": obtido[2]},
+            })
+
+    return {"consistente": not divergencias, "divergencias": divergencias}
+
+
+def garante_estatisticas_consistentes(db: Session) -> bool:
+    """
+    Verifica os agregados e os recalcula se divergirem (por exemplo, na primeira
+    execução com um catálogo já populado). Retorna True se precisou recalcular.
+    """
+    relatorio = verifica_consistencia_estatisticas(db)
+    if relatorio["consistente"]:
+        return False
+    logging.warning(
+        f"Estatísticas materializadas divergentes em {len(relatorio['divergencias'])} grupos; recalculando."
+    )
+    recalcula_estatisticas(db)
+    return True
@@ -1,34 +1,130 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy import func, insert, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
 from ..modelos.livros import Livro
-from typing import List, Optional
+from ..catalogo import indice_busca
+from ..catalogo import snapshot as catalogo_snapshot
+from . import estatisticas_repositorio, paginas_repositorio, versao_catalogo_repositorio
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import logging
 
-def salva_dados_livros(db: Session, dados_todos_livros: list):
-    """Salva uma lista de livros no banco de dados."""
+# Campos gravados a partir dos dados raspados
+CAMPOS_LIVRO = ('titulo', 'preco', 'rating', 'disponibilidade', 'categoria', 'imagem')
+# Campos que podem mudar para um mesmo livro (fora da chave natural titulo + categoria)
+CAMPOS_MUTAVEIS = ('preco', 'rating', 'disponibilidade', 'imagem')
+# Tamanho dos lotes de leitura e escrita do upsert
+TAMANHO_LOTE_UPSERT = 500
+
+def _chave_natural(data: dict) -> Tuple[str, str]:
+    return data['titulo'], data['categoria']
+
+
+def _busca_existentes(db: Session, chaves: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Livro]:
+    """Busca os livros já gravados para as chaves naturais informadas, em lotes."""
+    existentes = {}
+    for inicio in range(0, len(chaves), TAMANHO_LOTE_UPSERT):
+        lote = chaves[inicio:inicio + TAMANHO_LOTE_UPSERT]
+        livros = db.query(Livro).filter(tuple_(Livro.titulo, Livro.categoria).in_(lote)).all()
+        for livro in livros:
+            existentes.setdefault((livro.titulo, livro.categoria), livro)
+    return existentes
+
+
+def atualiza_caches_catalogo(db: Session):
+    """Invalida o índice de busca e reconstrói o snapshot após alterações no catálogo."""
+    indice_busca.invalida_indice()
+    catalogo_snapshot.reconstroi_snapshot(db)
+
+
+def salva_dados_livros(db: Session, dados_todos_livros: list, atualiza_caches: bool = True) -> dict:
+    """
+    Grava uma lista de livros de forma idempotente (upsert pela chave natural
+    titulo + categoria). Livros novos são inseridos, livros com preço, rating,
+    disponibilidade ou imagem diferentes são atualizados e os demais são ignorados.
+
+    Com `atualiza_caches=False` o índice de busca e o snapshot não são refeitos;
+    quem grava vários lotes seguidos chama `atualiza_caches_catalogo` no final.
+
+    Returns:
+        Um dicionário com as contagens de inseridos, atualizados e inalterados.
+    """
+    contagens = {"inseridos": 0, "atualizados": 0, "inalterados": 0}
     if not dados_todos_livros:
         print("Nenhum dado de livro para salvar.")
-        return
-    
+        return contagens
+
     print(f"Salvando {len(dados_todos_livros)} livros no banco de dados...")
 
-    livros_obj = [
-        Livro(
-            titulo=data['titulo'],
-            preco=data['preco'],
-            rating=data['rating'],
-            disponibilidade=data['disponibilidade'],
-            categoria=data['categoria'],
-            imagem=data['imagem']
+    # Remove repetições dentro do próprio lote (a última ocorrência prevalece)
+    dados_por_chave = {_chave_natural(data): data for data in dados_todos_livros}
+    existentes = _busca_existentes(db, list(dados_por_chave))
+
+    novos, alterados, valores_antigos = [], [], []
+    for chave, data in dados_por_chave.items():
+        registro = {campo: data[campo] for campo in CAMPOS_LIVRO}
+        livro = existentes.get(chave)
+        if livro is None:
+            novos.append(registro)
+        elif any(getattr(livro, campo) != registro[campo] for campo in CAMPOS_MUTAVEIS):
+            alterados.append({**registro, "id": livro.id})
+            valores_antigos.append({campo: getattr(livro, campo) for campo in CAMPOS_LIVRO})
+        else:
+            contagens["inalterados"] += 1
+
+    contagens["inseridos"] = len(novos)
+    contagens["atualizados"] = len(alterados)
+
+    if novos or alterados:
+        if db.bind.dialect.name == "postgresql":
+            # INSERT ... ON CONFLICT: grava novos e alterados em um único comando por lote
+            linhas = novos + [{campo: data[campo] for campo in CAMPOS_LIVRO} for data in alterados]
+            for inicio in range(0, len(linhas), TAMANHO_LOTE_UPSERT):
+                stmt = pg_insert(Livro).values(linhas[inicio:inicio + TAMANHO_LOTE_UPSERT])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Livro.titulo, Livro.categoria],
+                    set_={campo: stmt.excluded[campo] for campo in CAMPOS_MUTAVEIS}
+                )
+                db.execute(stmt)
+        else:
+            # Fallback em lotes: executemany para inserções e UPDATE por chave primária
+            for inicio in range(0, len(novos), TAMANHO_LOTE_UPSERT):
+                db.execute(insert(Livro), novos[inicio:inicio + TAMANHO_LOTE_UPSERT])
+            for inicio in range(0, len(alterados), TAMANHO_LOTE_UPSERT):
+                db.execute(update(Livro), alterados[inicio:inicio + TAMANHO_LOTE_UPSERT])
+
+        estatisticas_repositorio.aplica_delta_estatisticas(
+            db, adicionados=novos + alterados, removidos=valores_antigos
         )
-        for data in dados_todos_livros
-    ]
+        versao_catalogo_repositorio.incrementa_versao(db)
+
+    db.commit()
 
-    db.add_all(livros_obj)  # Adiciona todos os livros à sessão
+    if atualiza_caches and (novos or alterados):
+        atualiza_caches_catalogo(db)
+    print(
+        f"Livros salvos: {contagens['inseridos']} inseridos, "
+        f"{contagens['atualizados']} atualizados, {contagens['inalterados']} inalterados."
+    )
+    return contagens
+
+
+def remove_livros_duplicados(db: Session) -> int:
+    """
+    Remove livros repetidos pela chave natural (titulo + categoria), mantendo o de menor ID.
+    Necessário para criar o índice único em bancos populados antes do upsert.
+    """
+    menores_ids = select(func.min(Livro.id)).group_by(Livro.titulo, Livro.categoria)
+    num_deletados = db.query(Livro).filter(Livro.id.not_in(menores_ids)).delete(synchronize_session=False)
+    if num_deletados:
+        versao_catalogo_repositorio.incrementa_versao(db)
     db.commit()
-    print(f"{len(livros_obj)} livros salvos com sucesso.")
+    if num_deletados:
+        indice_busca.invalida_indice()
+        catalogo_snapshot.reconstroi_snapshot(db)
+        logging.info(f"{num_deletados} livros duplicados removidos.")
+    return num_deletados
 
 
 def busca_todos_livros(db: Session, skip: int = 0, limit: int = 100) -> List[Livro]:
@@ -75,7 +171,13 @@ def deleta_todos_livros(db: Session):
     # TRUNCATE é mais eficiente que DELETE para limpar tabelas inteiras
     # e RESTART IDENTITY zera o contador do ID.
     db.execute(text("TRUNCATE TABLE livros RESTART IDENTITY"))
+    estatisticas_repositorio.limpa_estatisticas(db)
+    # Sem os livros, as páginas conhecidas precisam ser raspadas de novo
+    paginas_repositorio.limpa_validadores(db)
+    versao_catalogo_repositorio.incrementa_versao(db)
     db.commit()
+    indice_busca.invalida_indice()
+    catalogo_snapshot.reconstroi_snapshot(db)
 
 
 def obter_estatisticas_gerais(db: Session) -> dict:
@@ -0,0 +1,150 @@
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..modelos.livros import Livro
+from ..catalogo import indice_busca
+from ..modelos.estatisticas import EstatisticaCatalogo
+from .estatisticas_repositorio import monta_estatisticas
+from typing import List, Optional, Tuple
+import logging
+
+# Versões assíncronas das consultas de leitura de livros_repositorio.
+# Usadas pelas rotas da API para que as consultas não bloqueiem o event loop.
+
+
+async def busca_todos_livros(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Livro]:
+    """Busca todos os livros no banco de dados (paginação por offset, ordenada por ID)."""
+    resultado = await db.execute(select(Livro).order_by(Livro.id).offset(skip).limit(limit))
+    return list(resultado.scalars().all())
+
+
+async def busca_livros_apos_id(db: AsyncSession, apos_id: int, limit: int = 100) -> List[Livro]:
+    """
+    Busca a próxima página de livros a partir de um ID (paginação por keyset).
+    Usa o índice da chave primária, então o custo não cresce com a profundidade da página.
+    """
+    resultado = await db.execute(
+        select(Livro).where(Livro.id > apos_id).order_by(Livro.id).limit(limit)
+    )
+    return list(resultado.scalars().all())
+
+
+async def busca_livro_por_id(db: AsyncSession, livro_id: int) -> Optional[Livro]:
+    """Busca um livro específico pelo seu ID."""
+    return await db.get(Livro, livro_id)
+
+
+async def busca_livros_por_filtro(
+    db: AsyncSession,
+    titulo: Optional[str],
+    categoria: Optional[str],
+    skip: int = 0,
+    limit: int = 100
+) -> List[Livro]:
+    """
+    Busca livros por título e/ou categoria, ordenados por relevância e paginados.
+
+    No PostgreSQL com pg_trgm, usa os índices GIN de trigramas e ordena pela
+    similaridade do título. Nos demais casos, usa o índice invertido em memória.
+    """
+    if db.bind.dialect.name == "postgresql" and indice_busca.trigram_disponivel():
+        query = select(Livro)
+        ordenacao = []
+        if titulo:
+            query = query.where(Livro.titulo.ilike(f"%{titulo}%"))
+            ordenacao.append(func.similarity(Livro.titulo, titulo).desc())
+        if categoria:
+            query = query.where(Livro.categoria.ilike(f"%{categoria}%"))
+        resultado = await db.execute(query.order_by(*ordenacao, Livro.id).offset(skip).limit(limit))
+        return list(resultado.scalars().all())
+
+    indice = await indice_busca.obtem_indice(db)
+    ids_pagina = indice.busca(titulo, categoria)[skip:skip + limit]
+    if not ids_pagina:
+        return []
+
+    resultado = await db.execute(select(Livro).where(Livro.id.in_(ids_pagina)))
+    livros_por_id = {livro.id: livro for livro in resultado.scalars().all()}
+    return [livros_por_id[i] for i in ids_pagina if i in livros_por_id]
+
+
+async def busca_livros_top_rated(db: AsyncSession) -> List[Livro]:
+    """Busca os 10 livros com maior rating."""
+    resultado = await db.execute(select(Livro).order_by(Livro.rating.desc()).limit(10))
+    return list(resultado.scalars().all())
+
+
+async def busca_livros_por_preco(
+    db: AsyncSession,
+    min_preco: float,
+    max_preco: float,
+    limit: int = 100,
+    apos: Optional[Tuple[float, int]] = None,
+    ordem: str = "asc"
+) -> List[Livro]:
+    """
+    Busca livros dentro de um intervalo de preços, ordenados por (preço, id).
+
+    A paginação é por keyset: `apos` é o (preço, id) do último livro da página
+    anterior. Com o índice ix_livros_preco_id, cada página custa O(log n + limit).
+    """
+    query = select(Livro).where(Livro.preco.between(min_preco, max_preco))
+
+    if ordem == "desc":
+        if apos is not None:
+            preco, livro_id = apos
+            query = query.where(or_(Livro.preco < preco, and_(Livro.preco == preco, Livro.id < livro_id)))
+        query = query.order_by(Livro.preco.desc(), Livro.id.desc())
+    else:
+        if apos is not None:
+            preco, livro_id = apos
+            query = query.where(or_(Livro.preco > preco, and_(Livro.preco == preco, Livro.id > livro_id)))
+        query = query.order_by(Livro.preco, Livro.id)
+
+    resultado = await db.execute(query.limit(limit))
+    return list(resultado.scalars().all())
+
+
+async def busca_todas_categorias(db: AsyncSession) -> List[str]:
+    """Busca todas as categorias distintas de livros."""
+    resultado = await db.execute(select(Livro.categoria).distinct())
+    return [categoria for categoria in resultado.scalars().all()]
+
+
+async def _busca_linhas_estatisticas(db: AsyncSession):
+    resultado = await db.execute(select(
+        EstatisticaCatalogo.categoria,
+        EstatisticaCatalogo.rating,
+        EstatisticaCatalogo.total_livros,
+        EstatisticaCatalogo.total_com_preco,
+        EstatisticaCatalogo.soma_precos
+    ))
+    return resultado.all()
+
+
+async def obter_estatisticas_gerais(db: AsyncSession) -> dict:
+    """
+    Busca estatísticas gerais (total, preço médio, distribuição de ratings)
+    a partir dos agregados materializados em estatisticas_catalogo.
+    """
+    gerais, _ = monta_estatisticas(await _busca_linhas_estatisticas(db))
+    return gerais
+
+
+async def obter_estatisticas_por_categoria(db: AsyncSession) -> dict:
+    """Busca estatísticas detalhadas por categoria a partir dos agregados materializados."""
+    _, por_categoria = monta_estatisticas(await _busca_linhas_estatisticas(db))
+    return por_categoria
+
+
+async def verificar_conexao_db(db: AsyncSession) -> bool:
+    """
+    Executa uma query simples para verificar se a conexão com o banco de dados está ativa.
+    Retorna True se a conexão for bem-sucedida, False caso contrário.
+    """
+    try:
+        await db.execute(text('SELECT 1'))
+        return True
+    except (SQLAlchemyError, OSError) as e:
+        logging.error(f"Falha na verificação de conexão com o banco de dados: {e}", exc_info=True)
+        return False
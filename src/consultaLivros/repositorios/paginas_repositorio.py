@@ -0,0 +1,28 @@
+from typing import Dict, Iterable
+from sqlalchemy.orm import Session
+from ..modelos.paginas import PaginaCategoria
+
+# Campos de validação de uma página, no formato trocado com os backends de raspagem
+CAMPOS_VALIDADORES = ('etag', 'last_modified', 'hash_conteudo', 'url_proxima')
+
+
+def carrega_validadores(db: Session) -> Dict[str, dict]:
+    """Retorna os validadores de todas as páginas conhecidas, indexados pela URL."""
+    return {
+        pagina.url: {campo: getattr(pagina, campo) for campo in CAMPOS_VALIDADORES}
+        for pagina in db.query(PaginaCategoria).all()
+    }
+
+
+def grava_validadores(db: Session, validadores: Iterable[dict]):
+    """
+    Registra os validadores das páginas raspadas (upsert pela URL).
+    Não faz commit: deve rodar na mesma transação que grava os livros das páginas.
+    """
+    for dados in validadores:
+        db.merge(PaginaCategoria(url=dados['url'], **{campo: dados[campo] for campo in CAMPOS_VALIDADORES}))
+
+
+def limpa_validadores(db: Session):
+    """Esquece as páginas conhecidas. Não faz commit (acompanha a limpeza da tabela livros)."""
+    db.query(PaginaCategoria).delete(synchronize_session=False)
@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from ..modelos.tarefas import Tarefa
 from datetime import datetime, timedelta, timezone
@@ -34,6 +35,39 @@ def atualiza_tarefa(db: Session, tarefa_id: str, estado: str = None, resultado:
     db.refresh(tarefa)
     return tarefa
 
+def marca_tarefas_abandonadas(db: Session, minutos: int) -> int:
+    """
+    Marca como INTERROMPIDA as tarefas PENDENTE/EXECUTANDO sem atualização há mais
+    de `minutos` (o processo que as executava morreu). A raspagem atualiza a tarefa
+    a cada lote gravado, então uma tarefa ativa nunca fica tanto tempo parada.
+    """
+    data_limite = datetime.now(timezone.utc) - timedelta(minutes=minutos)
+    ultima_atividade = func.coalesce(Tarefa.finalizado_em, Tarefa.criado_em)
+
+    tarefas = db.query(Tarefa).filter(
+        Tarefa.estado.in_(["PENDENTE", "EXECUTANDO"]),
+        ultima_atividade < data_limite
+    ).all()
+    for tarefa in tarefas:
+        tarefa.estado = "INTERROMPIDA"
+    db.commit()
+    return len(tarefas)
+
+def busca_checkpoint_para_retomar(db: Session):
+    """
+    Retorna (id_tarefa, checkpoint) da raspagem mais recente se ela terminou em
+    ERRO ou INTERROMPIDA e gravou um checkpoint; caso contrário, None.
+    Uma raspagem CONCLUIDA mais recente invalida os checkpoints anteriores.
+    """
+    ultima = db.query(Tarefa).filter(
+        Tarefa.estado.in_(["CONCLUIDA", "ERRO", "INTERROMPIDA"])
+    ).order_by(Tarefa.criado_em.desc()).first()
+
+    if not ultima or ultima.estado == "CONCLUIDA" or not ultima.resultado:
+        return None
+    checkpoint = ultima.resultado.get("checkpoint")
+    return (ultima.id, checkpoint) if checkpoint else None
+
 def deleta_todos_tarefas(db: Session):
     """Deleta todas as tarefas no banco de dados."""
     resultado_query = db.query(Tarefa).delete()
@@ -42,11 +76,11 @@ def deleta_todos_tarefas(db: Session):
 
 def deleta_tarefas_antigas(db: Session, dias: int) -> int:
     """
-    Deleta tarefas em estado final (CONCLUIDA, ERRO) mais antigas
+    Deleta tarefas em estado final (CONCLUIDA, ERRO, INTERROMPIDA) mais antigas
     que um número específico de dias, com base na data de finalização.
     """
     data_limite = datetime.now(timezone.utc) - timedelta(days=dias)
-    estados_finais = ["CONCLUIDA", "ERRO"]
+    estados_finais = ["CONCLUIDA", "ERRO", "INTERROMPIDA"]
     
     query = db.query(Tarefa).filter(
         Tarefa.estado.in_(estados_finais),
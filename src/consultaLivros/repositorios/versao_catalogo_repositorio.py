@@ -0,0 +1,57 @@
+import uuid
+from typing import Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..modelos.versao_catalogo import VersaoCatalogo
+
+ID_VERSAO = 1
+
+
+def busca_versao(db: Session) -> int:
+    """Versão atual do catálogo (0 se ele nunca foi alterado)."""
+    versao = db.query(VersaoCatalogo.versao).filter(VersaoCatalogo.id == ID_VERSAO).scalar()
+    return versao or 0
+
+
+def busca_identidade(db: Session) -> Optional[Tuple[str, int]]:
+    """
+    (id do catálogo, versão): identifica o conteúdo do catálogo mesmo entre
+    bancos diferentes. None se o banco ainda não tiver o registro de versão.
+    """
+    linha = db.query(VersaoCatalogo.id_catalogo, VersaoCatalogo.versao).filter(VersaoCatalogo.id == ID_VERSAO).first()
+    if linha is None or not linha.id_catalogo:
+        return None
+    return linha.id_catalogo, linha.versao
+
+
+def garante_registro(db: Session):
+    """Cria o registro de versão (com um id de catálogo novo) se ele não existir. Faz commit."""
+    registro = db.get(VersaoCatalogo, ID_VERSAO)
+    if registro is None:
+        db.add(VersaoCatalogo(id=ID_VERSAO, versao=0, id_catalogo=uuid.uuid4().hex))
+    elif not registro.id_catalogo:
+        registro.id_catalogo = uuid.uuid4().hex
+    else:
+        return
+    db.commit()
+
+
+async def busca_versao_async(db: AsyncSession) -> int:
+    """Versão atual do catálogo, para as rotas assíncronas."""
+    versao = await db.scalar(select(VersaoCatalogo.versao).where(VersaoCatalogo.id == ID_VERSAO))
+    return versao or 0
+
+
+def incrementa_versao(db: Session):
+    """
+    Marca uma alteração do catálogo. Não faz commit: deve rodar na mesma
+    transação que altera a tabela livros.
+    """
+    resultado = db.execute(
+        update(VersaoCatalogo)
+        .where(VersaoCatalogo.id == ID_VERSAO)
+        .values(versao=VersaoCatalogo.versao + 1)
+    )
+    if resultado.rowcount == 0:
+        db.add(VersaoCatalogo(id=ID_VERSAO, versao=1, id_catalogo=uuid.uuid4().hex))
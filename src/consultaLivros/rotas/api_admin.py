@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from ..db.database import get_db
-from ..repositorios import livros_repositorio, usuarios_repositorio, tarefas_repositorio
+from ..repositorios import livros_repositorio, usuarios_repositorio, tarefas_repositorio, estatisticas_repositorio
 from ..autenticacao.seguranca import get_current_user
 from ..schemas import token as schemas_token
 
@@ -51,5 +51,21 @@ async def limpa_tabela_tarefas(db: Session = Depends(get_db), current_user: sche
     Deleta todos os registros da tabela tarefas. Requer autenticação.
     """
     tarefas_deletadas = tarefas_repositorio.deleta_todos_tarefas(db)
-    return {"message": f"{tarefas_deletadas} tarefas foram deletadas com sucesso."} 
-     
+    return {"message": f"{tarefas_deletadas} tarefas foram deletadas com sucesso."}
+
+
+@router.get("/verifica-estatisticas", status_code=status.HTTP_200_OK)
+async def verifica_estatisticas(
+    corrigir: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas_token.TokenData = Depends(get_current_user)
+):
+    """
+    Compara as estatísticas materializadas com um recálculo completo da tabela livros.
+    Com `corrigir=true`, recalcula os agregados se houver divergências. Requer autenticação.
+    """
+    relatorio = estatisticas_repositorio.verifica_consistencia_estatisticas(db)
+    if corrigir and not relatorio["consistente"]:
+        estatisticas_repositorio.recalcula_estatisticas(db)
+        relatorio["recalculado"] = True
+    return relatorio
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
+from typing import List, Literal, Optional
 from ..modelos import livros as modelo_livros
 from ..schemas import livros as schemas_livros
-from ..repositorios import livros_repositorio
-from ..db.database import get_db
+from ..repositorios import livros_repositorio_async
+from ..catalogo.snapshot import obtem_snapshot
+from ..db.database import get_async_db
+from .paginacao import CABECALHO_PROXIMO_CURSOR, LIMITE_MAXIMO_PAGINA, codifica_cursor, decodifica_cursor
 
 import logging
 
@@ -18,22 +20,51 @@ router = APIRouter(
 
 
 @router.get("/books", response_model=List[schemas_livros.Livro])
-async def get_livros(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_livros(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    skip: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    after: Optional[str] = None
+):
     """
     Lista todos os livros disponíveis na base de dados com paginação.
+
+    Aceita paginação por offset (`skip`/`limit`) ou por cursor (`after`/`limit`).
+    No modo cursor (com `after`, ou sem `skip`), quando a página está cheia, o
+    cursor da próxima página é devolvido no cabeçalho `X-Next-Cursor`; basta
+    repassá-lo em `after`. No modo offset o cabeçalho não é enviado.
     """
-    todos_livros = livros_repositorio.busca_todos_livros(db, skip=skip, limit=limit)
+    if after:
+        apos_id = decodifica_cursor(after).get("id")
+        if not isinstance(apos_id, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+        if snapshot := await obtem_snapshot(db):
+            todos_livros = snapshot.busca_livros_apos_id(apos_id, limit=limit)
+        else:
+            todos_livros = await livros_repositorio_async.busca_livros_apos_id(db, apos_id=apos_id, limit=limit)
+    elif snapshot := await obtem_snapshot(db):
+        todos_livros = snapshot.busca_todos_livros(skip=skip or 0, limit=limit)
+    else:
+        todos_livros = await livros_repositorio_async.busca_todos_livros(db, skip=skip or 0, limit=limit)
+
+    modo_cursor = bool(after) or skip is None
+    if modo_cursor and todos_livros and len(todos_livros) == limit:
+        response.headers[CABECALHO_PROXIMO_CURSOR] = codifica_cursor({"id": todos_livros[-1].id})
     return todos_livros
 
 
 @router.get("/books/search", response_model=List[schemas_livros.Livro])
 async def search_livros(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     titulo: Optional[str] = None,
-    categoria: Optional[str] = None
+    categoria: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA)
 ):
     """
     Busca livros por título e/ou categoria. Pelo menos um dos dois deve ser fornecido.
+    Os resultados são ordenados por relevância e paginados com `skip`/`limit`.
     """
     if not titulo and not categoria:
         raise HTTPException(
@@ -41,50 +72,86 @@ async def search_livros(
             detail="Forneça um título ou uma categoria para a busca."
         )
 
-    livros_encontrados = livros_repositorio.busca_livros_por_filtro(db, titulo=titulo, categoria=categoria)
+    livros_encontrados = await livros_repositorio_async.busca_livros_por_filtro(
+        db, titulo=titulo, categoria=categoria, skip=skip, limit=limit
+    )
     return livros_encontrados
 
 
 @router.get("/books/top-rated", response_model=List[schemas_livros.Livro])
-async def get_top_rated_books(db: Session = Depends(get_db)):
+async def get_top_rated_books(db: AsyncSession = Depends(get_async_db)):
     """Obtém os livros mais bem avaliados (requer autenticação JWT)."""
-    top_rated_books = livros_repositorio.busca_livros_top_rated(db)
+    if snapshot := await obtem_snapshot(db):
+        return snapshot.top_rated
+    top_rated_books = await livros_repositorio_async.busca_livros_top_rated(db)
     return top_rated_books
 
 
 @router.get("/books/price-range", response_model=List[schemas_livros.Livro])
-async def get_books_by_price_range(min_preco: float, max_preco: float, db: Session = Depends(get_db)):
-    """Obtém livros dentro de um intervalo de preços (requer autenticação JWT)."""
+async def get_books_by_price_range(
+    response: Response,
+    min_preco: float,
+    max_preco: float,
+    limit: int = Query(100, ge=1, le=LIMITE_MAXIMO_PAGINA),
+    after: Optional[str] = None,
+    ordem: Literal["asc", "desc"] = "asc",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtém livros dentro de um intervalo de preços, ordenados por preço (`ordem`).
+    A resposta é paginada: o cursor da próxima página vem no cabeçalho
+    `X-Next-Cursor` e deve ser repassado em `after`.
+    """
     if min_preco < 0 or max_preco < 0 or min_preco > max_preco:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intervalo de preços inválido")
-    
-    livros = livros_repositorio.busca_livros_por_preco(db, min_preco=min_preco, max_preco=max_preco)
+
+    apos = None
+    if after:
+        cursor = decodifica_cursor(after)
+        if not isinstance(cursor.get("preco"), (int, float)) or not isinstance(cursor.get("id"), int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+        apos = (cursor["preco"], cursor["id"])
+
+    if snapshot := await obtem_snapshot(db):
+        livros = snapshot.busca_livros_por_preco(min_preco, max_preco, limit=limit, apos=apos, ordem=ordem)
+    else:
+        livros = await livros_repositorio_async.busca_livros_por_preco(
+            db, min_preco=min_preco, max_preco=max_preco, limit=limit, apos=apos, ordem=ordem
+        )
+
+    if len(livros) == limit:
+        response.headers[CABECALHO_PROXIMO_CURSOR] = codifica_cursor({"preco": livros[-1].preco, "id": livros[-1].id})
     return livros
 
 
 @router.get("/books/{book_id}", response_model=schemas_livros.Livro)
-async def get_book_by_id(book_id: int, db: Session = Depends(get_db)):
+async def get_book_by_id(book_id: int, db: AsyncSession = Depends(get_async_db)):
     """Obtém detalhes de um livro específico pelo seu ID."""
-    livro = livros_repositorio.busca_livro_por_id(db, livro_id=book_id)
+    if snapshot := await obtem_snapshot(db):
+        livro = snapshot.busca_livro_por_id(book_id)
+    else:
+        livro = await livros_repositorio_async.busca_livro_por_id(db, livro_id=book_id)
     if not livro:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Livro não encontrado")
     return livro
 
 
 @router.get("/categories", response_model=List[str])
-async def get_categories(db: Session = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_async_db)):
     """Lista todas as categorias de livros disponíveis (requer autenticação JWT)."""
-    categorias = livros_repositorio.busca_todas_categorias(db)
+    if snapshot := await obtem_snapshot(db):
+        return snapshot.categorias
+    categorias = await livros_repositorio_async.busca_todas_categorias(db)
     return categorias
 
 
 @router.get("/health", response_model=dict)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint de verificação de saúde da API.
     Verifica se a API está no ar e se a conexão com o banco de dados está ativa.
     """
-    if livros_repositorio.verificar_conexao_db(db):
+    if await livros_repositorio_async.verificar_conexao_db(db):
         return {"status": "ok", "message": "API e banco de dados estão funcionando corretamente."}
     else:
         raise HTTPException(
@@ -95,10 +162,12 @@ async def health_check(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/overview", response_model=dict)
-async def get_overview_stats(db: Session = Depends(get_db)):
+async def get_overview_stats(db: AsyncSession = Depends(get_async_db)):
     """Obtém estatísticas gerais da base de dados de forma otimizada."""
+    if snapshot := await obtem_snapshot(db):
+        return snapshot.estatisticas_gerais
     try:
-        stats = livros_repositorio.obter_estatisticas_gerais(db)
+        stats = await livros_repositorio_async.obter_estatisticas_gerais(db)
         return stats
     except SQLAlchemyError as e:
         logging.error(f"Erro de banco de dados ao buscar estatísticas gerais: {e}", exc_info=True)
@@ -109,10 +178,12 @@ async def get_overview_stats(db: Session = Depends(get_db)):
 
 
 @router.get("/stats/categories", response_model=dict)
-async def get_category_stats(db: Session = Depends(get_db)):
+async def get_category_stats(db: AsyncSession = Depends(get_async_db)):
     """Obtém estatísticas por categoria de forma otimizada, evitando o problema N+1."""
+    if snapshot := await obtem_snapshot(db):
+        return snapshot.estatisticas_por_categoria
     try:
-        stats = livros_repositorio.obter_estatisticas_por_categoria(db)
+        stats = await livros_repositorio_async.obter_estatisticas_por_categoria(db)
         return stats
     except SQLAlchemyError as e:
         logging.error(f"Erro de banco de dados ao buscar estatísticas por categoria: {e}", exc_info=True)
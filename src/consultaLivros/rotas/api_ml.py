@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ..ml.preparacao_dados import preparar_dados_livros, preparar_input_para_predicao
+from starlette.concurrency import run_in_threadpool
+from ..ml import artefatos_modelos, feature_store
+from ..ml.cache_predicoes import cache_predicoes, chave_predicao
 from ..ml.treinamento_modelo import treinar_e_carregar_modelos_em_cache
 from ..schemas.livros import LivroBase
 from ..db.database import get_db
-from typing import List
-import logging
-from ..ml.gerenciador_de_modelos import modelo_cache
+from typing import List, Optional
+import os
+from ..ml.gerenciador_de_modelos import SnapshotModelos, obtem_snapshot, prediz_lote
+from ..ml.micro_lotes import ML_MICRO_LOTES, micro_lotes
+from .exportacao import FORMATOS, RESPOSTAS_OPENAPI, resposta_dataframe
+from .paginacao import CABECALHO_PROXIMO_CURSOR, codifica_cursor, decodifica_cursor
 
 
+# Número máximo de livros aceitos por chamada de /predictions/batch
+ML_PREDICOES_LOTE_MAX = int(os.getenv("ML_PREDICOES_LOTE_MAX", "10000"))
+
 router = APIRouter(
     prefix="/api/v1/ml",
     tags=["machine_learning"],
@@ -16,27 +25,68 @@ router = APIRouter(
 )
 
 
-@router.get("/features", response_model=List[dict])
-async def get_features(db: Session = Depends(get_db)):
-    """Retorna os dados dos livros formatados como features para ML."""
-    features_df, _, _ = preparar_dados_livros(db)
-    if features_df.empty:
-        return []
-    
-    # Retorna o DataFrame de features (sem a coluna alvo, se houver)
-    return features_df.to_dict(orient='records')
+def _exporta_features(db: Session, formato: str, limit: Optional[int], after: Optional[str]) -> StreamingResponse:
+    """
+    Envia as features do feature store em blocos, a partir da linha do cursor.
+    O cursor guarda a versão do catálogo: se ele mudar entre as páginas, a
+    paginação precisa recomeçar (HTTP 409), pois as linhas não seriam as mesmas.
+    """
+    versao, (features_df, _, _) = feature_store.obtem_features_densas_versionadas(db)
+
+    inicio = 0
+    if after:
+        cursor = decodifica_cursor(after)
+        inicio = cursor.get("linha")
+        if not isinstance(inicio, int) or inicio < 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+        if cursor.get("versao") != versao:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="O catálogo mudou desde a primeira página. Recomece a paginação sem o parâmetro 'after'."
+            )
 
+    total = len(features_df)
+    fim = total if limit is None else min(total, inicio + limit)
+    cabecalhos = {}
+    if fim < total:
+        cabecalhos[CABECALHO_PROXIMO_CURSOR] = codifica_cursor({"linha": fim, "versao": versao})
+    return resposta_dataframe(features_df.iloc[inicio:fim], formato, cabecalhos)
 
-@router.get("/training-data", response_model=List[dict])
-async def get_training_data(db: Session = Depends(get_db)):
+
+# Parâmetros comuns às rotas de dados de ML
+FORMATO_QUERY = Query("json", alias="format", pattern="^(" + "|".join(FORMATOS) + ")$")
+LIMIT_QUERY = Query(None, ge=1, description="Número máximo de linhas; sem ele, todas as linhas a partir do cursor.")
+
+
+@router.get("/features", response_class=StreamingResponse, responses=RESPOSTAS_OPENAPI)
+def get_features(
+    db: Session = Depends(get_db),
+    formato: str = FORMATO_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    after: Optional[str] = None):
+    """
+    Retorna os dados dos livros formatados como features para ML.
+
+    A resposta é enviada em blocos, em JSON (padrão), NDJSON (`format=ndjson`),
+    Parquet (`format=parquet`) ou Arrow IPC stream (`format=arrow`). Com `limit`,
+    o cursor da próxima página volta no cabeçalho `X-Next-Cursor`; basta
+    repassá-lo em `after`.
+    """
+    return _exporta_features(db, formato, limit, after)
+
+
+@router.get("/training-data", response_class=StreamingResponse, responses=RESPOSTAS_OPENAPI)
+def get_training_data(
+    db: Session = Depends(get_db),
+    formato: str = FORMATO_QUERY,
+    limit: Optional[int] = LIMIT_QUERY,
+    after: Optional[str] = None):
     """
     Retorna o dataset com features e a coluna 'rating' original.
     A coluna 'rating' é usada para gerar o alvo (target) no processo de treinamento.
+    Aceita os mesmos formatos e a mesma paginação de `/features`.
     """
-    features_df, _, _ = preparar_dados_livros(db)
-    if features_df.empty:
-        return []
-    return features_df.to_dict(orient='records')
+    return _exporta_features(db, formato, limit, after)
 
 
 @router.post("/train", status_code=status.HTTP_202_ACCEPTED)
@@ -44,13 +94,25 @@ async def train_model(background_tasks: BackgroundTasks):
     """Treina o modelo de machine learning e salva os artefatos."""
     try:
         # Tarefa em segundo plano 
-        background_tasks.add_task(treinar_e_carregar_modelos_em_cache, cache=modelo_cache)
+        background_tasks.add_task(treinar_e_carregar_modelos_em_cache)
         return {"message": "Processo do treino do Modelo iniciado em segundo plano."}
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-# O endpoint de predição agora usa os modelos carregados do cache
+def _modelo_do_snapshot(snapshot: SnapshotModelos, nome_modelo: str):
+    """Retorna o modelo pedido, ou 503 se ele ou os artefatos não estiverem carregados."""
+    modelo_selecionado = snapshot.modelos.get(nome_modelo)
+    if modelo_selecionado is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Modelo '{nome_modelo}' não está treinado ou disponível no cache. Execute o treinamento primeiro."
+        )
+    if not snapshot.encoder or not snapshot.tfidf:
+        raise HTTPException(status_code=503, detail="Artefatos de pré-processamento não carregados.")
+    return modelo_selecionado
+
+
 @router.post("/predictions", response_model=dict)
 async def get_prediction(
     livro_input: LivroBase, 
@@ -59,33 +121,20 @@ async def get_prediction(
     """
         Recebe os dados de um livro e retorna uma predição usando um modelo do cache.
     """
-    with modelo_cache["lock"]:
-        modelo_selecionado = modelo_cache["modelos"].get(nome_modelo)
-
-        logging.info(f"Todos os modelos disponíveis no cache: {modelo_cache['modelos'].keys()}")
-        logging.info(f"Modelo selecionado: {modelo_selecionado}")
-        
-        if modelo_selecionado is None:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"Modelo '{nome_modelo}' não está treinado ou disponível no cache. Execute o treinamento primeiro."
-            )
-        
-        encoder = modelo_cache.get("encoder_prod")
-        tfidf = modelo_cache.get("tfidf_prod")
-        
-        if not encoder or not tfidf:
-             raise HTTPException(status_code=503, detail="Artefatos de pré-processamento não carregados.")
-
-        # A lógica de preparação e predição continua a mesma...
-        input_df_processed = preparar_input_para_predicao(
-            livro_input,
-            encoder,
-            tfidf,
-            modelo_selecionado.feature_names_in_
-        )
-        prediction = modelo_selecionado.predict(input_df_processed)
-        predicted_class = int(prediction[0])
+    # Uma única leitura do snapshot: modelo e artefatos vêm sempre do mesmo treino
+    snapshot = obtem_snapshot()
+    _modelo_do_snapshot(snapshot, nome_modelo)
+
+    chave = chave_predicao(nome_modelo, snapshot.versao, livro_input)
+    predicted_class = cache_predicoes.obtem(chave)
+    if predicted_class is None:
+        if ML_MICRO_LOTES:
+            predicted_class = await micro_lotes.prediz(snapshot, nome_modelo, livro_input)
+        else:
+            # Sem micro-lotes, cada predição roda no threadpool, em paralelo com as demais
+            prediction = await run_in_threadpool(prediz_lote, snapshot, nome_modelo, [livro_input])
+            predicted_class = int(prediction[0])
+        cache_predicoes.guarda(chave, predicted_class)
 
     return {
         "livro": livro_input.titulo, 
@@ -94,24 +143,59 @@ async def get_prediction(
     }
 
 
+@router.post("/predictions/batch", response_model=dict)
+def get_predictions_batch(
+    livros: List[LivroBase] = Body(..., min_length=1, max_length=ML_PREDICOES_LOTE_MAX),
+    nome_modelo: str = "random_forest"):
+    """
+    Recebe uma lista de livros e retorna uma predição para cada um, na mesma ordem.
+    Todo o lote é pré-processado de uma vez e o modelo é chamado uma única vez.
+    """
+    snapshot = obtem_snapshot()
+    _modelo_do_snapshot(snapshot, nome_modelo)
+    predicoes = prediz_lote(snapshot, nome_modelo, livros)
+
+    return {
+        "modelo_usado": nome_modelo,
+        "total": len(livros),
+        "predicoes": [
+            {"livro": livro.titulo, "rating_predito": int(predicao)}
+            for livro, predicao in zip(livros, predicoes)
+        ]
+    }
+
+
+@router.get("/micro-lotes", response_model=dict)
+async def get_micro_lotes_status():
+    """
+    Retorna a configuração dos micro-lotes de /predictions e os histogramas de
+    tamanho de lote e de tempo de espera na fila, para ajustar a janela.
+    """
+    return micro_lotes.estatisticas()
+
+
 @router.get("/cache-status", response_model=dict)
 async def get_cache_status():
     """
     Retorna o estado atual do cache de modelos de ML, incluindo os modelos
     carregados e suas métricas de treinamento mais recentes.
     """
-    with modelo_cache["lock"]:
-        # Prepara uma resposta segura sem expor os objetos do modelo
-        modelos_info = {}
-        metricas = modelo_cache.get("metricas", {})
-        for nome_modelo in modelo_cache.get("modelos", {}).keys():
-            modelos_info[nome_modelo] = {
-                "nome": nome_modelo,
-                "metricas": metricas.get(nome_modelo, "N/A")
-            }
+    snapshot = obtem_snapshot()
+
+    # Prepara uma resposta segura sem expor os objetos do modelo
+    modelos_info = [
+        {"nome": nome_modelo, "metricas": snapshot.metricas.get(nome_modelo, "N/A")}
+        for nome_modelo in snapshot.modelos
+    ]
 
     return {
-        "modelos_carregados": list(modelo_cache.get("modelos", {}).keys()),
-        "artefatos_carregados": "encoder_prod" in modelo_cache and "tfidf_prod" in modelo_cache,
-        "detalhes_modelos": list(modelos_info.values())
-    }
\ No newline at end of file
+        "modelos_carregados": list(snapshot.modelos),
+        "artefatos_carregados": snapshot.encoder is not None and snapshot.tfidf is not None,
+        "detalhes_modelos": modelos_info,
+        "versao": snapshot.versao,
+        "origem": snapshot.origem,
+        "publicado_em": snapshot.publicado_em,
+        "feature_store": feature_store.estatisticas(),
+        "cache_predicoes": cache_predicoes.estatisticas(),
+        "artefatos_disco": artefatos_modelos.estatisticas(),
+    }
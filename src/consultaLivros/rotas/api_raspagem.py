@@ -1,7 +1,14 @@
-from fastapi import APIRouter, Depends, status, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, status, BackgroundTasks, HTTPException, Query
 from sqlalchemy.orm import Session
-from ..raspagem.chrome_scraper import rodar_scraper_completo
-from ..repositorios.tarefas_repositorio import cria_tarefa, busca_tarefa_por_id, busca_tarefa_por_estados
+from typing import Literal, Optional
+from ..raspagem.chrome_scraper import SCRAPER_TAREFA_EXPIRACAO_MINUTOS, rodar_scraper_completo
+from ..raspagem.drivers import pool_webdrivers
+from ..repositorios.tarefas_repositorio import (
+    cria_tarefa,
+    busca_tarefa_por_id,
+    busca_tarefa_por_estados,
+    marca_tarefas_abandonadas
+)
 from ..db.database import get_db
 
 # Importe as funções e modelos do seu arquivo seguranca.py
@@ -19,12 +26,25 @@ router = APIRouter(
 @router.post("/raspagem/trigger", status_code=status.HTTP_202_ACCEPTED)
 async def executar_scraper(
     background_tasks: BackgroundTasks,
+    backend: Optional[Literal["http", "selenium"]] = None,
+    concorrencia: Optional[int] = Query(None, ge=1, le=32),
+    retomar: bool = True,
+    incremental: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: TokenData = Depends(get_current_user)
 ):
     """
     Executa o scraper de livros em segundo plano.
+    O `backend` pode ser "http" (httpx + lxml, padrão) ou "selenium" (Chrome headless,
+    para sites que dependem de JavaScript). Se omitido, usa a variável SCRAPER_BACKEND.
+    A `concorrencia` define quantas categorias são raspadas em paralelo (padrão: SCRAPER_CONCORRENCIA).
+    Com `retomar` (padrão), uma raspagem anterior que terminou em ERRO ou foi
+    interrompida continua a partir do seu checkpoint. Com `incremental` (padrão:
+    SCRAPER_INCREMENTAL), páginas que não mudaram desde a última raspagem são puladas.
     """
+    # Tarefas sem atualização há muito tempo pertencem a um processo que morreu
+    marca_tarefas_abandonadas(db, minutos=SCRAPER_TAREFA_EXPIRACAO_MINUTOS)
+
     # VERIFICAÇÃO: Impede a execução de múltiplas tarefas de raspagem
     tarefa_em_andamento = busca_tarefa_por_estados(db, estados=["PENDENTE", "EXECUTANDO"])
     if tarefa_em_andamento:
@@ -38,7 +58,10 @@ async def executar_scraper(
     print(f"Tarefa {tarefa.id} criada com sucesso.")
 
     # A tarefa em background é responsável por gerenciar sua própria sessão de DB
-    background_tasks.add_task(rodar_scraper_completo, id_tarefa=tarefa.id)
+    background_tasks.add_task(
+        rodar_scraper_completo, id_tarefa=tarefa.id, backend=backend, concorrencia=concorrencia,
+        retomar=retomar, incremental=incremental
+    )
     return {"id_tarefa": tarefa.id, "message": "Processo de raspagem iniciado em segundo plano."}
 
 
@@ -57,4 +80,13 @@ async def verificar_status_tarefa(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tarefa não encontrada."
         )
 
-    return {"id_tarefa": tarefa.id, "estado": tarefa.estado, "resultado": tarefa.resultado}
\ No newline at end of file
+    return {"id_tarefa": tarefa.id, "estado": tarefa.estado, "resultado": tarefa.resultado}
+
+
+@router.get("/raspagem/webdrivers", status_code=status.HTTP_200_OK)
+async def estatisticas_webdrivers(current_user: TokenData = Depends(get_current_user)):
+    """
+    Estatísticas do pool de navegadores do backend Selenium: navegadores ociosos
+    e em uso, quantos foram criados, reutilizados, reciclados e descartados.
+    """
+    return pool_webdrivers.estatisticas()
@@ -0,0 +1,136 @@
+import io
+import json
+import math
+from typing import Dict, Iterator
+
+import pandas as pd
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+# Formatos aceitos pelas rotas de dados de ML e o media type de cada um
+FORMATOS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Documentação OpenAPI das rotas que usam resposta_dataframe: um conteúdo por formato
+RESPOSTAS_OPENAPI = {
+    200: {
+        "description": "Linhas do DataFrame no formato pedido em `format`.",
+        "content": {
+            FORMATOS["json"]: {"schema": {"type": "array", "items": {"type": "object"}}},
+            FORMATOS["ndjson"]: {"schema": {"type": "string", "description": "Um objeto JSON por linha."}},
+            FORMATOS["parquet"]: {"schema": {"type": "string", "format": "binary"}},
+            FORMATOS["arrow"]: {"schema": {"type": "string", "format": "binary"}},
+        },
+    },
+}
+
+# Linhas serializadas por vez: limita a memória de cada requisição
+LINHAS_POR_BLOCO = 500
+
+
+class _SaidaIncremental(io.RawIOBase):
+    """
+    Destino de escrita que entrega os bytes já gravados a cada bloco, mantendo a
+    posição total (o rodapé do Parquet guarda offsets absolutos).
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self) -> int:
+        return self._posicao
+
+    def drena(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _blocos(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        yield df.iloc[inicio:inicio + LINHAS_POR_BLOCO]
+
+
+def _valor_json(valor):
+    # NaN e infinito não existem em JSON: viram null
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+
+def _registros_json(bloco: pd.DataFrame) -> Iterator[str]:
+    # Mesmo conteúdo da serialização anterior (to_dict), sem o jsonable_encoder e sem espaços
+    for registro in bloco.to_dict(orient="records"):
+        registro = {coluna: _valor_json(valor) for coluna, valor in registro.items()}
+        # allow_nan=False: um valor não finito que escape da conversão gera erro, não JSON inválido
+        yield json.dumps(registro, separators=(",", ":"), allow_nan=False)
+
+
+def _json(df: pd.DataFrame) -> Iterator[bytes]:
+    yield b"["
+    for indice, bloco in enumerate(_blocos(df)):
+        yield ((b"," if indice else b"") + ",".join(_registros_json(bloco)).encode())
+    yield b"]"
+
+
+def _ndjson(df: pd.DataFrame) -> Iterator[bytes]:
+    for bloco in _blocos(df):
+        yield ("\n".join(_registros_json(bloco)) + "\n").encode()
+
+
+def _parquet(df: pd.DataFrame) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    saida = _SaidaIncremental()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(saida, schema) as escritor:
+        # Um row group por bloco
+        for bloco in _blocos(df):
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=schema, preserve_index=False))
+            yield saida.drena()
+    yield saida.drena()
+
+
+def _arrow(df: pd.DataFrame) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    saida = _SaidaIncremental()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(saida, schema) as escritor:
+        for bloco in _blocos(df):
+            escritor.write_batch(pa.RecordBatch.from_pandas(bloco, schema=schema, preserve_index=False))
+            yield saida.drena()
+    yield saida.drena()
+
+
+_SERIALIZADORES = {"json": _json, "ndjson": _ndjson, "parquet": _parquet, "arrow": _arrow}
+
+
+def resposta_dataframe(df: pd.DataFrame, formato: str, cabecalhos: Dict[str, str]) -> StreamingResponse:
+    """
+    Envia o DataFrame em blocos de LINHAS_POR_BLOCO linhas, no formato pedido.
+    Parquet e Arrow IPC exigem o pyarrow (HTTP 400 se ele não estiver instalado).
+    """
+    if formato in ("parquet", "arrow"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"O formato '{formato}' requer o pacote pyarrow, que não está instalado no servidor."
+            )
+    return StreamingResponse(_SERIALIZADORES[formato](df), media_type=FORMATOS[formato], headers=cabecalhos)
@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+from fastapi import HTTPException, status
+
+# Cabeçalho usado para devolver o cursor da próxima página nas rotas paginadas
+CABECALHO_PROXIMO_CURSOR = "X-Next-Cursor"
+
+# Tamanho máximo de página aceito nas rotas paginadas por cursor
+LIMITE_MAXIMO_PAGINA = 1000
+
+
+def codifica_cursor(valores: dict) -> str:
+    """Codifica a posição da última linha de uma página em um cursor opaco (base64 url-safe)."""
+    bruto = json.dumps(valores, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip("=")
+
+
+def decodifica_cursor(cursor: str) -> dict:
+    """
+    Decodifica um cursor gerado por `codifica_cursor`.
+    Levanta HTTP 400 se o cursor estiver malformado.
+    """
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        valores = None
+
+    if not isinstance(valores, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+    return valores